@@ -0,0 +1,180 @@
+"""
+Interface asyncio du planificateur SAT
+
+Les scripts existants bloquent le thread appelant pendant l'encodage et la
+résolution. AsyncPlanner exécute la recherche d'horizon (sat_planner.plan_task)
+dans un pool de threads : la boucle d'événements reste libre, et plusieurs
+requêtes de planification la partagent.
+
+- Un sémaphore limite le nombre de planifications simultanées ; les
+  suivantes attendent leur tour sans occuper de thread.
+- Les événements de progression (bornes, puis chaque horizon essayé avec son
+  statut SAT / UNSAT / UNKNOWN) sont transmis à la boucle au fil de l'eau.
+- L'annulation de la tâche asyncio interrompt le solveur en cours
+  (solver_budget.Interrupter) : le thread est libéré aussitôt, sans attendre
+  la fin de la recherche.
+
+Les threads suffisent : pysat relâche le GIL pendant une résolution
+interruptible, les solveurs de plusieurs requêtes tournent donc en parallèle.
+
+Utilisation :
+    async with AsyncPlanner(max_concurrency=4) as planner:
+        task = await planner.load("domain.pddl", "problem.pddl")
+        async for event in planner.events(task, max_horizon=30):
+            print(event)
+        result = await planner.plan(task, deadline=10)
+
+    python async_planner.py domains/gripper_family.pddl problems/generated/*.pddl --concurrency 2
+"""
+
+import argparse
+import asyncio
+import functools
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from grounding import load_task
+from sat_planner import plan_task
+from solver_budget import Interrupter, add_arguments, budget_from_args
+
+
+class AsyncPlanner:
+    """Planifications SAT concurrentes depuis une boucle asyncio"""
+
+    def __init__(self, max_concurrency=4, executor=None):
+        self.max_concurrency = max_concurrency
+        # Chaque planification occupe un thread du début à la fin de sa
+        # recherche d'horizon : le pool doit en avoir au moins max_concurrency
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_concurrency,
+                                                       thread_name_prefix="planificateur")
+        # Créé à la première utilisation, dans la boucle qui s'en sert
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def load(self, domain_file, problem_file):
+        """Lecture et instanciation du PDDL, hors de la boucle d'événements"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, load_task, domain_file, problem_file)
+
+    async def events(self, task, **options):
+        """Événements de progression d'une planification, puis son résultat
+
+        Les options sont celles de sat_planner.plan_task (max_horizon,
+        min_horizon, budget, deadline, anytime). Événements produits :
+        {'event': 'bounds', ...}, {'event': 'horizon', 'horizon': h,
+        'status': ..., ...} pour chaque horizon essayé, puis
+        {'event': 'result', 'result': ...}. Annuler la tâche qui consomme
+        ces événements (ou cesser de les lire) interrompt le solveur.
+        """
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue()
+            interrupter = Interrupter()
+
+            def emit(event):
+                # Appelé depuis le thread du pool
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+            future = loop.run_in_executor(
+                self.executor,
+                functools.partial(plan_task, task, interrupter=interrupter, on_event=emit, **options))
+            # Le rappel passe par la boucle, après les événements déjà émis
+            future.add_done_callback(lambda _: queue.put_nowait(None))
+
+            try:
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        break
+                    yield event
+                yield {'event': 'result', 'result': future.result()}
+            finally:
+                if not future.done():
+                    # Annulation (ou consommateur parti) : on interrompt le
+                    # solveur et on attend la libération du thread avant de
+                    # rendre la place du sémaphore
+                    interrupter.cancel()
+                    await asyncio.wait([future])
+
+    async def plan(self, task, on_event=None, **options):
+        """Planification complète ; on_event reçoit chaque événement de progression"""
+        async for event in self.events(task, **options):
+            if event['event'] == 'result':
+                return event['result']
+            if on_event is not None:
+                on_event(event)
+
+    def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+async def _plan_problem(planner, domain, problem, options, timeout):
+    """Charge et planifie un problème en affichant sa progression"""
+    name = problem.rsplit("/", 1)[-1]
+    start = time.perf_counter()
+
+    def show(event):
+        elapsed = time.perf_counter() - start
+        if event['event'] == 'bounds':
+            print(f"[{elapsed:7.3f}s] {name}: borne inférieure {event['lower_bound']}")
+        else:
+            print(f"[{elapsed:7.3f}s] {name}: horizon {event['horizon']} {event['status']} "
+                  f"({event['solve_time']*1000:.1f} ms)")
+
+    task = await planner.load(domain, problem)
+    try:
+        result = await asyncio.wait_for(planner.plan(task, on_event=show, **options), timeout)
+    except asyncio.TimeoutError:
+        print(f"[{time.perf_counter() - start:7.3f}s] {name}: annulé après {timeout:g} s")
+        return False
+    if result['plan'] is None:
+        print(f"[{time.perf_counter() - start:7.3f}s] {name}: aucun plan ({result['status']})")
+        return False
+    print(f"[{time.perf_counter() - start:7.3f}s] {name}: plan de {len(result['plan'])} actions"
+          f"{'' if result['optimal'] else ' (non prouvé optimal)'}")
+    return True
+
+
+async def _main(args):
+    options = {'max_horizon': args.max_horizon, 'budget': budget_from_args(args),
+               'deadline': args.deadline, 'anytime': args.anytime}
+    async with AsyncPlanner(max_concurrency=args.concurrency) as planner:
+        results = await asyncio.gather(*(_plan_problem(planner, args.domain, problem, options,
+                                                       args.timeout)
+                                         for problem in args.problems))
+    return all(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planification SAT concurrente (asyncio)")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problems", nargs="+", help="Fichiers problèmes PDDL")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Nombre maximal de planifications simultanées")
+    parser.add_argument("--max-horizon", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=None, metavar="SECONDES",
+                        help="Annule chaque planification (et interrompt son solveur) après ce délai")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDES",
+                        help="Échéance de chaque planification (retourne le meilleur plan trouvé)")
+    parser.add_argument("--anytime", action="store_true")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ok = asyncio.run(_main(args))
+    print(f"Terminé en {time.perf_counter() - start:.3f}s")
+    sys.exit(0 if ok else 1)
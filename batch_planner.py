@@ -0,0 +1,289 @@
+"""
+Résolution d'une série de problèmes de même forme par un seul solveur
+
+Des problèmes sur les mêmes objets (simple_gripper, return_gripper et
+round_trip dans problems/) ne diffèrent que par leur état initial et leur
+but. Or encode_task les inscrit dans la formule en clauses unitaires : chaque
+problème demande son propre encodage et un nouveau solveur, qui réapprend
+tout depuis zéro.
+
+Ici la formule ne contient que les clauses des instants (encode_transitions).
+L'état initial (à t = 0) et le but (à l'instant t) sont passés au solveur
+comme hypothèses (assumptions) : un seul solveur incrémental, construit une
+fois pour l'horizon maximal, répond à toute la série et garde d'un problème
+à l'autre les clauses apprises, qui ne dépendent que des transitions.
+
+Un plan de longueur au plus t atteint le but à l'instant t, puisque les
+instants vides sont permis : le premier t satisfiable donne la longueur
+optimale, sans réencoder d'horizon. Les actions choisies après t sont libres
+et ne font pas partie du plan.
+
+La tâche commune est instanciée depuis la réunion des états initiaux et des
+buts de la série : l'atteignabilité relâchée depuis cette réunion contient
+celle de chaque problème, aucune action utile n'est donc retirée. Les
+problèmes doivent avoir les mêmes objets et les mêmes faits statiques.
+
+Utilisation :
+    python batch_planner.py domain.pddl problems/simple_gripper.pddl problems/return_gripper.pddl problems/round_trip.pddl
+    python batch_planner.py domain.pddl problems/*.pddl --max-horizon 12 --compare
+"""
+
+import argparse
+import math
+import sys
+import time
+
+from pysat.solvers import Minisat22
+
+import metrics
+from decode_plan import decode_actions, format_plan_lines
+from domain_compiler import compile_domain, step_block
+from encodeur_sat import encode_transitions
+from grounding import GroundTask, ground
+from pddl_parser import load_domain, load_problem
+from plan_ir import Plan
+from sat_planner import horizon_bounds
+from solver_budget import SAT, UNKNOWN, UNSAT, Deadline, add_arguments, budget_from_args, solve_limited
+from solver_stats import accumulate, collect, empty_stats
+from state_space import state_space_of
+
+
+def _shape_key(problem, static):
+    objects = tuple(sorted(problem['objects']))
+    statics = tuple(sorted(atom for atom in problem['init'] if atom[0] in static))
+    return objects, statics
+
+
+def shape_task(domain, problems, name=None):
+    """Tâche commune à des problèmes qui ne diffèrent que par init et but
+
+    problems : problèmes analysés (pddl_parser). Lève ValueError si leurs
+    objets ou leurs faits statiques diffèrent.
+    """
+    if not problems:
+        raise ValueError("aucun problème dans la série")
+    static = compile_domain(domain).static
+    key = _shape_key(problems[0], static)
+    for problem in problems[1:]:
+        if _shape_key(problem, static) != key:
+            raise ValueError(f"{problem['name']}: objets ou faits statiques différents "
+                             f"de {problems[0]['name']}")
+
+    init, goal = {}, {}
+    for problem in problems:
+        init.update(dict.fromkeys(problem['init']))
+        goal.update(dict.fromkeys(atom for atom in problem['goal'] if atom[0] not in static))
+    merged = dict(problems[0], name=name or f"forme de {problems[0]['name']}",
+                  init=list(init), goal=list(goal))
+    return ground(domain, merged)
+
+
+def member_task(task, problem):
+    """Problème de la série exprimé sur les faits et actions de la tâche commune
+
+    Retourne une GroundTask qui partage facts et actions avec task ; un but
+    statique faux la rend insatisfiable (goal vaut alors None).
+    """
+    static = compile_domain(task.domain).static
+    static_init = {atom for atom in problem['init'] if atom[0] in static}
+    init = [task.fact_index[atom] for atom in problem['init'] if atom[0] not in static]
+    goal = [task.fact_index[atom] for atom in problem['goal'] if atom[0] not in static]
+    member = GroundTask(problem['name'], task.facts, task.actions, init, goal, task.domain)
+    if any(atom[0] in static and atom not in static_init for atom in problem['goal']):
+        member.goal = None
+    return member
+
+
+class BatchPlanner:
+    """Solveur incrémental chaud pour les problèmes d'une même tâche commune
+
+    La formule (clauses des instants 0 à max_horizon - 1) est construite une
+    fois ; solve(member) cherche le plan optimal d'un problème par des appels
+    successifs sous hypothèses. Le solveur n'est pas partageable entre
+    threads.
+    """
+
+    def __init__(self, task, max_horizon=20):
+        self.task = task
+        self.max_horizon = max_horizon
+        self.block = step_block(task)
+        start = time.perf_counter()
+        buffer, var_map = encode_transitions(task, max_horizon)
+        encoded = time.perf_counter()
+        self.rev_map = {v: k for k, v in var_map.items()}
+        with metrics.phase("build"):
+            self.solver = Minisat22(bootstrap_with=buffer)
+        self.variables, self.clauses = buffer.nv, len(buffer)
+        self.encode_time = encoded - start
+        self.build_time = time.perf_counter() - encoded
+        self.results = []
+        self.search = empty_stats()
+
+    def _query(self, assumptions, budget, deadline):
+        start = time.perf_counter()
+        with metrics.phase("solve"):
+            status = solve_limited(self.solver, budget, deadline, assumptions=assumptions)
+        elapsed = time.perf_counter() - start
+        metrics.count("solver.calls")
+        if status == UNKNOWN:
+            metrics.count("solver.unknown")
+        # self.search : compteurs cumulés du solveur depuis sa construction
+        search = collect(self.solver, self.search)
+        accumulate(self.search, search)
+        return status, elapsed, search
+
+    def solve(self, member, budget=None, deadline=None, min_horizon=None):
+        """Plan optimal de member (member_task) ; même résultat que sat_planner.plan_task
+
+        Sans min_horizon, les instants du but partent de la borne inférieure
+        LM-cut du problème. budget limite chaque appel au solveur, deadline
+        (secondes ou Deadline) la recherche du problème.
+        """
+        result = {'name': member.name, 'plan': None, 'horizon': None, 'status': UNKNOWN,
+                  'optimal': False, 'timed_out': False, 'calls': [], 'lower_bound': None,
+                  'solve_time': 0.0, 'solver_stats': empty_stats()}
+        self.results.append(result)
+        deadline = deadline if isinstance(deadline, Deadline) else Deadline(deadline)
+        if member.goal is None:
+            result['status'] = UNSAT
+            return result
+        if min_horizon is None:
+            min_horizon = result['lower_bound'] = horizon_bounds(member)[0]
+            if min_horizon == math.inf:
+                result['status'] = UNSAT
+                return result
+
+        init = self.block.init_literals(member.init)
+        for t in range(min_horizon, self.max_horizon + 1):
+            if deadline.expired():
+                result['timed_out'] = True
+                break
+            status, elapsed, search = self._query(init + self.block.goal_literals(t, member.goal),
+                                                  budget, deadline)
+            result['calls'].append({'horizon': t, 'status': status, 'solve_time': elapsed,
+                                    'solver_stats': search})
+            result['solve_time'] += elapsed
+            accumulate(result['solver_stats'], search)
+            if status == SAT:
+                # Seules les actions avant t mènent au but
+                actions = decode_actions(self.solver.get_model(), rev_map=self.rev_map)
+                result['plan'] = Plan([step for step in actions if step.t < t], member.name, t)
+                result['horizon'], result['status'] = t, SAT
+                result['optimal'] = True
+                break
+            if status == UNKNOWN:
+                # Horizon non réfuté : un plan trouvé ensuite ne serait pas prouvé optimal
+                result['timed_out'] = deadline.expired()
+                break
+        else:
+            result['status'] = UNSAT
+        return result
+
+    def solve_batch(self, members, budget=None, deadline=None):
+        """Résout les problèmes dans l'ordre ; deadline borne la série entière"""
+        deadline = deadline if isinstance(deadline, Deadline) else Deadline(deadline)
+        return [self.solve(member, budget, deadline) for member in members]
+
+    def stats(self):
+        return {
+            'task': self.task.name,
+            'max_horizon': self.max_horizon,
+            'variables': self.variables,
+            'clauses': self.clauses,
+            'encode_time': self.encode_time,
+            'build_time': self.build_time,
+            'problems': len(self.results),
+            'solver_calls': sum(len(r['calls']) for r in self.results),
+            'solve_time': sum(r['solve_time'] for r in self.results),
+            'solver_stats': dict(self.search),
+        }
+
+    def close(self):
+        if self.solver is not None:
+            self.solver.delete()
+            self.solver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def plan_batch(domain, problems, max_horizon=20, budget=None, deadline=None):
+    """Plans optimaux d'une série de problèmes de même forme, par un seul solveur
+
+    Retourne (résultats dans l'ordre des problèmes, statistiques du solveur).
+    """
+    task = shape_task(domain, problems)
+    members = [member_task(task, problem) for problem in problems]
+    with BatchPlanner(task, max_horizon) as planner:
+        results = planner.solve_batch(members, budget, deadline)
+        for member, result in zip(members, results):
+            if result['plan'] is not None:
+                result['valid'] = state_space_of(member).validate(result['plan'])[0]
+        return results, planner.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Série de problèmes de même forme résolue par un solveur chaud")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problems", nargs="+", help="Fichiers problèmes PDDL (mêmes objets)")
+    parser.add_argument("--max-horizon", type=int, default=20)
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDES",
+                        help="Échéance de la série entière")
+    parser.add_argument("--compare", action="store_true",
+                        help="Résout aussi chaque problème séparément (sat_planner.plan_task)")
+    add_arguments(parser)
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "batch_planner")
+
+    domain = load_domain(args.domain)
+    problems = [load_problem(path) for path in args.problems]
+    budget = budget_from_args(args)
+    start = time.perf_counter()
+    try:
+        results, stats = plan_batch(domain, problems, args.max_horizon, budget, args.deadline)
+    except ValueError as e:
+        print(f"Erreur: {e}")
+        sys.exit(2)
+    batch_time = time.perf_counter() - start
+
+    print(f"Solveur commun ({stats['task']}): {stats['variables']} variables, "
+          f"{stats['clauses']} clauses, horizon {stats['max_horizon']}, "
+          f"encodage {stats['encode_time']*1000:.1f} ms, construction {stats['build_time']*1000:.1f} ms")
+    ok = True
+    for result in results:
+        length = len(result['plan']) if result['plan'] is not None else "-"
+        print(f"\n{result['name']}: {result['status']}, plan de {length} actions, "
+              f"{len(result['calls'])} appels, {result['solve_time']*1000:.2f} ms, "
+              f"{result['solver_stats']['conflicts']} conflits")
+        if result['plan'] is not None:
+            ok = ok and result['valid']
+            if not result['valid']:
+                print("  PLAN INVALIDE")
+            for line in format_plan_lines(result['plan']):
+                print("  " + line)
+    print(f"\nSérie: {stats['problems']} problèmes, {stats['solver_calls']} appels au solveur, "
+          f"{batch_time*1000:.1f} ms au total")
+
+    if args.compare:
+        from sat_planner import plan_task
+
+        start = time.perf_counter()
+        width = max(len(r['name']) for r in results) + 2
+        print(f"\n{'Problème':<{width}} {'Série':>6} {'Séparé':>7}")
+        for path, result in zip(args.problems, results):
+            task = ground(domain, load_problem(path))
+            alone = plan_task(task, args.max_horizon, budget=budget)
+            lengths = [len(r['plan']) if r['plan'] is not None else None for r in (result, alone)]
+            ok = ok and lengths[0] == lengths[1]
+            print(f"{result['name']:<{width}} {str(lengths[0]):>6} {str(lengths[1]):>7}"
+                  + ("" if lengths[0] == lengths[1] else "  DIFFÉRENT"))
+        print(f"Problèmes résolus séparément: {(time.perf_counter() - start)*1000:.1f} ms "
+              f"(série: {batch_time*1000:.1f} ms)")
+
+    metrics.set_info('problems', len(results))
+    metrics.finish(args)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,130 @@
+"""
+Mesures mémoire du benchmark : encodage et résolution par horizon
+
+- Encodage : pic d'allocation Python mesuré par tracemalloc pendant
+  encode_gripper, et mémoire encore retenue par la formule à la fin
+  (listes de clauses et dictionnaire var_map à clés tuples).
+- Résolution : pic de mémoire résidente (RSS) du processus, relevé avec
+  resource.getrusage dans un sous-processus neuf pour chaque mesure. Ainsi
+  le pic d'un horizon n'est pas masqué par celui d'un horizon précédent, et
+  la mémoire du solveur C++ (invisible pour tracemalloc) est comptée.
+
+Les octets par clause et par variable permettent de suivre le passage à
+l'échelle de l'encodage ; `check_budget` échoue quand la mémoire par clause
+dépasse le budget configuré.
+
+Utilisation (mesure isolée, normalement lancée par benchmark.py) :
+    python bench_memory.py --horizon 8
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tracemalloc
+
+DEFAULT_BUDGET = 256  # octets (pic tracemalloc) par clause
+
+
+def _peak_rss_bytes():
+    """Pic RSS du processus courant en octets, None si indisponible (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_encoding(horizon):
+    """Pic et mémoire retenue (octets) de l'encodage d'un horizon"""
+    from encodeur_sat import encode_gripper
+
+    tracemalloc.start()
+    try:
+        cnf, var_map = encode_gripper(horizon=horizon)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    clauses = len(cnf.clauses)
+    return {
+        'variables': cnf.nv,
+        'clauses': clauses,
+        'encode_peak_bytes': peak,
+        'encode_retained_bytes': current,
+        'bytes_per_clause': peak / clauses if clauses else 0.0,
+        'bytes_per_variable': peak / cnf.nv if cnf.nv else 0.0,
+    }
+
+
+def measure_solving(horizon):
+    """Pic RSS avant et après la résolution, dans le processus courant
+
+    À n'appeler que dans un processus neuf (voir measure_horizon_memory) :
+    ru_maxrss ne fait que croître au cours de la vie du processus.
+    """
+    from pysat.solvers import Minisat22
+    from encodeur_sat import encode_gripper
+
+    cnf, _ = encode_gripper(horizon=horizon)
+    before = _peak_rss_bytes()
+    with Minisat22(bootstrap_with=cnf.clauses) as solver:
+        satisfiable = solver.solve()
+    after = _peak_rss_bytes()
+
+    return {
+        'satisfiable': satisfiable,
+        'rss_before_solve_bytes': before,
+        'peak_rss_bytes': after,
+        # Croissance du pic due à la construction du solveur et à la recherche
+        'solve_rss_growth_bytes': None if before is None else after - before,
+    }
+
+
+def measure_horizon_memory(horizon, isolated=True):
+    """Mesures mémoire complètes d'un horizon
+
+    Avec isolated=True, chaque mesure est faite dans un sous-processus neuf
+    (`python bench_memory.py --horizon h`) ; sinon dans le processus courant,
+    où le pic RSS inclut tout ce qui a été alloué auparavant.
+    """
+    if not isolated:
+        result = measure_encoding(horizon)
+        result.update(measure_solving(horizon))
+        result['isolated'] = False
+        return result
+
+    proc = subprocess.run([sys.executable, __file__, "--horizon", str(horizon)],
+                          capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout)
+    result['isolated'] = True
+    return result
+
+
+def check_budget(results, budget=DEFAULT_BUDGET):
+    """Liste des dépassements du budget mémoire par clause (vide si tout va bien)"""
+    failures = []
+    for result in results:
+        memory = result.get('memory')
+        if memory and memory['bytes_per_clause'] > budget:
+            failures.append(f"horizon {result['horizon']}: {memory['bytes_per_clause']:.1f} "
+                            f"octets/clause > budget {budget}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure mémoire d'un horizon (sous-processus)")
+    parser.add_argument("--horizon", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    # Encodage d'abord (tracemalloc), résolution ensuite (pic RSS du processus)
+    result = measure_encoding(args.horizon)
+    result.update(measure_solving(args.horizon))
+    json.dump(result, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# Statistiques pour les mesures de benchmark
+#
+# Les temps de résolution de ces petites instances sont de l'ordre de la
+# microseconde : une mesure isolée n'a pas de sens. On résume donc chaque
+# série de répétitions par des statistiques robustes (médiane, quartiles) et
+# un intervalle de confiance de la médiane qui ne suppose aucune loi.
+
+import math
+import statistics
+
+
+def quartiles(samples):
+    """Premier quartile, médiane et troisième quartile"""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0], ordered[0], ordered[0]
+    q1, median, q3 = statistics.quantiles(ordered, n=4, method='inclusive')
+    return q1, median, q3
+
+
+def median_confidence_interval(samples, confidence=0.95):
+    """Intervalle de confiance de la médiane par statistiques d'ordre
+
+    Le nombre d'échantillons sous la médiane suit une loi binomiale B(n, 1/2) :
+    on retient le plus petit rang j tel que [x(j), x(n-j+1)] couvre la médiane
+    avec au moins la confiance demandée. Avec trop peu d'échantillons,
+    l'intervalle se réduit à [min, max] et sa couverture réelle est plus faible.
+    """
+    ordered = sorted(samples)
+    n = len(ordered)
+    if n == 0:
+        raise ValueError("aucun échantillon")
+
+    alpha = 1 - confidence
+    cdf = 0.0
+    j = 0
+    # On cherche le plus grand j tel que P(B <= j - 1) <= alpha / 2
+    for k in range(n + 1):
+        cdf += math.comb(n, k) / 2 ** n
+        if cdf > alpha / 2:
+            break
+        j = k + 1
+
+    j = max(j, 1)
+    return ordered[j - 1], ordered[n - j]
+
+
+def summarize(samples, confidence=0.95):
+    """Résumé statistique d'une série de mesures"""
+    if not samples:
+        raise ValueError("aucun échantillon")
+
+    q1, median, q3 = quartiles(samples)
+    ci_low, ci_high = median_confidence_interval(samples, confidence)
+    return {
+        'n': len(samples),
+        'median': median,
+        'q1': q1,
+        'q3': q3,
+        'iqr': q3 - q1,
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'min': min(samples),
+        'max': max(samples),
+        'ci_low': ci_low,
+        'ci_high': ci_high,
+        'confidence': confidence,
+    }
+
+
+def mann_whitney_greater(candidate, baseline):
+    """Test de Mann-Whitney unilatéral : candidate est-il plus grand que baseline ?
+
+    Retourne (U, p) où U est la statistique du candidat et p la p-valeur de
+    l'hypothèse « les valeurs du candidat sont stochastiquement plus grandes ».
+    Approximation normale avec correction des ex aequo et de continuité,
+    suffisante à partir de quelques répétitions de chaque côté.
+    """
+    n1, n2 = len(candidate), len(baseline)
+    if n1 == 0 or n2 == 0:
+        raise ValueError("aucun échantillon")
+
+    # Rangs moyens sur l'échantillon fusionné
+    merged = sorted([(v, 0) for v in candidate] + [(v, 1) for v in baseline])
+    ranks = [0.0] * len(merged)
+    tie_term = 0
+    i = 0
+    while i < len(merged):
+        j = i
+        while j + 1 < len(merged) and merged[j + 1][0] == merged[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+
+    rank_sum = sum(r for r, (_, group) in zip(ranks, merged) if group == 0)
+    u = rank_sum - n1 * (n1 + 1) / 2
+
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        # Tous les échantillons sont égaux : aucune différence détectable
+        return u, 1.0
+
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    p = 0.5 * math.erfc(z / math.sqrt(2))
+    return u, p
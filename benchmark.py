@@ -1,46 +1,180 @@
+import os
+import sys
+import json
 import time
-import matplotlib.pyplot as plt
-from encodeur_sat import encode_gripper
+import argparse
+import platform
+import importlib.util
+from datetime import datetime
+import metrics
+from encodeur_sat import encode_gripper, encode_task
+from grounding import load_task
+from sat_planner import plan_task
 from pysat.solvers import Minisat22
+from bench_stats import summarize
+from bench_memory import DEFAULT_BUDGET, check_budget, measure_horizon_memory
+from plan_counting import count_plans, format_count, projection_of
+from preprocess import Preprocessor, format_stats as format_preprocess
+from solver_stats import STAT_KEYS, STAT_LABELS, accumulate, collect, empty_stats, with_rates
+from benchmark_store import DEFAULT_DB, record_run
 
-def run_benchmark():
+DEFAULT_HORIZONS = [2, 3, 4, 5, 6, 8]
+PHASES = ['encode', 'build', 'solve']
+RESULTS_JSON = 'benchmark_results.json'
+
+def measure_horizon(horizon, warmup=3, repetitions=20):
+    """Mesure séparément encodage, construction du solveur et résolution
+
+    Chaque répétition refait les trois phases depuis zéro et les chronomètre
+    avec perf_counter_ns. Les premières exécutions (warm-up) ne sont pas
+    comptées : elles absorbent le remplissage des caches et de l'allocateur.
+    """
+    samples = {phase: [] for phase in PHASES}
+    satisfiable = None
+    cnf = None
+    search = None
+    
+    for i in range(warmup + repetitions):
+        t0 = time.perf_counter_ns()
+        cnf, var_map = encode_gripper(horizon=horizon)
+        t1 = time.perf_counter_ns()
+        with metrics.phase("build"):
+            solver = Minisat22(bootstrap_with=cnf.clauses)
+        t2 = time.perf_counter_ns()
+        with metrics.phase("solve"):
+            result = solver.solve()
+        t3 = time.perf_counter_ns()
+        # Minisat est déterministe : les compteurs sont les mêmes à chaque répétition
+        search = collect(solver)
+        solver.delete()
+        
+        if satisfiable is not None and result != satisfiable:
+            raise RuntimeError(f"résultat instable pour l'horizon {horizon}")
+        satisfiable = result
+        
+        if i >= warmup:
+            samples['encode'].append(t1 - t0)
+            samples['build'].append(t2 - t1)
+            samples['solve'].append(t3 - t2)
+    
+    samples['total'] = [sum(parts) for parts in zip(*(samples[p] for p in PHASES))]
+    solve_time = summarize(samples['solve'])['median'] / 1e9
+    
+    return {
+        'horizon': horizon,
+        'variables': cnf.nv,
+        'clauses': len(cnf.clauses),
+        'satisfiable': satisfiable,
+        # Temps de résolution médian en secondes (graphiques et rapport texte)
+        'time': solve_time,
+        # Compteurs de recherche, débits rapportés à la résolution médiane
+        'solver_stats': with_rates(search, solve_time),
+        'phases': {phase: dict(summarize(values), samples=values)
+                   for phase, values in samples.items()}
+    }
+
+def measure_preprocessing(horizon, warmup=3, repetitions=20):
+    """Effet du prétraitement (preprocess.py) sur un horizon
+
+    Mesure la réduction de la formule, le temps du prétraitement et les
+    médianes de résolution sans et avec ; vérifie que le modèle reconstruit
+    satisfait la formule d'origine.
+    """
+    cnf, var_map = encode_gripper(horizon=horizon)
+    frozen = projection_of(var_map)
+    samples = {'preprocess': [], 'plain': [], 'simplified': []}
+    
+    for i in range(warmup + repetitions):
+        t0 = time.perf_counter_ns()
+        pre = Preprocessor(cnf.clauses, frozen=frozen, n_vars=cnf.nv)
+        clauses = pre.run()
+        t1 = time.perf_counter_ns()
+        with Minisat22(bootstrap_with=clauses) as solver:
+            t2 = time.perf_counter_ns()
+            satisfiable = solver.solve()
+            t3 = time.perf_counter_ns()
+            model = solver.get_model()
+        with Minisat22(bootstrap_with=cnf.clauses) as solver:
+            t4 = time.perf_counter_ns()
+            expected = solver.solve()
+            t5 = time.perf_counter_ns()
+        
+        if satisfiable != expected:
+            raise RuntimeError(f"prétraitement incorrect pour l'horizon {horizon}")
+        if i >= warmup:
+            samples['preprocess'].append(t1 - t0)
+            samples['simplified'].append(t3 - t2)
+            samples['plain'].append(t5 - t4)
+    
+    reconstructed = True
+    if satisfiable:
+        full = set(pre.extend(model))
+        reconstructed = all(any(lit in full for lit in clause) for clause in cnf.clauses)
+    
+    stats = pre.stats()
+    stats.update({
+        'satisfiable': satisfiable,
+        'reconstructed': reconstructed,
+        'phases': {name: summarize(values) for name, values in samples.items()},
+    })
+    return stats
+
+def run_benchmark(horizons=DEFAULT_HORIZONS, warmup=3, repetitions=20, memory=True, count=True,
+                  preprocess=True):
 
     # Teste des performances pour différents horizons temporels
     print(" Benchmark des horizons temporels")
     print("=" * 40)
+    print(f"Warm-up: {warmup}, répétitions: {repetitions}")
     
-    horizons = [2, 3, 4, 5, 6, 8]
     results = []
     
     for horizon in horizons:
         print(f"\nTest avec horizon = {horizon}")
         
         try:
-            # encodage de problème SAT
-            cnf, var_map = encode_gripper(horizon=horizon)
+            stats = measure_horizon(horizon, warmup, repetitions)
+            print(f"   Variables: {stats['variables']}, Clauses: {stats['clauses']}")
             
-            # Collecte des statistiques de complexité
-            stats = {
-                'horizon': horizon,
-                'variables': cnf.nv,
-                'clauses': len(cnf.clauses)
-            }
+            for phase in PHASES:
+                p = stats['phases'][phase]
+                print(f"   {phase:<7} médiane {p['median']/1000:9.1f} µs  "
+                      f"IQR {p['iqr']/1000:8.1f} µs  "
+                      f"IC95% [{p['ci_low']/1000:.1f}, {p['ci_high']/1000:.1f}] µs")
+            search = stats['solver_stats']
+            print(f"   Recherche: {search['conflicts']} conflits, {search['decisions']} décisions, "
+                  f"{search['propagations']} propagations, {search['restarts']} redémarrages, "
+                  f"{search['conflicts_per_sec']:.0f} conflits/s")
             
-            print(f"   Variables: {stats['variables']}, Clauses: {stats['clauses']}")
+            # Mémoire : sous-processus neuf par horizon (pic RSS non cumulé)
+            if memory:
+                stats['memory'] = measure_horizon_memory(horizon)
+                mem = stats['memory']
+                print(f"   Mémoire: encodage pic {mem['encode_peak_bytes']/1024:.1f} Kio "
+                      f"({mem['bytes_per_clause']:.0f} o/clause, "
+                      f"{mem['bytes_per_variable']:.0f} o/variable)"
+                      + (f", pic RSS résolution {mem['peak_rss_bytes']/2**20:.1f} Mio"
+                         if mem['peak_rss_bytes'] is not None else ""))
             
-            # Mesurage du temps de résolution
-            start_time = time.time()
-            with Minisat22(bootstrap_with=cnf.clauses) as solver:
-                satisfiable = solver.solve()
-                solve_time = time.time() - start_time
+            # Nombre de plans de l'horizon (#SAT projeté sur les actions), mesuré une fois
+            if count:
+                cnf, var_map = encode_gripper(horizon=horizon)
+                stats['plan_count'] = count_plans(cnf, var_map)
+                print(f"   Plans: {format_count(stats['plan_count'])}")
             
-            stats['time'] = solve_time
-            stats['satisfiable'] = satisfiable
+            # Prétraitement : réduction de la formule et effet sur la résolution
+            if preprocess:
+                stats['preprocess'] = measure_preprocessing(horizon, warmup, repetitions)
+                pre = stats['preprocess']
+                print(f"   Prétraitement: {format_preprocess(pre)}")
+                print(f"   Résolution: {pre['phases']['plain']['median']/1000:.1f} µs sans, "
+                      f"{pre['phases']['simplified']['median']/1000:.1f} µs avec"
+                      + ("" if pre['reconstructed'] else " (MODÈLE RECONSTRUIT INVALIDE)"))
             
-            if satisfiable:
-                print(f" Solution trouvée en {solve_time:.4f}s")
+            if stats['satisfiable']:
+                print(" Solution trouvée")
             else:
-                print(f" Pas de solution ({solve_time:.4f}s)")
+                print(" Pas de solution")
             
             results.append(stats)
             
@@ -49,6 +183,378 @@ def run_benchmark():
     
     return results
 
+def save_json(results, warmup, repetitions, filename=RESULTS_JSON, encoding=None):
+    """Sauvegarde les résultats bruts et leurs statistiques au format JSON"""
+    payload = build_payload(results, warmup, repetitions, encoding)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    print(f"Résultats JSON sauvegardés dans '{filename}'")
+    return payload
+
+def build_payload(results, warmup, repetitions, encoding=None):
+    """Résultats d'une exécution avec le contexte nécessaire pour les comparer"""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'solver': 'minisat22',
+        'encoding': encoding or {'encoder': 'encode_gripper'},
+        'warmup': warmup,
+        'repetitions': repetitions,
+        'unit': 'ns',
+        'results': results
+    }
+
+# BENCHMARK PAR FAMILLES D'INSTANCES (generate_problems.py)
+
+SCALING_PHASES = ['ground', 'bound', 'encode', 'build', 'solve']
+SCALING_JSON = 'benchmark_scaling.json'
+SCALING_AXES = ['balls', 'rooms', 'grippers']
+
+def measure_instance(entry, warmup=0, repetitions=3, max_horizon=40, deadline=None):
+    """Mesure le temps jusqu'au plan optimal d'une instance du manifeste
+
+    Une répétition comprend la lecture et l'instanciation du PDDL, le calcul
+    de la borne inférieure d'horizon, puis la recherche d'horizon complète
+    (tous les appels UNSAT depuis la borne jusqu'au premier SAT).
+
+    Les instances avec des objectifs (entry['targets'], Gripper IPC) sont
+    mesurées sous l'échéance de leur objectif de temps : une répétition qui
+    l'atteint est gardée et arrête la mesure.
+    """
+    # La recherche s'arrête à l'optimum connu : inutile d'aller au-delà
+    bound = entry['optimal_length'] if entry.get('optimal_length') is not None else max_horizon
+    targets = entry.get('targets')
+    if deadline is None and targets:
+        deadline = targets['optimal_s']
+    samples = {phase: [] for phase in SCALING_PHASES}
+    result = None
+    
+    for i in range(warmup + repetitions):
+        t0 = time.perf_counter_ns()
+        task = load_task(entry['domain'], entry['problem'])
+        t1 = time.perf_counter_ns()
+        result = plan_task(task, max_horizon=bound, deadline=deadline)
+        
+        if i >= warmup or result['timed_out']:
+            samples['ground'].append(t1 - t0)
+            samples['bound'].append(int(result['bound_time'] * 1e9))
+            search = empty_stats()
+            for call in result['calls']:
+                accumulate(search, call['solver_stats'])
+            for phase in ('encode', 'build', 'solve'):
+                samples[phase].append(int(sum(c[phase + '_time'] for c in result['calls']) * 1e9))
+        if result['timed_out']:
+            break
+    
+    samples['total'] = [sum(parts) for parts in zip(*(samples[p] for p in SCALING_PHASES))]
+    # Échéance atteinte avant tout appel : taille de la formule inconnue
+    last = result['calls'][-1] if result['calls'] else {'variables': 0, 'clauses': 0}
+    solve_time = summarize(samples['solve'])['median'] / 1e9
+    
+    stats = {
+        'instance': f"family/{entry['name']}",
+        'name': entry['name'],
+        'params': {axis: entry[axis] for axis in SCALING_AXES},
+        'topology': entry['topology'],
+        'facts': len(task.facts),
+        'actions': len(task.actions),
+        'variables': last['variables'],
+        'clauses': last['clauses'],
+        'satisfiable': result['plan'] is not None,
+        'plan_length': len(result['plan']) if result['plan'] is not None else None,
+        'optimal_length': entry.get('optimal_length'),
+        'solver_calls': len(result['calls']),
+        'status': result['status'],
+        'optimal': result['optimal'],
+        'timed_out': result['timed_out'],
+        # Horizons sous la borne inférieure : appels UNSAT évités
+        'lower_bound': result['lower_bound'],
+        'upper_hint': result['upper_hint'],
+        'saved_calls': result['saved_calls'],
+        # Compteurs cumulés sur tous les appels de la recherche d'horizon
+        'solver_stats': with_rates(search, solve_time),
+        'phases': {phase: dict(summarize(values), samples=values)
+                   for phase, values in samples.items()}
+    }
+    if targets:
+        stats['targets'] = check_targets(entry, targets, stats)
+    return stats
+
+def check_targets(entry, targets, stats):
+    """Objectifs de performance d'une instance : mesures, cibles et verdicts
+
+    L'encodage est mesuré à l'horizon optimal sur une tâche fraîchement
+    instanciée (gabarits du domaine déjà compilés, bloc de la tâche à
+    construire), comme pour un nouveau problème d'un domaine connu.
+    """
+    task = load_task(entry['domain'], entry['problem'])
+    start = time.perf_counter()
+    cnf, _ = encode_task(task, entry['optimal_length'])
+    encode_ms = (time.perf_counter() - start) * 1000
+    clauses = len(cnf.clauses)
+    del cnf
+    
+    optimal_s = stats['phases']['total']['median'] / 1e9 if stats['optimal'] else None
+    return {
+        'encode_ms': {'value': encode_ms, 'target': targets['encode_ms'],
+                      'met': encode_ms <= targets['encode_ms']},
+        'clauses': {'value': clauses, 'target': targets['clauses'],
+                    'met': clauses <= targets['clauses']},
+        'optimal_s': {'value': optimal_s, 'target': targets['optimal_s'],
+                      'met': optimal_s is not None and optimal_s <= targets['optimal_s']},
+    }
+
+def run_family_benchmark(manifest_path, warmup=0, repetitions=3, max_horizon=40, deadline=None):
+    """Mesure toutes les instances d'un manifeste de generate_problems.py
+
+    deadline (secondes) borne la recherche de chaque répétition ; par défaut,
+    l'objectif de temps de l'instance quand elle en a un.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    print(f" Benchmark des familles d'instances ({manifest_path})")
+    print("=" * 40)
+    print(f"Warm-up: {warmup}, répétitions: {repetitions}")
+    
+    # Une même instance peut appartenir à plusieurs familles : mesurée une fois
+    results = {}
+    for entry in manifest['instances']:
+        if entry['name'] in results:
+            results[entry['name']]['axes'].append(entry.get('axis'))
+            continue
+        
+        print(f"\nInstance {entry['name']}")
+        try:
+            stats = measure_instance(entry, warmup, repetitions, max_horizon, deadline)
+        except Exception as e:
+            print(f" Erreur: {e}")
+            continue
+        stats['axes'] = [entry.get('axis')]
+        results[entry['name']] = stats
+        
+        total = stats['phases']['total']
+        print(f"   {stats['facts']} faits, {stats['actions']} actions, "
+              f"{stats['variables']} variables, {stats['clauses']} clauses")
+        print(f"   plan: {stats['plan_length']} actions (optimal attendu: "
+              f"{stats['optimal_length'] if stats['optimal_length'] is not None else '?'}), "
+              f"{stats['solver_calls']} appels au solveur "
+              f"({stats['saved_calls']} évités, borne {stats['lower_bound']}), "
+              f"médiane {total['median']/1e6:.2f} ms")
+        print(f"   {stats['solver_stats']['conflicts']} conflits, "
+              f"{stats['solver_stats']['conflicts_per_sec']:.0f} conflits/s")
+        if 'targets' in stats:
+            print("   Objectifs: " + ", ".join(
+                f"{name} {'atteint' if check['met'] else 'MANQUÉ'}"
+                for name, check in stats['targets'].items()))
+    
+    return list(results.values())
+
+def create_scaling_graphs(results, filename='benchmark_scaling.png'):
+    """Temps jusqu'au plan optimal et taille de la formule le long de chaque axe"""
+    import matplotlib.pyplot as plt
+    
+    axes_present = [axis for axis in SCALING_AXES
+                    if any(axis in r['axes'] for r in results)]
+    if not axes_present:
+        print(" Aucune famille à un seul axe : pas de graphique de passage à l'échelle")
+        return
+    
+    fig, plots = plt.subplots(1, len(axes_present), figsize=(6 * len(axes_present), 5),
+                              squeeze=False)
+    fig.suptitle("Passage à l'échelle - Planificateur SAT Gripper", fontsize=16, fontweight='bold')
+    
+    for ax, axis in zip(plots[0], axes_present):
+        family = sorted((r for r in results if axis in r['axes']), key=lambda r: r['params'][axis])
+        xs = [r['params'][axis] for r in family]
+        medians = [r['phases']['total']['median'] / 1e6 for r in family]
+        lower = [(r['phases']['total']['median'] - r['phases']['total']['q1']) / 1e6 for r in family]
+        upper = [(r['phases']['total']['q3'] - r['phases']['total']['median']) / 1e6 for r in family]
+        
+        ax.errorbar(xs, medians, yerr=[lower, upper], fmt='o-', capsize=4, color='#2E86AB',
+                    linewidth=2, markerfacecolor='white', markeredgewidth=2)
+        ax.set_xlabel({'balls': 'Nombre de balles', 'rooms': 'Nombre de pièces',
+                       'grippers': 'Nombre de pinces'}[axis], fontsize=12)
+        ax.set_ylabel('Temps jusqu\'au plan optimal (ms)', fontsize=12, color='#2E86AB')
+        ax.set_yscale('log')
+        ax.grid(True, alpha=0.3)
+        
+        clauses_ax = ax.twinx()
+        clauses_ax.plot(xs, [r['clauses'] for r in family], 's--', color='#F18F01')
+        clauses_ax.set_ylabel('Clauses (horizon optimal)', fontsize=12, color='#F18F01')
+        ax.set_title(f"Axe: {axis}", fontsize=14, fontweight='bold')
+    
+    plt.tight_layout()
+    plt.savefig(filename, dpi=200, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"Graphiques sauvegardés dans '{filename}'")
+
+def create_scaling_report(results, filename='benchmark_scaling.txt'):
+    """Rapport texte du benchmark par familles"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("RAPPORT DE PASSAGE À L'ÉCHELLE - PLANIFICATEUR SAT\n")
+        f.write("Familles d'instances Gripper (generate_problems.py)\n")
+        f.write("=" * 50 + "\n\n")
+        
+        f.write(f"{'Instance':<36} {'Faits':>6} {'Actions':>8} {'Clauses':>9} {'Plan':>5} "
+                f"{'Opt.':>5} {'Appels':>7} {'Total (ms)':>11} {'IQR (ms)':>9} "
+                f"{'Conflits':>9} {'Conflits/s':>11}\n")
+        for r in results:
+            total = r['phases']['total']
+            optimal = r['optimal_length'] if r['optimal_length'] is not None else '?'
+            plan = r['plan_length'] if r['plan_length'] is not None else '-'
+            f.write(f"{r['name']:<36} {r['facts']:>6} {r['actions']:>8} {r['clauses']:>9} "
+                    f"{plan:>5} {optimal:>5} {r['solver_calls']:>7} "
+                    f"{total['median']/1e6:>11.2f} {total['iqr']/1e6:>9.2f} "
+                    f"{r['solver_stats']['conflicts']:>9} "
+                    f"{r['solver_stats']['conflicts_per_sec']:>11.0f}\n")
+        
+        f.write("\nBORNES D'HORIZON\n")
+        f.write("-" * 16 + "\n")
+        f.write("La recherche part de la borne inférieure LM-cut ; le plan relâché (h_FF)\n")
+        f.write("n'est qu'une indication, pas une borne supérieure garantie.\n")
+        f.write(f"{'Instance':<36} {'Borne inf.':>10} {'Plan relâché':>13} {'Opt.':>5} "
+                f"{'Évités':>7} {'Appels':>7} {'Borne (ms)':>11}\n")
+        saved = calls = 0
+        for r in results:
+            optimal = r['optimal_length'] if r['optimal_length'] is not None else '?'
+            saved += r['saved_calls']
+            calls += r['solver_calls']
+            f.write(f"{r['name']:<36} {r['lower_bound']:>10} {r['upper_hint']:>13} {optimal:>5} "
+                    f"{r['saved_calls']:>7} {r['solver_calls']:>7} "
+                    f"{r['phases']['bound']['median']/1e6:>11.2f}\n")
+        if saved + calls:
+            f.write(f"Appels au solveur évités: {saved} sur {saved + calls} "
+                    f"({100 * saved / (saved + calls):.0f} %)\n")
+        
+        f.write("\nVÉRIFICATION DES LONGUEURS OPTIMALES\n")
+        f.write("-" * 36 + "\n")
+        for r in results:
+            if r['optimal_length'] is None:
+                continue
+            ok = r['plan_length'] == r['optimal_length']
+            f.write(f"{'OK    ' if ok else 'ÉCART '} {r['name']}: plan {r['plan_length']}, "
+                    f"optimal {r['optimal_length']}\n")
+        
+        checked = [r for r in results if 'targets' in r]
+        if checked:
+            targets = checked[0]['targets']
+            f.write("\nOBJECTIFS (GRIPPER IPC)\n")
+            f.write("-" * 23 + "\n")
+            f.write(f"Encodage de l'horizon optimal <= {targets['encode_ms']['target']} ms, "
+                    f"CNF <= {targets['clauses']['target']} clauses, "
+                    f"plan optimal prouvé en <= {targets['optimal_s']['target']} s\n")
+            f.write(f"{'Instance':<36} {'Encodage (ms)':>14} {'Clauses':>9} {'Optimal (s)':>12} "
+                    f"{'Statut':>8}  Verdict\n")
+            met = 0
+            for r in checked:
+                t = r['targets']
+                optimal_s = (f"{t['optimal_s']['value']:.2f}" if t['optimal_s']['value'] is not None
+                             else "échéance" if r['timed_out'] else "-")
+                missed = [name for name, check in t.items() if not check['met']]
+                met += not missed
+                f.write(f"{r['name']:<36} {t['encode_ms']['value']:>14.1f} "
+                        f"{t['clauses']['value']:>9} {optimal_s:>12} {r['status']:>8}  "
+                        f"{'atteint' if not missed else 'MANQUÉ: ' + ', '.join(missed)}\n")
+            f.write(f"Objectifs atteints sur {met} instance(s) sur {len(checked)}\n")
+    
+    print(f"Rapport sauvegardé dans '{filename}'")
+
+# ENCODAGE PARALLÈLE PAR TRANCHES D'INSTANTS (parallel_encoding.py)
+
+PARALLEL_JSON = 'benchmark_parallel.json'
+PARALLEL_PHASES = ['encode', 'buffer', 'write']
+
+def run_parallel_benchmark(domain_file, problem_file, horizon=1000, workers_list=None,
+                           warmup=1, repetitions=3, out='problem_parallel.cnf'):
+    """Accélération de l'encodage par tranches selon le nombre de processus
+
+    Pour chaque nombre de processus, mesure encode() (formule en listes),
+    encode_buffer() (tampon int32 en mémoire partagée) et write_dimacs()
+    (fichier DIMACS) sur un même pool, démarré avant les mesures. L'accélération est rapportée à un seul processus.
+    """
+    from parallel_encoding import ShardedEncoder
+    
+    task = load_task(domain_file, problem_file)
+    cores = os.cpu_count() or 1
+    if workers_list is None:
+        workers_list = sorted({1} | {w for w in (2, 4, 8, 16) if w <= cores} | {cores})
+    
+    print(f" Benchmark de l'encodage parallèle ({task}, horizon {horizon}, {cores} cœur(s))")
+    print("=" * 40)
+    print(f"Warm-up: {warmup}, répétitions: {repetitions}")
+    
+    results = []
+    for workers in workers_list:
+        samples = {phase: [] for phase in PARALLEL_PHASES}
+        with ShardedEncoder(task, workers) as encoder:
+            for i in range(warmup + repetitions):
+                t0 = time.perf_counter_ns()
+                cnf, _ = encoder.encode(horizon)
+                t1 = time.perf_counter_ns()
+                buffer, _ = encoder.encode_buffer(horizon)
+                t2 = time.perf_counter_ns()
+                encoder.write_dimacs(horizon, out)
+                t3 = time.perf_counter_ns()
+                del buffer
+                if i >= warmup:
+                    samples['encode'].append(t1 - t0)
+                    samples['buffer'].append(t2 - t1)
+                    samples['write'].append(t3 - t2)
+                variables, clauses = cnf.nv, len(cnf.clauses)
+                del cnf
+            shards = encoder.stats()['shards'] // encoder.stats()['encodings']
+        results.append({
+            'instance': f"parallel/{task.name}/h={horizon}/w={workers}",
+            'workers': workers,
+            'horizon': horizon,
+            'shards': shards,
+            'variables': variables,
+            'clauses': clauses,
+            'satisfiable': None,
+            'phases': {phase: dict(summarize(values), samples=values)
+                       for phase, values in samples.items()}
+        })
+    
+    base = results[0]['phases']
+    for r in results:
+        r['speedup'] = {phase: base[phase]['median'] / r['phases'][phase]['median']
+                        for phase in PARALLEL_PHASES}
+        print(f"   {r['workers']} processus ({r['shards']} tranches): "
+              f"encodage {r['phases']['encode']['median']/1e6:.0f} ms "
+              f"(x{r['speedup']['encode']:.2f}), tampon {r['phases']['buffer']['median']/1e6:.0f} ms "
+              f"(x{r['speedup']['buffer']:.2f}), DIMACS {r['phases']['write']['median']/1e6:.0f} ms "
+              f"(x{r['speedup']['write']:.2f})")
+    if os.path.exists(out):
+        os.remove(out)
+    return results
+
+def create_parallel_report(results, filename='benchmark_parallel.txt'):
+    """Rapport texte de l'accélération de l'encodage par tranches"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("RAPPORT D'ENCODAGE PARALLÈLE - PLANIFICATEUR SAT\n")
+        f.write("=" * 50 + "\n\n")
+        r0 = results[0]
+        f.write(f"Instance: {r0['instance'].rsplit('/w=', 1)[0]}, {r0['variables']} variables, "
+                f"{r0['clauses']} clauses, {os.cpu_count()} cœur(s)\n")
+        f.write("Formule et fichier identiques à l'encodage séquentiel "
+                "(python parallel_encoding.py ... --check)\n\n")
+        f.write(f"{'Processus':>9} {'Tranches':>9}"
+                + "".join(f" {label + ' (ms)':>14} {'IQR (ms)':>9} {'Accél.':>7}"
+                          for label in ('Listes', 'Tampon', 'DIMACS')) + "\n")
+        for r in results:
+            f.write(f"{r['workers']:>9} {r['shards']:>9}")
+            for phase in PARALLEL_PHASES:
+                p = r['phases'][phase]
+                f.write(f" {p['median']/1e6:>14.1f} {p['iqr']/1e6:>9.1f} {r['speedup'][phase]:>6.2f}x")
+            f.write("\n")
+        f.write("\nEn listes, les clauses de chaque tranche sont sérialisées vers le\n")
+        f.write("processus parent ; en tampon, chaque processus écrit sa tranche en\n")
+        f.write("mémoire partagée, et l'écriture DIMACS n'échange que du texte.\n")
+    
+    print(f"Rapport sauvegardé dans '{filename}'")
+
 #affichage des graphiques de performance
 def create_graphs(results):
     
@@ -58,26 +564,35 @@ def create_graphs(results):
     
     print("\nGénération des graphiques...")
     
+    # Import différé : seul le tracé des graphiques a besoin de matplotlib
+    import matplotlib.pyplot as plt
+    
     #extraction des données pour les graphiques
     horizons = [r['horizon'] for r in results]
-    times = [r['time'] for r in results]
     variables = [r['variables'] for r in results]
     clauses = [r['clauses'] for r in results]
     
 
     plt.style.use('default')
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
+    fig, ((ax1, ax2), (ax3, ax4), (ax5, ax6)) = plt.subplots(3, 2, figsize=(14, 15))
     fig.suptitle('Analyse de Performance - Planificateur SAT Gripper', fontsize=16, fontweight='bold')
     
-    # Graphique 1: Temps de résolution
-    ax1.plot(horizons, times, 'o-', color='#2E86AB', linewidth=3, markersize=8, markerfacecolor='white', markeredgewidth=2)
+    # Graphique 1: Temps médian de chaque phase, barres d'erreur = quartiles
+    phase_colors = {'encode': '#2E86AB', 'build': '#6C8EAD', 'solve': '#C73E1D'}
+    for phase in PHASES:
+        stats = [r['phases'][phase] for r in results]
+        medians = [p['median'] / 1000 for p in stats]
+        lower = [(p['median'] - p['q1']) / 1000 for p in stats]
+        upper = [(p['q3'] - p['median']) / 1000 for p in stats]
+        ax1.errorbar(horizons, medians, yerr=[lower, upper], fmt='o-', capsize=4,
+                     color=phase_colors[phase], linewidth=2, markersize=7,
+                     markerfacecolor='white', markeredgewidth=2, label=phase)
     ax1.set_xlabel('Horizon temporel', fontsize=12)
-    ax1.set_ylabel('Temps de résolution (s)', fontsize=12)
-    ax1.set_title('Performance temporelle', fontsize=14, fontweight='bold')
+    ax1.set_ylabel('Temps médian (µs)', fontsize=12)
+    ax1.set_title('Performance temporelle par phase (médiane, Q1-Q3)', fontsize=14, fontweight='bold')
     ax1.grid(True, alpha=0.3)
     ax1.set_yscale('log')
-    for i, (h, t) in enumerate(zip(horizons, times)):
-        ax1.annotate(f'{t:.4f}s', (h, t), textcoords="offset points", xytext=(0,10), ha='center')
+    ax1.legend()
     
     # Graphique 2: Nombre de variables
     ax2.bar(horizons, variables, color='#A23B72', alpha=0.8, edgecolor='black', linewidth=1)
@@ -107,6 +622,34 @@ def create_graphs(results):
     for i, (h, r) in enumerate(zip(horizons, ratios)):
         ax4.annotate(f'{r:.2f}', (h, r), textcoords="offset points", xytext=(0,10), ha='center')
     
+    # Graphique 5: Compteurs de recherche du solveur
+    stat_colors = {'conflicts': '#C73E1D', 'decisions': '#2E86AB',
+                   'propagations': '#F18F01', 'restarts': '#A23B72'}
+    for key in STAT_KEYS:
+        # +1 : un compteur nul reste visible sur l'échelle logarithmique
+        ax5.plot(horizons, [r['solver_stats'][key] + 1 for r in results], 'o-',
+                 color=stat_colors[key], linewidth=2, markersize=7,
+                 markerfacecolor='white', markeredgewidth=2, label=STAT_LABELS[key])
+    ax5.set_xlabel('Horizon temporel', fontsize=12)
+    ax5.set_ylabel('Compteur + 1', fontsize=12)
+    ax5.set_title('Statistiques de recherche du solveur', fontsize=14, fontweight='bold')
+    ax5.grid(True, alpha=0.3)
+    ax5.set_yscale('log')
+    ax5.legend()
+    
+    # Graphique 6: Débit de la recherche
+    ax6.plot(horizons, [r['solver_stats']['conflicts_per_sec'] for r in results], 's-',
+             color='#C73E1D', linewidth=3, markersize=8, markerfacecolor='white',
+             markeredgewidth=2, label='Conflits/s')
+    ax6.plot(horizons, [r['solver_stats']['propagations_per_sec'] for r in results], 'o--',
+             color='#F18F01', linewidth=2, label='Propagations/s')
+    ax6.set_xlabel('Horizon temporel', fontsize=12)
+    ax6.set_ylabel('Événements par seconde', fontsize=12)
+    ax6.set_title('Débit du solveur (résolution médiane)', fontsize=14, fontweight='bold')
+    ax6.grid(True, alpha=0.3)
+    ax6.set_yscale('symlog')
+    ax6.legend()
+    
     plt.tight_layout()
     plt.savefig('benchmark_results.png', dpi=300, bbox_inches='tight', facecolor='white')
     print("Graphiques sauvegardés dans 'benchmark_results.png'")
@@ -127,14 +670,80 @@ def create_report(results):
         f.write("RÉSULTATS PAR HORIZON\n")
         f.write("-" * 25 + "\n\n")
         
-        # En-tête du tableau
-        f.write("Horizon | Variables | Clauses |    Temps    | Status\n")
+        # En-tête du tableau : médianes en microsecondes, IQR entre parenthèses
+        f.write("Horizon | Variables | Clauses |  Encodage (µs)  | Construction (µs) |  Résolution (µs)  | Status\n")
         
         for result in results:
             status = " SAT  " if result['satisfiable'] else " UNSAT"
-            f.write(f"│    {result['horizon']:2}   │     {result['variables']:3}     │     {result['clauses']:3}     │   {result['time']:8.4f}s  │  {status}  │\n")
+            cells = [f"{result['phases'][phase]['median']/1000:8.1f} ({result['phases'][phase]['iqr']/1000:6.1f})"
+                     for phase in PHASES]
+            f.write(f"│    {result['horizon']:2}   │     {result['variables']:3}     │     {result['clauses']:3}     │"
+                    f" {cells[0]} │  {cells[1]}  │  {cells[2]}  │  {status}  │\n")
+        
+        # Statistiques de recherche : elles montrent si un encodage aide le solveur
+        f.write("\nSTATISTIQUES DU SOLVEUR\n")
+        f.write("-" * 25 + "\n\n")
+        f.write(f"{'Horizon':>7} | {'Conflits':>9} | {'Décisions':>9} | {'Propagations':>12} | "
+                f"{'Redémarrages':>12} | {'Conflits/s':>11} | {'Propagations/s':>14}\n")
+        for result in results:
+            search = result['solver_stats']
+            f.write(f"{result['horizon']:>7} | {search['conflicts']:>9} | {search['decisions']:>9} | "
+                    f"{search['propagations']:>12} | {search['restarts']:>12} | "
+                    f"{search['conflicts_per_sec']:>11.0f} | {search['propagations_per_sec']:>14.0f}\n")
+        
+        # Mémoire : pic tracemalloc de l'encodage, pic RSS du sous-processus de résolution
+        if any('memory' in r for r in results):
+            f.write("\nMÉMOIRE\n")
+            f.write("-" * 25 + "\n\n")
+            f.write(f"{'Horizon':>7} | {'Pic encodage (Kio)':>18} | {'Retenu (Kio)':>12} | "
+                    f"{'Octets/clause':>13} | {'Octets/variable':>15} | {'Pic RSS résolution (Mio)':>24}\n")
+            for result in results:
+                if 'memory' not in result:
+                    continue
+                mem = result['memory']
+                rss = (f"{mem['peak_rss_bytes']/2**20:24.1f}" if mem['peak_rss_bytes'] is not None
+                       else f"{'n/d':>24}")
+                f.write(f"{result['horizon']:>7} | {mem['encode_peak_bytes']/1024:18.1f} | "
+                        f"{mem['encode_retained_bytes']/1024:12.1f} | {mem['bytes_per_clause']:13.1f} | "
+                        f"{mem['bytes_per_variable']:15.1f} | {rss}\n")
+        
+        # Flexibilité : nombre de plans distincts (affectations des actions) par horizon
+        if any('plan_count' in r for r in results):
+            f.write("\nNOMBRE DE PLANS\n")
+            f.write("-" * 25 + "\n\n")
+            f.write(f"{'Horizon':>7} | {'Plans':>14} | {'Méthode':>8} | {'Temps (ms)':>10} | "
+                    f"{'Nœuds':>7} | {'Succès cache':>12}\n")
+            for result in results:
+                if 'plan_count' not in result:
+                    continue
+                counted = result['plan_count']
+                value = ("≈" if counted['method'] == 'approx' else "") + str(counted['count'])
+                f.write(f"{result['horizon']:>7} | {value:>14} | {counted['method']:>8} | "
+                        f"{counted['time']*1000:10.2f} | {counted['counter']['nodes']:>7} | "
+                        f"{counted['counter']['cache_hits']:>12}\n")
         
+        # Prétraitement : la réduction ne paie que si le temps gagné à la
+        # résolution dépasse celui du prétraitement lui-même
+        if any('preprocess' in r for r in results):
+            f.write("\nPRÉTRAITEMENT\n")
+            f.write("-" * 25 + "\n\n")
+            f.write(f"{'Horizon':>7} | {'Clauses':>15} | {'Réduction':>9} | {'Variables':>11} | "
+                    f"{'Prétraitement (µs)':>18} | {'Résolution sans (µs)':>20} | "
+                    f"{'Résolution avec (µs)':>20} | {'Gain net (µs)':>13} | {'Modèle':>7}\n")
+            for result in results:
+                if 'preprocess' not in result:
+                    continue
+                pre = result['preprocess']
+                phases = {name: p['median'] / 1000 for name, p in pre['phases'].items()}
+                reduction = 1 - pre['clauses_after'] / pre['clauses_before']
+                gain = phases['plain'] - phases['simplified'] - phases['preprocess']
+                f.write(f"{result['horizon']:>7} | {pre['clauses_before']:>6} -> {pre['clauses_after']:<6} | "
+                        f"{reduction:>9.0%} | {pre['variables_before']:>4} -> {pre['variables_after']:<4} | "
+                        f"{phases['preprocess']:18.1f} | {phases['plain']:20.1f} | "
+                        f"{phases['simplified']:20.1f} | {gain:13.1f} | "
+                        f"{'valide' if pre['reconstructed'] else 'INVALIDE':>7}\n")
         
+        f.write("\n")
         f.write("ANALYSE DÉTAILLÉE\n")
         f.write("─" * 18 + "\n\n")
         
@@ -142,8 +751,18 @@ def create_report(results):
             f.write(f" HORIZON {result['horizon']}:\n")
             f.write(f"Variables SAT: {result['variables']}\n")
             f.write(f"Clauses SAT: {result['clauses']}\n")
-            f.write(f"Temps résolution: {result['time']:.6f} secondes\n")
+            for phase, label in [('encode', 'Encodage'), ('build', 'Construction solveur'),
+                                 ('solve', 'Résolution'), ('total', 'Total')]:
+                p = result['phases'][phase]
+                f.write(f"{label}: médiane {p['median']/1000:.1f} µs, "
+                        f"IQR {p['iqr']/1000:.1f} µs, "
+                        f"IC{p['confidence']*100:.0f}% [{p['ci_low']/1000:.1f}, {p['ci_high']/1000:.1f}] µs "
+                        f"(n={p['n']})\n")
             f.write(f"Ratio C/V: {result['clauses']/result['variables']:.3f}\n")
+            search = result['solver_stats']
+            f.write(f"Recherche: {search['conflicts']} conflits, {search['decisions']} décisions, "
+                    f"{search['propagations']} propagations, {search['restarts']} redémarrages "
+                    f"({search['conflicts_per_sec']:.0f} conflits/s)\n")
             f.write(f"Satisfiabilité: {' Problème résolu' if result['satisfiable'] else ' Pas de solution'}\n\n")
         
         f.write(" STATISTIQUES GLOBALES\n")
@@ -154,10 +773,10 @@ def create_report(results):
             variables = [r['variables'] for r in results]
             clauses = [r['clauses'] for r in results]
             
-            f.write(f"PERFORMANCE TEMPORELLE:\n")
-            f.write(f"Temps moyen: {sum(times)/len(times):.6f}s\n")
-            f.write(f"Temps minimum: {min(times):.6f}s (horizon {results[times.index(min(times))]['horizon']})\n")
-            f.write(f"Temps maximum: {max(times):.6f}s (horizon {results[times.index(max(times))]['horizon']})\n\n")
+            f.write(f"PERFORMANCE TEMPORELLE (médianes de résolution):\n")
+            f.write(f"Temps moyen: {sum(times)/len(times)*1e6:.1f} µs\n")
+            f.write(f"Temps minimum: {min(times)*1e6:.1f} µs (horizon {results[times.index(min(times))]['horizon']})\n")
+            f.write(f"Temps maximum: {max(times)*1e6:.1f} µs (horizon {results[times.index(max(times))]['horizon']})\n\n")
             
             f.write(f"COMPLEXITÉ:\n")
             f.write(f"Variables min: {min(variables)} (horizon {results[variables.index(min(variables))]['horizon']})\n")
@@ -194,32 +813,157 @@ def create_report(results):
     print("Rapport détaillé sauvegardé dans 'benchmark_report.txt'")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du planificateur SAT")
+    parser.add_argument("--horizons", type=int, nargs="+", default=DEFAULT_HORIZONS,
+                        help="Horizons à mesurer")
+    parser.add_argument("--warmup", type=int, default=None,
+                        help="Exécutions de chauffe non comptées (défaut: 3, familles: 0)")
+    parser.add_argument("--repetitions", type=int, default=None,
+                        help="Répétitions mesurées par horizon (défaut: 20, familles: 3)")
+    parser.add_argument("--json", default=None,
+                        help=f"Fichier de résultats JSON (défaut: {RESULTS_JSON}, "
+                             f"familles: {SCALING_JSON})")
+    parser.add_argument("--no-graphs", action="store_true",
+                        help="Ne trace pas les graphiques (matplotlib non requis)")
+    parser.add_argument("--db", default=DEFAULT_DB,
+                        help=f"Historique SQLite des benchmarks (défaut: {DEFAULT_DB})")
+    parser.add_argument("--no-store", action="store_true",
+                        help="N'ajoute pas cette exécution à l'historique")
+    parser.add_argument("--family", metavar="MANIFESTE",
+                        help="Mesure les instances d'un manifeste de generate_problems.py "
+                             "au lieu des horizons du problème de base")
+    parser.add_argument("--ipc", type=int, nargs="*", metavar="BALLES",
+                        help="Génère et mesure les instances Gripper IPC (défaut: 4 à 22 balles) "
+                             "avec leurs objectifs de performance")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Échéance en secondes de chaque recherche (familles ; "
+                             "défaut: objectif de temps des instances IPC)")
+    parser.add_argument("--parallel", nargs=2, metavar=("DOMAINE", "PROBLEME"),
+                        help="Mesure l'accélération de l'encodage par tranches (parallel_encoding.py) "
+                             "selon le nombre de processus")
+    parser.add_argument("--parallel-horizon", type=int, default=1000,
+                        help="Horizon encodé par --parallel (défaut: 1000)")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Nombres de processus mesurés par --parallel (défaut: 1, 2, 4... "
+                             "jusqu'au nombre de cœurs)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Ne mesure pas la mémoire (un sous-processus par horizon)")
+    parser.add_argument("--no-count", action="store_true",
+                        help="Ne compte pas les plans de chaque horizon")
+    parser.add_argument("--no-preprocess", action="store_true",
+                        help="Ne mesure pas l'effet du prétraitement de la CNF")
+    parser.add_argument("--memory-budget", type=float, default=DEFAULT_BUDGET,
+                        help=f"Pic d'encodage maximal en octets par clause (défaut: {DEFAULT_BUDGET})")
+    parser.add_argument("--max-horizon", type=int, default=40,
+                        help="Horizon maximal quand l'optimum est inconnu (familles)")
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    # Les temps du benchmark incluent alors le coût (faible) de l'instrumentation
+    metrics.start(args, "benchmark")
+    
+    if args.ipc is not None:
+        if args.family:
+            parser.error("--ipc et --family sont exclusifs")
+        from generate_problems import DEFAULT_IPC_BALLS, write_ipc_family
+        args.family, _ = write_ipc_family(args.ipc or DEFAULT_IPC_BALLS)
+    
+    if args.family:
+        warmup = 0 if args.warmup is None else args.warmup
+        repetitions = 3 if args.repetitions is None else args.repetitions
+        json_file = args.json or SCALING_JSON
+    elif args.parallel:
+        warmup = 1 if args.warmup is None else args.warmup
+        repetitions = 3 if args.repetitions is None else args.repetitions
+        json_file = args.json or PARALLEL_JSON
+    else:
+        warmup = 3 if args.warmup is None else args.warmup
+        repetitions = 20 if args.repetitions is None else args.repetitions
+        json_file = args.json or RESULTS_JSON
+    
+    if repetitions < 1:
+        parser.error("--repetitions doit être au moins 1")
+    
     print("DÉMARRAGE DU BENCHMARK COMPLET")
     print("=" * 50)
     
     # Vérification des dépendances
-    try:
-        import matplotlib.pyplot as plt
-        print("Matplotlib disponible")
-    except ImportError:
-        print("Matplotlib manquant. Installez avec: pip install matplotlib")
-        exit(1)
+    if not args.no_graphs:
+        if importlib.util.find_spec("matplotlib") is not None:
+            print("Matplotlib disponible")
+        else:
+            print("Matplotlib manquant. Installez avec: pip install matplotlib")
+            print("(ou relancez avec --no-graphs)")
+            sys.exit(1)
+    
+    # Benchmark par familles d'instances : passage à l'échelle sur chaque axe
+    if args.family:
+        results = run_family_benchmark(args.family, warmup, repetitions, args.max_horizon,
+                                       args.deadline)
+        if not results:
+            print("Aucun résultat de benchmark généré")
+            sys.exit(1)
+        if not args.no_graphs:
+            create_scaling_graphs(results)
+        create_scaling_report(results)
+        payload = save_json(results, warmup, repetitions, json_file,
+                            encoding={'encoder': 'encode_task', 'search': 'horizon'})
+        if not args.no_store:
+            run_id = record_run(payload, args.db)
+            print(f"Exécution {run_id} ajoutée à l'historique '{args.db}'")
+        metrics.finish(args)
+        sys.exit(0)
+    
+    # Encodage parallèle : accélération selon le nombre de processus
+    if args.parallel:
+        results = run_parallel_benchmark(args.parallel[0], args.parallel[1], args.parallel_horizon,
+                                         args.workers, warmup, repetitions)
+        create_parallel_report(results)
+        payload = save_json(results, warmup, repetitions, json_file,
+                            encoding={'encoder': 'parallel_encoding', 'horizon': args.parallel_horizon})
+        if not args.no_store:
+            run_id = record_run(payload, args.db)
+            print(f"Exécution {run_id} ajoutée à l'historique '{args.db}'")
+        metrics.finish(args)
+        sys.exit(0)
     
     # Lancement du benchmark
-    results = run_benchmark()
+    results = run_benchmark(args.horizons, warmup, repetitions, memory=not args.no_memory,
+                            count=not args.no_count, preprocess=not args.no_preprocess)
     
     if results:
         # Créer les graphiques
-        create_graphs(results)
+        if not args.no_graphs:
+            create_graphs(results)
         
         # Créer le rapport
         create_report(results)
         
+        # Résultats exploitables par d'autres outils
+        payload = save_json(results, warmup, repetitions, json_file)
+        
+        # Historique : permet de comparer avec `benchmark_store.py compare`
+        if not args.no_store:
+            run_id = record_run(payload, args.db)
+            print(f"Exécution {run_id} ajoutée à l'historique '{args.db}'")
+        
+        # Budget mémoire : échoue si l'encodage coûte trop d'octets par clause
+        failures = check_budget(results, args.memory_budget)
+        if failures:
+            print("\nBUDGET MÉMOIRE DÉPASSÉ:")
+            for failure in failures:
+                print(f"  {failure}")
+            metrics.finish(args)
+            sys.exit(1)
+        
         print(" BENCHMARK TERMINÉ AVEC SUCCÈS!")
         print("\nFichiers générés:")
-        print("  benchmark_results.png (graphiques)")
+        if not args.no_graphs:
+            print("  benchmark_results.png (graphiques)")
         print("  benchmark_report.txt (rapport détaillé)")
+        print(f"  {json_file} (résultats bruts et statistiques)")
         print("\n Votre planificateur SAT est prêt pour l'évaluation!")
         
     else:
-        print("Aucun résultat de benchmark généré")
\ No newline at end of file
+        print("Aucun résultat de benchmark généré")
+    
+    metrics.finish(args)
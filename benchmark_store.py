@@ -0,0 +1,292 @@
+"""
+Historique des benchmarks et détection de régressions
+
+Chaque exécution de benchmark.py est ajoutée à une base SQLite locale, indexée
+par commit git, empreinte de la machine, options d'encodage et solveur. La
+commande `compare` confronte une exécution à une exécution de référence :
+elle signale les ralentissements statistiquement significatifs (test de
+Mann-Whitney sur les répétitions) et toute croissance du nombre de clauses ou
+de variables, puis sort avec un code non nul pour bloquer la régression.
+
+Utilisation :
+    python benchmark_store.py record benchmark_results.json
+    python benchmark_store.py list
+    python benchmark_store.py compare --baseline previous
+    python benchmark_store.py compare --baseline 3f2a1c9 --candidate latest --alpha 0.01
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime
+
+from bench_stats import mann_whitney_greater, summarize
+
+DEFAULT_DB = "benchmark_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    git_commit TEXT NOT NULL,
+    git_dirty INTEGER NOT NULL,
+    machine TEXT NOT NULL,
+    machine_info TEXT NOT NULL,
+    solver TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    warmup INTEGER,
+    repetitions INTEGER
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    instance TEXT NOT NULL,
+    variables INTEGER NOT NULL,
+    clauses INTEGER NOT NULL,
+    satisfiable INTEGER,
+    phase TEXT NOT NULL,
+    median_ns REAL NOT NULL,
+    samples TEXT NOT NULL,
+    PRIMARY KEY (run_id, instance, phase)
+);
+CREATE INDEX IF NOT EXISTS runs_key ON runs (machine, solver, encoding);
+"""
+
+
+def machine_info():
+    """Caractéristiques de la machine qui influencent les temps mesurés"""
+    return {
+        'system': platform.system(),
+        'release': platform.release(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_implementation() + " " + platform.python_version(),
+    }
+
+
+def machine_fingerprint(info=None):
+    """Empreinte courte et stable de la machine"""
+    info = info or machine_info()
+    raw = json.dumps(info, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:12]
+
+
+def git_revision():
+    """(commit, arbre modifié ?) du dépôt courant, ('unknown', False) hors git"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def connect(db_path=DEFAULT_DB):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def instance_name(result):
+    if 'instance' in result:
+        return result['instance']
+    return f"gripper/h={result['horizon']}"
+
+
+def record_run(payload, db_path=DEFAULT_DB):
+    """Ajoute une exécution de benchmark (contenu de benchmark_results.json) à l'historique"""
+    commit, dirty = git_revision()
+    info = machine_info()
+    encoding = json.dumps(payload.get('encoding', {}), sort_keys=True)
+
+    with connect(db_path) as conn:
+        cur = conn.execute(
+            "INSERT INTO runs (timestamp, git_commit, git_dirty, machine, machine_info,"
+            " solver, encoding, warmup, repetitions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (payload.get('timestamp', datetime.now().isoformat()), commit, int(dirty),
+             machine_fingerprint(info), json.dumps(info, sort_keys=True),
+             payload.get('solver', 'minisat22'), encoding,
+             payload.get('warmup'), payload.get('repetitions')))
+        run_id = cur.lastrowid
+
+        for result in payload['results']:
+            for phase, stats in result['phases'].items():
+                conn.execute(
+                    "INSERT INTO measurements (run_id, instance, variables, clauses,"
+                    " satisfiable, phase, median_ns, samples) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, instance_name(result), result['variables'], result['clauses'],
+                     None if result.get('satisfiable') is None else int(result['satisfiable']),
+                     phase, stats['median'], json.dumps(stats['samples'])))
+    conn.close()
+    return run_id
+
+
+def list_runs(db_path=DEFAULT_DB, limit=20):
+    conn = connect(db_path)
+    rows = conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return rows
+
+
+def resolve_run(conn, ref, candidate=None):
+    """Trouve l'identifiant d'exécution désigné par ref
+
+    ref peut être un identifiant numérique, 'latest', 'previous' (l'exécution
+    comparable précédant le candidat) ou un préfixe de commit (dernière
+    exécution de ce commit).
+    """
+    if ref == "latest":
+        row = conn.execute("SELECT id FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+    elif ref == "previous":
+        if candidate is None:
+            raise ValueError("'previous' nécessite un candidat")
+        row = conn.execute(
+            "SELECT id FROM runs WHERE id < ? AND machine = ? AND solver = ? AND encoding = ?"
+            " ORDER BY id DESC LIMIT 1",
+            (candidate['id'], candidate['machine'], candidate['solver'],
+             candidate['encoding'])).fetchone()
+    elif ref.isdigit() and len(ref) < 7:
+        row = conn.execute("SELECT id FROM runs WHERE id = ?", (int(ref),)).fetchone()
+    else:
+        row = conn.execute("SELECT id FROM runs WHERE git_commit LIKE ? ORDER BY id DESC LIMIT 1",
+                           (ref + "%",)).fetchone()
+
+    if row is None:
+        raise ValueError(f"aucune exécution ne correspond à '{ref}'")
+    return conn.execute("SELECT * FROM runs WHERE id = ?", (row['id'],)).fetchone()
+
+
+def load_measurements(conn, run_id):
+    rows = conn.execute("SELECT * FROM measurements WHERE run_id = ?", (run_id,)).fetchall()
+    return {(row['instance'], row['phase']): row for row in rows}
+
+
+def compare_runs(baseline_ref="previous", candidate_ref="latest", db_path=DEFAULT_DB,
+                 alpha=0.01, threshold=0.05, phases=("encode", "solve", "total")):
+    """Compare deux exécutions et retourne (lignes du rapport, régressions)
+
+    Un ralentissement est une régression s'il est significatif au seuil alpha
+    ET si la médiane augmente de plus de `threshold` (5 % par défaut) : sur des
+    temps de quelques microsecondes, un écart minime peut être significatif
+    sans être gênant.
+    """
+    conn = connect(db_path)
+    try:
+        candidate = resolve_run(conn, candidate_ref)
+        baseline = resolve_run(conn, baseline_ref, candidate)
+        base = load_measurements(conn, baseline['id'])
+        cand = load_measurements(conn, candidate['id'])
+    finally:
+        conn.close()
+
+    lines = [f"Référence: exécution {baseline['id']} ({baseline['git_commit'][:10]}"
+             f"{'+' if baseline['git_dirty'] else ''}, {baseline['timestamp']})",
+             f"Candidat:  exécution {candidate['id']} ({candidate['git_commit'][:10]}"
+             f"{'+' if candidate['git_dirty'] else ''}, {candidate['timestamp']})"]
+    if baseline['machine'] != candidate['machine']:
+        lines.append("ATTENTION: machines différentes, les temps ne sont pas comparables")
+    if baseline['encoding'] != candidate['encoding'] or baseline['solver'] != candidate['solver']:
+        lines.append("ATTENTION: options d'encodage ou solveur différents")
+    lines.append("")
+
+    regressions = []
+    instances = sorted({inst for inst, _ in cand} & {inst for inst, _ in base})
+    for inst in instances:
+        # Taille de la formule : toute croissance est signalée
+        b_row = next(row for (i, _), row in base.items() if i == inst)
+        c_row = next(row for (i, _), row in cand.items() if i == inst)
+        for field in ('clauses', 'variables'):
+            if c_row[field] > b_row[field]:
+                # 0 dans la référence : échéance atteinte avant le premier encodage
+                growth = (c_row[field] - b_row[field]) / b_row[field] if b_row[field] else math.inf
+                msg = f"{inst}: {field} {b_row[field]} -> {c_row[field]} (+{growth:.1%})"
+                regressions.append(msg)
+                lines.append("RÉGRESSION " + msg)
+
+        for phase in phases:
+            if (inst, phase) not in base or (inst, phase) not in cand:
+                continue
+            b_samples = json.loads(base[(inst, phase)]['samples'])
+            c_samples = json.loads(cand[(inst, phase)]['samples'])
+            b_med = summarize(b_samples)['median']
+            c_med = summarize(c_samples)['median']
+            change = (c_med - b_med) / b_med if b_med else 0.0
+            _, p = mann_whitney_greater(c_samples, b_samples)
+
+            flag = "ok"
+            if p < alpha and change > threshold:
+                flag = "RÉGRESSION"
+                regressions.append(f"{inst} {phase}: {b_med/1000:.1f} -> {c_med/1000:.1f} µs "
+                                   f"({change:+.1%}, p={p:.2g})")
+            lines.append(f"{flag:<11}{inst:<16} {phase:<7} {b_med/1000:10.1f} -> "
+                         f"{c_med/1000:10.1f} µs  {change:+7.1%}  p={p:.2g}")
+
+    missing = sorted({inst for inst, _ in base} - {inst for inst, _ in cand})
+    for inst in missing:
+        lines.append(f"ATTENTION: {inst} absent de l'exécution candidate")
+
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Historique des benchmarks")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"Base SQLite (défaut: {DEFAULT_DB})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_record = sub.add_parser("record", help="Ajoute un fichier de résultats JSON à l'historique")
+    p_record.add_argument("results", nargs="?", default="benchmark_results.json")
+
+    p_list = sub.add_parser("list", help="Liste les dernières exécutions")
+    p_list.add_argument("--limit", type=int, default=20)
+
+    p_compare = sub.add_parser("compare", help="Compare une exécution à une référence")
+    p_compare.add_argument("--baseline", default="previous",
+                           help="id, préfixe de commit, 'latest' ou 'previous' (défaut)")
+    p_compare.add_argument("--candidate", default="latest")
+    p_compare.add_argument("--alpha", type=float, default=0.01,
+                           help="Seuil de significativité (défaut: 0.01)")
+    p_compare.add_argument("--threshold", type=float, default=0.05,
+                           help="Ralentissement relatif minimal signalé (défaut: 0.05)")
+    p_compare.add_argument("--phases", nargs="+", default=["encode", "solve", "total"])
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        with open(args.results, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        run_id = record_run(payload, args.db)
+        print(f"Exécution {run_id} ajoutée à {args.db}")
+
+    elif args.command == "list":
+        for row in list_runs(args.db, args.limit):
+            print(f"{row['id']:4}  {row['timestamp'][:19]}  {row['git_commit'][:10]}"
+                  f"{'+' if row['git_dirty'] else ' '}  machine {row['machine']}  "
+                  f"{row['solver']}  {row['encoding']}")
+
+    elif args.command == "compare":
+        try:
+            lines, regressions = compare_runs(args.baseline, args.candidate, args.db,
+                                              args.alpha, args.threshold, args.phases)
+        except ValueError as e:
+            print(f"Erreur: {e}")
+            return 2
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) détectée(s)")
+            return 1
+        print("\nAucune régression détectée")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Formule CNF en tampon d'entiers 32 bits contigu
+
+Une clause en liste Python coûte un objet liste et un pointeur par littéral
+vers un objet entier : plus de 30 octets par littéral, recopiés à chaque
+passage (bootstrap_with, écriture DIMACS). ClauseBuffer range tous les
+littéraux dans un seul array('i') et le début de chaque clause dans un
+array('q') de décalages (offsets[i]:offsets[i + 1] pour la clause i) :
+4 octets par littéral et 8 par clause.
+
+Les clauses sont exposées sans copie, sous forme de memoryview : le solveur
+(Minisat22(bootstrap_with=buffer)), le prétraitement, l'écriture DIMACS et
+l'empreinte (digest) les lisent directement dans le tampon. Les deux
+tableaux peuvent aussi être placés en mémoire partagée (share, attach)
+pour être lus ou remplis par les processus d'un pool sans sérialisation.
+
+Utilisation :
+    buffer = ClauseBuffer.from_clauses(cnf.clauses, cnf.nv)
+    buffer.append([1, -2])
+    solver = Minisat22(bootstrap_with=buffer)
+    buffer.write_dimacs("problem.cnf")
+    python clause_buffer.py domains/gripper_ipc.pddl problems/ipc/gripper_ipc_b4.pddl --horizon 200
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from array import array
+from itertools import islice
+
+LITERAL_TYPE = 'i'
+OFFSET_TYPE = 'q'
+
+# Clauses formatées par écriture dans write_dimacs
+DIMACS_CHUNK = 65536
+
+
+class ClauseBuffer:
+    """Clauses CNF dans un tableau de littéraux et un tableau de décalages"""
+
+    def __init__(self, literals=None, offsets=None, nv=0):
+        self.literals = literals if literals is not None else array(LITERAL_TYPE)
+        self.offsets = offsets if offsets is not None else array(OFFSET_TYPE, [0])
+        self.nv = nv
+
+    @classmethod
+    def from_clauses(cls, clauses, nv=None):
+        buffer = cls()
+        buffer.extend(clauses)
+        if nv is not None:
+            buffer.nv = nv
+        return buffer
+
+    # Construction
+
+    def _writable(self):
+        if not isinstance(self.literals, array):
+            raise TypeError("tampon en mémoire partagée : lecture seule")
+
+    def append(self, clause):
+        self._writable()
+        literals = self.literals
+        literals.extend(clause)
+        start = self.offsets[-1]
+        self.offsets.append(len(literals))
+        if len(literals) > start:
+            self.nv = max(self.nv, max(abs(lit) for lit in literals[start:]))
+
+    def extend(self, clauses):
+        """Ajoute des clauses (itérable de clauses ou autre ClauseBuffer)"""
+        self._writable()
+        if isinstance(clauses, ClauseBuffer):
+            # Deux copies mémoire et un décalage des offsets, clause par clause
+            base = len(self.literals) - clauses.offsets[0]
+            self.literals.extend(clauses.literals[clauses.offsets[0]:clauses.offsets[-1]])
+            self.offsets.extend([base + o for o in clauses.offsets[1:]])
+            self.nv = max(self.nv, clauses.nv)
+            return
+        for clause in clauses:
+            self.append(clause)
+
+    def extend_flat(self, literals, ends, nv=0):
+        """Ajoute des clauses déjà mises bout à bout
+
+        literals : littéraux de toutes les clauses ; ends : fin de chaque
+        clause, relative au début de literals (la dernière vaut len(literals)).
+        """
+        self._writable()
+        base = len(self.literals)
+        self.literals.extend(literals)
+        self.offsets.extend([base + end for end in ends])
+        self.nv = max(self.nv, nv)
+
+    # Accès
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def n_literals(self):
+        return self.offsets[-1] - self.offsets[0]
+
+    def __iter__(self):
+        view, offsets = memoryview(self.literals), self.offsets
+        for start, stop in zip(offsets, islice(offsets, 1, None)):
+            yield view[start:stop]
+
+    def __getitem__(self, index):
+        """Clause i (memoryview, sans copie) ou tranche de clauses (nouveau tampon)"""
+        n = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(n)
+            if step != 1:
+                raise ValueError("tranche de clauses avec un pas différent de 1")
+            stop = max(start, stop)
+            first, last = self.offsets[start], self.offsets[stop]
+            literals = array(LITERAL_TYPE, self.literals[first:last])
+            offsets = array(OFFSET_TYPE, [o - first for o in self.offsets[start:stop + 1]])
+            return ClauseBuffer(literals, offsets, self.nv)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("indice de clause hors du tampon")
+        return memoryview(self.literals)[self.offsets[index]:self.offsets[index + 1]]
+
+    def clause(self, index):
+        return self[index].tolist()
+
+    def tolist(self):
+        """Clauses en listes Python (pysat.formula.CNF, comparaisons)"""
+        literals, offsets = self.literals, self.offsets
+        return [literals[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+
+    def to_cnf(self):
+        from pysat.formula import CNF
+        cnf = CNF()
+        cnf.clauses = self.tolist()
+        cnf.nv = self.nv
+        return cnf
+
+    def __eq__(self, other):
+        if not isinstance(other, ClauseBuffer):
+            return NotImplemented
+        return (len(self) == len(other) and self.nv == other.nv
+                and self.digest() == other.digest())
+
+    __hash__ = None
+
+    def nbytes(self):
+        """Taille des deux tableaux, en octets"""
+        return (len(self.literals) * self.literals.itemsize
+                + len(self.offsets) * self.offsets.itemsize)
+
+    def digest(self):
+        """Empreinte SHA-256 de la formule, calculée sur le tampon sans copie"""
+        first, last = self.offsets[0], self.offsets[-1]
+        h = hashlib.sha256()
+        h.update(memoryview(self.literals)[first:last].cast('B'))
+        # Décalages relatifs au début : un tampon extrait par tranche a la
+        # même empreinte que la formule équivalente construite directement
+        if first:
+            h.update(array(OFFSET_TYPE, [o - first for o in self.offsets]).tobytes())
+        else:
+            h.update(memoryview(self.offsets).cast('B'))
+        return h.hexdigest()
+
+    # Export DIMACS
+
+    def dimacs(self, start=0, stop=None):
+        """Lignes DIMACS des clauses start <= i < stop (format de write_cnf.save_cnf_file)"""
+        stop = len(self) if stop is None else stop
+        view, offsets = memoryview(self.literals), self.offsets
+        return "".join([" ".join(map(str, view[offsets[i]:offsets[i + 1]])) + " 0\n"
+                        for i in range(start, stop)])
+
+    def write_dimacs(self, filename):
+        """Écrit la formule au format DIMACS, par paquets de clauses"""
+        with open(filename, "w") as f:
+            f.write(f"p cnf {self.nv} {len(self)}\n")
+            for start in range(0, len(self), DIMACS_CHUNK):
+                f.write(self.dimacs(start, min(start + DIMACS_CHUNK, len(self))))
+
+    # Mémoire partagée
+
+    def share(self):
+        """Copie la formule en mémoire partagée (SharedClauses, à fermer)"""
+        shared = SharedClauses.allocate(self.n_literals, len(self), self.nv)
+        first = self.offsets[0]
+        shared.literals[:] = memoryview(self.literals)[first:self.offsets[-1]]
+        if first:
+            shared.offsets[:] = array(OFFSET_TYPE, [o - first for o in self.offsets])
+        else:
+            shared.offsets[:] = memoryview(self.offsets)
+        return shared
+
+
+def _shared_memory():
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise RuntimeError("mémoire partagée indisponible (Python 3.8 ou plus requis)")
+    return shared_memory
+
+
+class SharedClauses:
+    """Tampon de clauses en mémoire partagée entre processus
+
+    Le processus qui l'alloue en est propriétaire : close() libère alors le
+    segment. Les autres processus l'ouvrent avec attach(handle) ; handle est
+    un tuple sérialisable transmis aux tâches du pool.
+    """
+
+    def __init__(self, segment, n_literals, n_clauses, nv, owner):
+        self.segment = segment
+        self.n_literals, self.n_clauses, self.nv = n_literals, n_clauses, nv
+        self.owner = owner
+        size = n_literals * array(LITERAL_TYPE).itemsize
+        self.literals = segment.buf[:size].cast(LITERAL_TYPE)
+        self.offsets = segment.buf[size:size + (n_clauses + 1) * array(OFFSET_TYPE).itemsize].cast(OFFSET_TYPE)
+
+    @classmethod
+    def allocate(cls, n_literals, n_clauses, nv=0):
+        size = (n_literals * array(LITERAL_TYPE).itemsize
+                + (n_clauses + 1) * array(OFFSET_TYPE).itemsize)
+        segment = _shared_memory().SharedMemory(create=True, size=max(size, 1))
+        return cls(segment, n_literals, n_clauses, nv, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        name, n_literals, n_clauses, nv = handle
+        segment = _shared_memory().SharedMemory(name=name)
+        return cls(segment, n_literals, n_clauses, nv, owner=False)
+
+    @property
+    def handle(self):
+        return (self.segment.name, self.n_literals, self.n_clauses, self.nv)
+
+    @property
+    def buffer(self):
+        """ClauseBuffer en lecture seule sur le segment (sans copie)"""
+        return ClauseBuffer(self.literals, self.offsets, self.nv)
+
+    def copy(self):
+        """ClauseBuffer ordinaire : une copie mémoire par tableau"""
+        return ClauseBuffer(array(LITERAL_TYPE, self.literals), array(OFFSET_TYPE, self.offsets), self.nv)
+
+    def close(self):
+        self.literals.release()
+        self.offsets.release()
+        self.segment.close()
+        if self.owner:
+            self.segment.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def list_bytes(clauses):
+    """Mémoire occupée par des clauses en listes Python (listes et entiers)"""
+    seen, total = set(), sys.getsizeof(clauses)
+    for clause in clauses:
+        total += sys.getsizeof(clause)
+        for lit in clause:
+            # Les petits entiers sont partagés par l'interpréteur
+            if id(lit) not in seen:
+                seen.add(id(lit))
+                total += sys.getsizeof(lit)
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Formule CNF en tampon d'entiers 32 bits")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problem", help="Fichier problème PDDL")
+    parser.add_argument("--horizon", type=int, default=100)
+    args = parser.parse_args()
+
+    from pysat.solvers import Minisat22
+    from encodeur_sat import encode_task, encode_task_buffer
+    from grounding import load_task
+
+    task = load_task(args.domain, args.problem)
+    start = time.perf_counter()
+    cnf, _ = encode_task(task, args.horizon)
+    list_time = time.perf_counter() - start
+    start = time.perf_counter()
+    buffer, _ = encode_task_buffer(task, args.horizon)
+    buffer_time = time.perf_counter() - start
+
+    literals = buffer.n_literals
+    as_lists = list_bytes(cnf.clauses)
+    print(f"{task} - horizon {args.horizon}: {len(buffer)} clauses, {literals} littéraux")
+    print(f"Listes Python: {as_lists/2**20:8.1f} Mio ({as_lists/literals:5.1f} o/littéral), "
+          f"encodage {list_time*1000:.0f} ms")
+    print(f"Tampon int32:  {buffer.nbytes()/2**20:8.1f} Mio ({buffer.nbytes()/literals:5.1f} o/littéral), "
+          f"encodage {buffer_time*1000:.0f} ms")
+
+    for name, clauses in (("listes", cnf.clauses), ("tampon", buffer)):
+        start = time.perf_counter()
+        with Minisat22(bootstrap_with=clauses):
+            pass
+        print(f"Construction du solveur ({name}): {(time.perf_counter() - start)*1000:.0f} ms")
+
+    identical = buffer.tolist() == cnf.clauses and buffer.nv == cnf.nv
+    print(f"Empreinte: {buffer.digest()[:16]}")
+    print("Formule identique à encode_task" if identical else "Formule différente !")
+    sys.exit(0 if identical else 1)
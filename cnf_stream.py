@@ -0,0 +1,284 @@
+"""
+Chargement des fichiers CNF volumineux en mémoire bornée
+
+run_solver.load_cnf_file construit la liste de toutes les clauses avant de
+créer le solveur : le pic mémoire vaut plusieurs fois la taille du fichier.
+Ici, les clauses sont données au solveur par paquets, sans jamais
+matérialiser la formule entière :
+
+- fichier DIMACS : projeté en mémoire (mmap) et découpé en blocs de lignes
+  complètes ; chaque bloc est converti d'un coup en entiers, puis en
+  paquet de clauses (ClauseBuffer) ajouté au solveur ;
+- fichier binaire associé (problem.cnf.bin) : les deux tableaux d'un
+  ClauseBuffer (littéraux int32, décalages int64) précédés d'un en-tête.
+  Il est lu par mmap sans aucune conversion : chaque paquet est une vue
+  sur le fichier.
+
+Le fichier binaire est utilisé quand il est plus récent que le fichier
+DIMACS et annonce le même nombre de clauses ; write_cnf.py --sidecar
+l'écrit avec problem.cnf, et `python cnf_stream.py problem.cnf --sidecar`
+le produit depuis un fichier DIMACS existant, lui aussi par blocs.
+
+Utilisation :
+    solver = Minisat22()
+    stats = load_into_solver(solver, "problem.cnf")
+    python cnf_stream.py problem.cnf --sidecar
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+import metrics
+from clause_buffer import LITERAL_TYPE, OFFSET_TYPE, ClauseBuffer
+
+# Taille des blocs lus dans un fichier DIMACS
+CHUNK_BYTES = 1 << 20
+# Clauses par paquet lu dans un fichier binaire
+CHUNK_CLAUSES = 1 << 20
+
+# En-tête du fichier binaire : signature, littéraux, clauses, variables
+SIDECAR_SUFFIX = ".bin"
+SIDECAR_MAGIC = b"CNFBUF01"
+SIDECAR_HEADER = struct.Struct("<8sqqq")
+
+
+def sidecar_path(filename):
+    return filename + SIDECAR_SUFFIX
+
+
+def dimacs_header(filename):
+    """(variables, clauses) de la ligne « p cnf », ou None"""
+    with open(filename, "rb") as f:
+        for line in f:
+            if line.startswith(b"p"):
+                fields = line.split()
+                return int(fields[2]), int(fields[3])
+            if not line.startswith(b"c"):
+                return None
+    return None
+
+
+def _parse_block(block, buffer, pending=()):
+    """Ajoute à buffer les clauses complètes d'un bloc DIMACS ; retourne le reste
+
+    pending : littéraux d'une clause commencée dans le bloc précédent. Le
+    reste (clause pas encore terminée par 0) est rendu de la même façon.
+    """
+    if b"c" in block or b"p" in block or b"%" in block:
+        block = b"\n".join(line for line in block.split(b"\n")
+                           if not line.lstrip().startswith((b"c", b"p", b"%")))
+    ints = array(LITERAL_TYPE, pending)
+    ints.extend(map(int, block.split()))
+    literals, offsets = buffer.literals, buffer.offsets
+    start, n = 0, len(ints)
+    while start < n:
+        try:
+            end = ints.index(0, start)
+        except ValueError:
+            break
+        if end > start:
+            literals.extend(ints[start:end])
+            offsets.append(len(literals))
+        start = end + 1
+    return ints[start:].tolist()
+
+
+def iter_dimacs(filename, chunk_bytes=CHUNK_BYTES):
+    """Paquets de clauses (ClauseBuffer) d'un fichier DIMACS, lus par mmap"""
+    header = dimacs_header(filename)
+    nv = header[0] if header else 0
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            pending, position, size = [], 0, len(data)
+            while position < size:
+                stop = min(position + chunk_bytes, size)
+                if stop < size:
+                    # Bloc de lignes complètes : coupe après le dernier saut de ligne
+                    newline = data.rfind(b"\n", position, stop)
+                    stop = newline + 1 if newline >= position else data.find(b"\n", stop) + 1 or size
+                buffer = ClauseBuffer(nv=nv)
+                rest = _parse_block(data[position:stop], buffer, pending)
+                pending = rest
+                position = stop
+                if len(buffer):
+                    yield buffer
+            if pending:
+                raise ValueError(f"{filename}: dernière clause non terminée par 0")
+
+
+def write_sidecar(clauses, filename, nv=None):
+    """Écrit le fichier binaire d'une formule (ClauseBuffer ou paquets de ClauseBuffer)
+
+    Les littéraux sont écrits au fil des paquets, les décalages dans un
+    fichier temporaire recopié à la fin : la formule n'est jamais entière en
+    mémoire. Retourne (littéraux, clauses).
+    """
+    chunks = [clauses] if isinstance(clauses, ClauseBuffer) else clauses
+    temporary = filename + ".offsets"
+    n_literals = n_clauses = max_var = 0
+    with open(filename, "wb") as out, open(temporary, "wb") as offsets_file:
+        out.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, 0, 0, 0))
+        offsets_file.write(array(OFFSET_TYPE, [0]).tobytes())
+        for chunk in chunks:
+            first, last = chunk.offsets[0], chunk.offsets[-1]
+            out.write(memoryview(chunk.literals)[first:last].cast("B"))
+            offsets_file.write(array(OFFSET_TYPE, [n_literals + o - first
+                                                   for o in chunk.offsets[1:]]).tobytes())
+            n_literals += last - first
+            n_clauses += len(chunk)
+            max_var = max(max_var, chunk.nv)
+    with open(filename, "r+b") as out, open(temporary, "rb") as offsets_file:
+        out.seek(0, os.SEEK_END)
+        while True:
+            block = offsets_file.read(CHUNK_BYTES)
+            if not block:
+                break
+            out.write(block)
+        out.seek(0)
+        out.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, n_literals, n_clauses,
+                                      max_var if nv is None else nv))
+    os.remove(temporary)
+    return n_literals, n_clauses
+
+
+def sidecar_header(filename):
+    """(littéraux, clauses, variables) du fichier binaire, ou None s'il est invalide"""
+    with open(filename, "rb") as f:
+        raw = f.read(SIDECAR_HEADER.size)
+    if len(raw) < SIDECAR_HEADER.size:
+        return None
+    magic, n_literals, n_clauses, nv = SIDECAR_HEADER.unpack(raw)
+    if magic != SIDECAR_MAGIC:
+        return None
+    expected = (SIDECAR_HEADER.size + n_literals * array(LITERAL_TYPE).itemsize
+                + (n_clauses + 1) * array(OFFSET_TYPE).itemsize)
+    return (n_literals, n_clauses, nv) if os.path.getsize(filename) == expected else None
+
+
+def iter_sidecar(filename, chunk_clauses=CHUNK_CLAUSES):
+    """Paquets de clauses d'un fichier binaire : vues sur le fichier projeté
+
+    Chaque paquet n'est valable que jusqu'au paquet suivant.
+    """
+    header = sidecar_header(filename)
+    if header is None:
+        raise ValueError(f"{filename}: fichier binaire de clauses invalide")
+    n_literals, n_clauses, nv = header
+    if n_clauses == 0:
+        return
+    literal_size = array(LITERAL_TYPE).itemsize
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        start = SIDECAR_HEADER.size
+        literals = view[start:start + n_literals * literal_size].cast(LITERAL_TYPE)
+        offsets = view[start + n_literals * literal_size:].cast(OFFSET_TYPE)
+        try:
+            for first in range(0, n_clauses, chunk_clauses):
+                chunk_offsets = offsets[first:min(first + chunk_clauses, n_clauses) + 1]
+                yield ClauseBuffer(literals, chunk_offsets, nv)
+                chunk_offsets.release()
+        finally:
+            literals.release()
+            offsets.release()
+            view.release()
+
+
+def sidecar_is_fresh(filename):
+    """Le fichier binaire associé existe, est plus récent et a le même nombre de clauses"""
+    sidecar = sidecar_path(filename)
+    if not os.path.exists(sidecar) or os.path.getmtime(sidecar) < os.path.getmtime(filename):
+        return False
+    header, dimacs = sidecar_header(sidecar), dimacs_header(filename)
+    return header is not None and dimacs is not None and header[1] == dimacs[1]
+
+
+def iter_clauses(filename, use_sidecar=True):
+    """(source, paquets) : fichier binaire à jour s'il existe, sinon DIMACS"""
+    if use_sidecar and sidecar_is_fresh(filename):
+        return "binaire", iter_sidecar(sidecar_path(filename))
+    return "dimacs", iter_dimacs(filename)
+
+
+@metrics.timed("load")
+def load_into_solver(solver, filename, use_sidecar=True):
+    """Ajoute au solveur toutes les clauses du fichier, paquet par paquet
+
+    Retourne les statistiques du chargement : source, clauses, variables,
+    paquets et temps.
+    """
+    start = time.perf_counter()
+    source, chunks = iter_clauses(filename, use_sidecar)
+    stats = {'source': source, 'clauses': 0, 'variables': 0, 'chunks': 0}
+    for chunk in chunks:
+        solver.append_formula(chunk)
+        stats['clauses'] += len(chunk)
+        stats['variables'] = max(stats['variables'], chunk.nv)
+        stats['chunks'] += 1
+    stats['time'] = time.perf_counter() - start
+    metrics.count("load.clauses", stats['clauses'])
+    return stats
+
+
+def read_buffer(filename, use_sidecar=True):
+    """Formule entière en un ClauseBuffer (compact, pour l'énumération de plans)"""
+    buffer = ClauseBuffer()
+    for chunk in iter_clauses(filename, use_sidecar)[1]:
+        buffer.extend(chunk)
+    return buffer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chargement par paquets des fichiers CNF volumineux")
+    parser.add_argument("cnf", nargs="?", default="problem.cnf", help="Fichier DIMACS (défaut: problem.cnf)")
+    parser.add_argument("--sidecar", action="store_true",
+                        help="Écrit le fichier binaire associé (CNF.bin) depuis le fichier DIMACS")
+    parser.add_argument("--compare", action="store_true",
+                        help="Compare temps et pic mémoire avec run_solver.load_cnf_file")
+    args = parser.parse_args()
+
+    if args.sidecar:
+        start = time.perf_counter()
+        n_literals, n_clauses = write_sidecar(iter_dimacs(args.cnf), sidecar_path(args.cnf),
+                                              nv=(dimacs_header(args.cnf) or (0, 0))[0])
+        print(f"{sidecar_path(args.cnf)}: {n_clauses} clauses, {n_literals} littéraux "
+              f"({os.path.getsize(sidecar_path(args.cnf))/2**20:.1f} Mio, "
+              f"{(time.perf_counter() - start)*1000:.0f} ms)")
+
+    import tracemalloc
+    from pysat.solvers import Minisat22
+
+    def measure(label, load):
+        # Temps sans suivi des allocations, pic Python mesuré à part
+        start = time.perf_counter()
+        with Minisat22() as solver:
+            count = load(solver)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        with Minisat22() as solver:
+            load(solver)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<31} {count:>9} clauses {elapsed*1000:>8.0f} ms  pic Python {peak/2**20:8.1f} Mio")
+
+    print(f"{args.cnf}: {os.path.getsize(args.cnf)/2**20:.1f} Mio")
+    measure("DIMACS par paquets (mmap)",
+            lambda solver: load_into_solver(solver, args.cnf, use_sidecar=False)['clauses'])
+    if sidecar_is_fresh(args.cnf):
+        measure("Fichier binaire (mmap)",
+                lambda solver: load_into_solver(solver, args.cnf)['clauses'])
+    if args.compare:
+        from run_solver import load_cnf_file
+
+        def load_all(solver):
+            clauses = load_cnf_file(args.cnf)
+            solver.append_formula(clauses)
+            return len(clauses)
+        measure("Liste complète (load_cnf_file)", load_all)
+    sys.exit(0)
@@ -1,97 +1,110 @@
 # Comparaison de performances entre différents planificateurs
-import subprocess
+import argparse
 import time
-import os
 import sys
-from encodeur_sat import encode_gripper
-from pysat.solvers import Minisat22
+import metrics
+from grounding import load_task
+from sat_planner import plan_task
+from solver_budget import add_arguments, budget_from_args
+from search_planners import (astar_search, breadth_first_search, depth_first_search,
+                             greedy_best_first_search, make_heuristic)
+from state_space import state_space_of
+from solver_stats import STAT_KEYS, STAT_LABELS, accumulate, empty_stats, with_rates
 
 class PlannerComparison:
     """Classe pour comparer les performances de différents planificateurs"""
     
-    def __init__(self):
+    def __init__(self, domain_file="domain.pddl", problem_file="problem.pddl",
+                 budget=None, deadline=None):
         self.results = {}
-        self.domain_file = "domain.pddl"
-        self.problem_file = "problem.pddl"
+        self.domain_file = domain_file
+        self.problem_file = problem_file
+        # Budget par appel au solveur et échéance du planificateur SAT
+        # (solver_budget.py) : avec une échéance, le meilleur plan trouvé
+        # est retourné même s'il n'est pas prouvé optimal
+        self.budget = budget
+        self.deadline = deadline
+        self._task = None
+    
+    @property
+    def task(self):
+        """Tâche instanciée, partagée par tous les planificateurs"""
+        if self._task is None:
+            start = time.perf_counter()
+            self._task = load_task(self.domain_file, self.problem_file)
+            self.ground_time = time.perf_counter() - start
+        return self._task
+    
+    def check_plan(self, plan):
+        """Rejoue le plan sur la tâche (opérations sur les bits) : un plan
+        invalide compte comme un échec du planificateur"""
+        valid, failed_step = state_space_of(self.task).validate(plan)
+        if not valid:
+            where = f" (action {failed_step + 1} inapplicable)" if failed_step is not None else ""
+            print(f"Plan invalide{where}")
+        return valid
     
     def run_sat_planner(self):
         
         print("Test du planificateur SAT...")
         
         try:
-            start_time = time.time()
+            # Recherche d'horizon : chaque phase est cumulée sur tous les appels
+            start = time.perf_counter()
+            result = plan_task(self.task, max_horizon=40, budget=self.budget,
+                               deadline=self.deadline, anytime=self.deadline is not None)
+            elapsed = time.perf_counter() - start
             
-            cnf, var_map = encode_gripper(horizon=4)
+            phases = {phase: sum(call[phase + '_time'] for call in result['calls'])
+                      for phase in ('encode', 'build', 'solve')}
+            phases['bound'] = result['bound_time']
+            search = empty_stats()
+            for call in result['calls']:
+                accumulate(search, call['solver_stats'])
+            search = with_rates(search, phases['solve'])
             
-            with Minisat22(bootstrap_with=cnf.clauses) as solver:
-                if solver.solve():
-                    end_time = time.time()
-                    
-                    model = solver.get_model()
-                    rev_map = {v: k for k, v in var_map.items()}
-                    actions = []
-                    
-                    for v in model:
-                        if v > 0 and v in rev_map:
-                            typ, content, t = rev_map[v]
-                            if typ == "act":
-                                actions.append((t, content))
-                    
-                    return {
-                        'success': True,
-                        'time': end_time - start_time,
-                        'makespan': len(actions),
-                        'actions': len(actions)
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'time': time.time() - start_time,
-                        'makespan': float('inf'),
-                        'actions': 0
-                    }
+            plan = result['plan']
+            return {
+                'success': plan is not None and self.check_plan(plan),
+                'time': elapsed,
+                'makespan': len(plan) if plan is not None else float('inf'),
+                'actions': len(plan) if plan is not None else 0,
+                'solver_calls': len(result['calls']),
+                'status': result['status'],
+                'optimal': result['optimal'],
+                'saved_calls': result['saved_calls'],
+                'lower_bound': result['lower_bound'],
+                'phases': phases,
+                'solver_stats': search
+            }
                     
         except Exception as e:
             print(f"Erreur planificateur SAT: {e}")
             return {'success': False, 'time': float('inf'), 'makespan': float('inf'), 'actions': 0}
     
-    def simulate_hsp_planner(self):
-        """Simule les résultats d'HSP (Heuristic Search Planner)"""
-        print("Simulation du planificateur HSP...")
-        
-        time.sleep(0.01)
-        
-        return {
-            'success': True,
-            'time': 0.015,
-            'makespan': 3,
-            'actions': 3
-        }
-    
-    def simulate_breadth_first_search(self):
- 
-        print("Simulation du planificateur Breadth-First...")
-        
-        time.sleep(0.02)
-        
-        return {
-            'success': True,
-            'time': 0.025,
-            'makespan': 3,
-            'actions': 3
-        }
-    
-    def simulate_depth_first_search(self):
-
-        print("Simulation du planificateur Depth-First...")
-        
-        time.sleep(0.008)
+    def run_search_planner(self, label, search_func, heuristic=None):
+        """Recherche explicite dans l'espace d'états (search_planners.py)"""
+        print(f"Test du planificateur {label}...")
         
+        if heuristic is None:
+            result = search_func(self.task)
+        else:
+            result = search_func(self.task, make_heuristic(self.task, heuristic))
+        plan = result['plan']
+        extra = {}
+        if 'evaluations' in result:
+            extra = {key: result[key] for key in ('heuristic', 'evaluations', 'computed',
+                                                  'heuristic_time', 'evaluations_per_sec')}
         return {
-            'success': True,
-            'time': 0.012,
-            'makespan': 4,
-            'actions': 4
+            'success': plan is not None and self.check_plan(plan),
+            'time': result['time'],
+            'makespan': len(plan) if plan is not None else float('inf'),
+            'actions': len(plan) if plan is not None else 0,
+            'expanded': result['expanded'],
+            'generated': result['generated'],
+            'duplicates': result['duplicates'],
+            'nodes_per_sec': result['nodes_per_sec'],
+            **extra
         }
     
     def run_all_planners(self):
@@ -101,15 +114,21 @@ class PlannerComparison:
         
         planners = {
             'SAT': self.run_sat_planner,
-            'HSP': self.simulate_hsp_planner,
-            'BreadthFirst': self.simulate_breadth_first_search,
-            'DepthFirst': self.simulate_depth_first_search
+            'BreadthFirst': lambda: self.run_search_planner('Breadth-First', breadth_first_search),
+            'DepthFirst': lambda: self.run_search_planner('Depth-First', depth_first_search),
+            # HSP : meilleur d'abord glouton guidé par h_add
+            'HSP': lambda: self.run_search_planner('HSP (GBFS, h_add)', greedy_best_first_search,
+                                                   'hadd'),
+            'GreedyBestFirst': lambda: self.run_search_planner('Greedy Best-First (h_FF)',
+                                                               greedy_best_first_search, 'hff'),
+            'AStar': lambda: self.run_search_planner('A* (h_max)', astar_search, 'hmax')
         }
         
         # Lancement de chaque planificateur
         for name, planner_func in planners.items():
             try:
-                result = planner_func()
+                with metrics.phase(name):
+                    result = planner_func()
                 self.results[name] = result
                 
                 if result['success']:
@@ -131,9 +150,10 @@ class PlannerComparison:
             return
         
         print(f"\nTABLEAU DE COMPARAISON")
-        print("=" * 50)
-        print(f"{'Planificateur':<15} {'Temps (s)':<12} {'Actions':<10} {'Statut':<10}")
-        print("-" * 50)
+        print("=" * 86)
+        print(f"{'Planificateur':<16} {'Temps (s)':<12} {'Actions':<10} {'Statut':<10} "
+              f"{'Conflits':<10} {'Développés':<12} {'Nœuds/s':<10}")
+        print("-" * 86)
         
         # Tri par temps d'exécution
         sorted_results = sorted(self.results.items(), key=lambda x: x[1]['time'] if x[1]['success'] else float('inf'))
@@ -148,7 +168,11 @@ class PlannerComparison:
                 time_str = "Timeout"
                 actions_str = "N/A"
             
-            print(f"{name:<15} {time_str:<12} {actions_str:<10} {status:<10}")
+            conflicts = str(result['solver_stats']['conflicts']) if 'solver_stats' in result else "-"
+            expanded = str(result['expanded']) if 'expanded' in result else "-"
+            rate = f"{result['nodes_per_sec']:.0f}" if 'nodes_per_sec' in result else "-"
+            print(f"{name:<16} {time_str:<12} {actions_str:<10} {status:<10} "
+                  f"{conflicts:<10} {expanded:<12} {rate:<10}")
 
 
     """Sauvegarde un rapport détaillé"""
@@ -156,7 +180,9 @@ class PlannerComparison:
         
         with open('planners_comparison.txt', 'w', encoding='utf-8') as f:
             f.write("COMPARAISON DES PLANIFICATEURS\n")
-            f.write("Domaine Gripper\n")
+            f.write(f"Domaine: {self.domain_file}, problème: {self.problem_file}\n")
+            f.write(f"Tâche instanciée: {len(self.task.facts)} faits, {len(self.task.actions)} actions "
+                    f"({self.ground_time*1000:.3f} ms, non compté dans les temps)\n")
             f.write("=" * 40 + "\n\n")
             
             f.write("RÉSULTATS DÉTAILLÉS\n")
@@ -167,7 +193,33 @@ class PlannerComparison:
                 f.write(f"  Succès: {'Oui' if result['success'] else 'Non'}\n")
                 f.write(f"  Temps: {result['time']:.6f} secondes\n")
                 f.write(f"  Actions: {result['actions']}\n")
-                f.write(f"  Makespan: {result['makespan']}\n\n")
+                f.write(f"  Makespan: {result['makespan']}\n")
+                if 'phases' in result:
+                    detail = ", ".join(f"{phase} {seconds*1000:.3f} ms"
+                                       for phase, seconds in result['phases'].items())
+                    f.write(f"  Phases: {detail}\n")
+                if 'solver_stats' in result:
+                    search = result['solver_stats']
+                    for key in STAT_KEYS:
+                        f.write(f"  {STAT_LABELS[key]}: {search[key]}\n")
+                    f.write(f"  Conflits/s: {search['conflicts_per_sec']:.0f}\n")
+                    f.write(f"  Propagations/s: {search['propagations_per_sec']:.0f}\n")
+                if 'optimal' in result:
+                    f.write(f"  Statut: {result['status']}, "
+                            f"{'optimal' if result['optimal'] else 'non prouvé optimal'}\n")
+                if 'solver_calls' in result:
+                    f.write(f"  Appels au solveur: {result['solver_calls']}"
+                            f" ({result['saved_calls']} évités, borne inférieure {result['lower_bound']})\n")
+                if 'expanded' in result:
+                    f.write(f"  Nœuds développés: {result['expanded']}\n")
+                    f.write(f"  Nœuds générés: {result['generated']}\n")
+                    f.write(f"  Doublons écartés: {result['duplicates']}\n")
+                    f.write(f"  Nœuds/s: {result['nodes_per_sec']:.0f}\n")
+                if 'evaluations' in result:
+                    f.write(f"  Heuristique: {result['heuristic']}, {result['computed']} évaluations "
+                            f"({result['heuristic_time']*1000:.3f} ms, "
+                            f"{result['evaluations_per_sec']:.0f} évaluations/s)\n")
+                f.write("\n")
             
             # Analyse
             f.write("ANALYSE\n")
@@ -188,8 +240,19 @@ class PlannerComparison:
         print("Rapport détaillé sauvegardé: planners_comparison.txt")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparaison des planificateurs")
+    parser.add_argument("--domain", default="domain.pddl", help="Fichier domaine PDDL")
+    parser.add_argument("--problem", default="problem.pddl", help="Fichier problème PDDL")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDES",
+                        help="Échéance du planificateur SAT (mode anytime)")
+    add_arguments(parser)
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "compare_planners")
+
     # Lancement de la comparaison
-    comparison = PlannerComparison()
+    comparison = PlannerComparison(args.domain, args.problem,
+                                   budget=budget_from_args(args), deadline=args.deadline)
     results = comparison.run_all_planners()
     
     if results:
@@ -197,4 +260,6 @@ if __name__ == "__main__":
         comparison.save_detailed_report()
         print("\nComparaison terminée!")
     else:
-        print("Aucun résultat de comparaison")
\ No newline at end of file
+        print("Aucun résultat de comparaison")
+
+    metrics.finish(args)
@@ -0,0 +1,35 @@
+# Décodage d'un modèle SAT en plan
+#
+# Ce module regroupe la logique de lecture d'un modèle renvoyé par le solveur :
+# on ne garde que les variables d'action vraies, triées par instant, pour
+# reconstruire le plan séquentiel (plan_ir.py : étapes PlanStep, objet Plan).
+
+import metrics
+from plan_ir import Plan, PlanStep, format_action  # noqa: F401 (format_action réexporté)
+
+
+@metrics.timed("decode")
+def decode_actions(model, var_map=None, rev_map=None):
+    """Extrait la liste triée des actions PlanStep(t, action) vraies dans le modèle"""
+    if rev_map is None:
+        rev_map = {v: k for k, v in var_map.items()}
+
+    actions = []
+    for v in model:
+        if v > 0 and v in rev_map:
+            typ, content, t = rev_map[v]
+            if typ == "act":
+                actions.append(PlanStep(t, content))
+
+    actions.sort()
+    return actions
+
+
+def decode_plan(model, var_map=None, rev_map=None, task=None, horizon=None):
+    """Plan (plan_ir.Plan) du modèle, avec la tâche et l'horizon de la formule"""
+    return Plan(decode_actions(model, var_map, rev_map), task, horizon)
+
+
+def format_plan_lines(actions):
+    """Lignes du plan au format de plan_output.txt"""
+    return Plan(actions).lines()
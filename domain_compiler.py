@@ -0,0 +1,388 @@
+"""
+Compilation des schémas d'action en gabarits de clauses
+
+L'encodage direct d'une tâche redérive, pour chaque action et à chaque
+instant, les clauses de préconditions, d'effets et de cadre. Ce travail est
+fait ici une seule fois, au niveau où il cesse de changer :
+
+1. domaine : chaque schéma PDDL devient un gabarit de clauses paramétré
+   (rôle de chaque littéral : action, fait à t, fait à t+1 ; atomes exprimés
+   sur les positions des paramètres). Le cache est indexé par le contenu du
+   domaine : tous les problèmes d'un même domaine le partagent.
+2. tâche : les gabarits sont instanciés sur les objets du problème pour
+   former le bloc de clauses d'un instant, où chaque littéral est un couple
+   d'entiers (base, pas) : sa valeur à l'instant t est base + pas * t.
+3. horizon : chaque instant est le bloc décalé de t pas ; seule la base des
+   variables d'action dépend de l'horizon.
+
+La numérotation des variables et l'ordre des clauses sont ceux de
+l'encodage direct : la formule produite est identique, clause pour clause
+(vérifié par --check).
+
+Utilisation :
+    python domain_compiler.py domains/gripper_family.pddl problems/generated/*.pddl
+    python domain_compiler.py domains/gripper_family.pddl problems/generated/*.pddl --check
+"""
+
+import argparse
+import sys
+import time
+import weakref
+from collections import namedtuple
+
+from pysat.formula import CNF
+
+import metrics
+from clause_buffer import ClauseBuffer
+
+# Rôles des littéraux d'un gabarit
+ACT, NOW, NEXT = "act", "now", "next"
+
+# Atome d'un gabarit : (prédicat, arguments), où un argument entier est la
+# position d'un paramètre du schéma et une chaîne une constante du domaine.
+# clauses : une entrée (groupe, signe, rôle) par famille de clauses binaires
+# -A v (signe)fait, une clause par fait instancié du groupe
+SchemaTemplate = namedtuple('SchemaTemplate', 'name arity pre add delete clauses')
+
+# Préconditions à t, ajouts et négation des retraits à t+1
+ACTION_CLAUSES = (('pre', 1, NOW), ('add', 1, NEXT), ('delete', -1, NEXT))
+
+# « Au plus une action par instant » : clauses deux à deux (n(n-1)/2) jusqu'à
+# ce nombre d'actions, compteur séquentiel au-delà (3n - 4 clauses et n - 1
+# variables auxiliaires par instant). Les clauses deux à deux donnent des
+# preuves d'insatisfiabilité plus rapides (Gripper IPC à 6 balles : 19 s
+# contre 30 s) ; au-delà de 128 actions, leur nombre domine la formule
+# (Gripper IPC à 22 balles, horizon 65 : 1 099 329 clauses, 109 834 avec
+# le compteur).
+PAIRWISE_AMO_MAX = 128
+
+_DOMAINS = {}
+_BLOCKS = weakref.WeakKeyDictionary()
+
+
+def _atom_template(atom, position):
+    return (atom[0], tuple(position.get(arg, arg) for arg in atom[1:]))
+
+
+def compile_schema(schema, static):
+    """Gabarit de clauses d'un schéma d'action (prédicats statiques exclus)"""
+    position = {name: i for i, (name, _) in enumerate(schema['parameters'])}
+    pre = tuple(_atom_template(a, position) for a in schema['precondition'] if a[0] not in static)
+    add = tuple(_atom_template(a, position) for a in schema['add'])
+    delete = tuple(_atom_template(a, position) for a in schema['delete'])
+    clauses = tuple(entry for entry in ACTION_CLAUSES if {'pre': pre, 'add': add, 'delete': delete}[entry[0]])
+    return SchemaTemplate(schema['name'], len(position), pre, add, delete, clauses)
+
+
+def _fingerprint(domain):
+    return (domain['name'], repr(sorted(domain['predicates'].items())), repr(domain['actions']))
+
+
+class CompiledDomain:
+    """Gabarits de clauses de tous les schémas d'un domaine"""
+
+    def __init__(self, domain):
+        changed = set()
+        for schema in domain['actions']:
+            changed.update(atom[0] for atom in schema['add'])
+            changed.update(atom[0] for atom in schema['delete'])
+        self.name = domain['name']
+        self.static = set(domain['predicates']) - changed
+        self.schemas = {schema['name']: compile_schema(schema, self.static)
+                        for schema in domain['actions']}
+
+    def instantiate(self, task, name):
+        """Groupes de faits et gabarit de clauses d'une action instanciée
+
+        Retourne ({'pre': ..., 'add': ..., 'delete': ...}, clauses du schéma).
+
+        Mêmes règles que grounding.ground : doublons retirés, retraits déjà
+        ajoutés ignorés, retraits de faits inatteignables sans objet.
+        """
+        template = self.schemas[name[0]]
+        args = name[1:]
+        index = task.fact_index
+
+        def ground(atom):
+            predicate, slots = atom
+            return (predicate,) + tuple(args[s] if isinstance(s, int) else s for s in slots)
+
+        pre = tuple(dict.fromkeys(index[ground(a)] for a in template.pre))
+        added = tuple(dict.fromkeys(ground(a) for a in template.add))
+        deleted = [d for d in dict.fromkeys(ground(a) for a in template.delete) if d not in added]
+        groups = {'pre': pre, 'add': tuple(index[a] for a in added),
+                  'delete': tuple(index[d] for d in deleted if d in index)}
+        return groups, template.clauses
+
+    def step_block(self, task):
+        """Bloc de clauses d'un instant de la tâche (mis en cache par tâche)"""
+        block = _BLOCKS.get(task)
+        if block is None:
+            block = StepBlock(task, [self.instantiate(task, action.name) for action in task.actions])
+            _BLOCKS[task] = block
+            metrics.count("compile.blocks")
+        return block
+
+
+def compile_domain(domain):
+    """CompiledDomain d'un domaine analysé (pddl_parser), partagé par contenu"""
+    key = _fingerprint(domain)
+    compiled = _DOMAINS.get(key)
+    if compiled is None:
+        with metrics.phase("compile"):
+            compiled = CompiledDomain(domain)
+        _DOMAINS[key] = compiled
+        metrics.count("compile.domains")
+    return compiled
+
+
+class StepBlock:
+    """Clauses d'un instant t, sous forme de littéraux base + pas * t
+
+    Les variables suivent la numérotation de l'encodage direct : fait f à t
+    = 1 + t * n_facts + f, action a à t = 1 + (horizon + 1) * n_facts
+    + t * width + a, où width = n_actions + n_aux : les variables auxiliaires
+    du compteur séquentiel (au-delà de PAIRWISE_AMO_MAX actions) suivent les
+    actions de chaque instant. Les littéraux d'action portent en plus le
+    signe de leur décalage d'horizon (acts), appliqué une fois par horizon.
+    """
+
+    def __init__(self, task, instances):
+        n_facts = self.n_facts = len(task.facts)
+        n_actions = self.n_actions = len(task.actions)
+        n_aux = self.n_aux = n_actions - 1 if n_actions > PAIRWISE_AMO_MAX else 0
+        width = self.width = n_actions + n_aux
+        bases, strides, acts, spans = [], [], [], []
+
+        def literal(sign, role, index):
+            if role == ACT:
+                bases.append(sign * index)
+                strides.append(sign * width)
+                acts.append(sign)
+            else:
+                bases.append(sign * (1 + index + (n_facts if role == NEXT else 0)))
+                strides.append(sign * n_facts)
+                acts.append(0)
+
+        def clause(literals):
+            start = len(bases)
+            for sign, role, index in literals:
+                literal(sign, role, index)
+            spans.append((start, len(bases)))
+
+        # Préconditions et effets, action par action, selon le gabarit
+        adders = [[] for _ in range(n_facts)]
+        deleters = [[] for _ in range(n_facts)]
+        for a, (groups, template) in enumerate(instances):
+            for group, sign, role in template:
+                for f in groups[group]:
+                    clause([(-1, ACT, a), (sign, role, f)])
+            for f in groups['add']:
+                adders[f].append(a)
+            for f in groups['delete']:
+                deleters[f].append(a)
+
+        # Axiomes de cadre explicatifs
+        for f in range(n_facts):
+            clause([(1, NOW, f), (-1, NEXT, f)] + [(1, ACT, a) for a in adders[f]])
+            clause([(-1, NOW, f), (1, NEXT, f)] + [(1, ACT, a) for a in deleters[f]])
+
+        # Au plus une action par instant
+        if n_aux:
+            # Compteur séquentiel : l'auxiliaire n_actions + i est vrai dès
+            # qu'une des actions 0..i l'est, et interdit alors l'action i + 1
+            clause([(-1, ACT, 0), (1, ACT, n_actions)])
+            for i in range(1, n_actions - 1):
+                clause([(-1, ACT, i), (1, ACT, n_actions + i)])
+                clause([(-1, ACT, n_actions + i - 1), (1, ACT, n_actions + i)])
+                clause([(-1, ACT, i), (-1, ACT, n_actions + i - 1)])
+            clause([(-1, ACT, n_actions - 1), (-1, ACT, n_actions + n_aux - 1)])
+        else:
+            for i in range(n_actions):
+                for j in range(i + 1, n_actions):
+                    clause([(-1, ACT, i), (-1, ACT, j)])
+
+        self.bases, self.strides, self.acts, self.spans = bases, strides, acts, spans
+        self.init = task.init
+        self.goal = task.goal
+        self.facts = task.facts
+        self.action_names = [action.name for action in task.actions]
+
+    def __len__(self):
+        return len(self.spans)
+
+    def clauses(self, horizon):
+        """Toutes les clauses de l'horizon, dans l'ordre de l'encodage direct"""
+        clauses = self.initial_clauses()
+        clauses.extend(self.step_clauses(horizon, 0, horizon))
+        clauses.extend(self.goal_clauses(horizon))
+        return clauses
+
+    def initial_clauses(self):
+        return [[lit] for lit in self.init_literals()]
+
+    def init_literals(self, init=None):
+        """État initial complet à t = 0 (init de la tâche par défaut)
+
+        Sous forme de clauses unitaires dans la formule, ou d'hypothèses
+        (assumptions) pour un solveur partagé par plusieurs problèmes.
+        """
+        init = self.init if init is None else init
+        return [1 + f if f in init else -(1 + f) for f in range(self.n_facts)]
+
+    def step_clauses(self, horizon, start, stop):
+        """Clauses des instants start <= t < stop (tranche indépendante des autres)"""
+        act_start = 1 + (horizon + 1) * self.n_facts
+        bases = [b + s * act_start for b, s in zip(self.bases, self.acts)]
+        strides, spans = self.strides, self.spans
+        clauses = []
+        for t in range(start, stop):
+            values = [b + s * t for b, s in zip(bases, strides)]
+            clauses.extend([values[i:j] for i, j in spans])
+        return clauses
+
+    def step_buffer(self, horizon, start, stop):
+        """Clauses des instants start <= t < stop dans un ClauseBuffer
+
+        Les littéraux d'un instant sont exactement les valeurs décalées du
+        bloc, dans l'ordre : ils sont ajoutés d'un seul tenant, sans liste
+        intermédiaire par clause. nv est celui de la formule entière.
+        """
+        act_start = 1 + (horizon + 1) * self.n_facts
+        bases = [b + s * act_start for b, s in zip(self.bases, self.acts)]
+        strides = self.strides
+        ends = [j for _, j in self.spans]
+        buffer = ClauseBuffer(nv=self.n_vars(horizon))
+        for t in range(start, stop):
+            buffer.extend_flat([b + s * t for b, s in zip(bases, strides)], ends)
+        return buffer
+
+    def encode_buffer(self, horizon):
+        """Formule de l'horizon en ClauseBuffer (mêmes clauses que encode)"""
+        buffer = ClauseBuffer.from_clauses(self.initial_clauses())
+        buffer.extend(self.step_buffer(horizon, 0, horizon))
+        buffer.extend(self.goal_clauses(horizon))
+        buffer.nv = self.n_vars(horizon)
+        return buffer, self.var_map(horizon)
+
+    def goal_clauses(self, horizon):
+        return [[lit] for lit in self.goal_literals(horizon)]
+
+    def goal_literals(self, t, goal=None):
+        """Faits du but (celui de la tâche par défaut) à l'instant t"""
+        goal = self.goal if goal is None else goal
+        return [1 + t * self.n_facts + f for f in goal]
+
+    def n_vars(self, horizon):
+        """Plus grande variable de la formule : dernière action (ou dernier
+        auxiliaire) du dernier instant, toute action ayant au moins un effet"""
+        return (horizon + 1) * self.n_facts + horizon * self.width
+
+    def n_clauses(self, horizon):
+        return self.n_facts + horizon * len(self.spans) + len(self.goal)
+
+    def var_map(self, horizon):
+        """Variables des faits et des actions (les auxiliaires n'y figurent pas)"""
+        n_facts, width = self.n_facts, self.width
+        var_map = {}
+        for t in range(horizon + 1):
+            for f, fact in enumerate(self.facts):
+                var_map[("fact", fact, t)] = 1 + t * n_facts + f
+        act_start = 1 + (horizon + 1) * n_facts
+        for t in range(horizon):
+            for a, name in enumerate(self.action_names):
+                var_map[("act", name, t)] = act_start + t * width + a
+        return var_map
+
+    def encode(self, horizon):
+        cnf = CNF()
+        cnf.clauses = self.clauses(horizon)
+        cnf.nv = self.n_vars(horizon)
+        return cnf, self.var_map(horizon)
+
+
+def step_block(task):
+    """Bloc d'un instant de la tâche, depuis les gabarits de son domaine
+
+    Une tâche construite sans domaine (GroundTask.domain à None) est
+    instanciée directement depuis ses actions.
+    """
+    if task.domain is not None:
+        return compile_domain(task.domain).step_block(task)
+    block = _BLOCKS.get(task)
+    if block is None:
+        block = StepBlock(task, [({'pre': a.pre, 'add': a.add, 'delete': a.delete}, ACTION_CLAUSES)
+                                 for a in task.actions])
+        _BLOCKS[task] = block
+    return block
+
+
+def cache_info():
+    """Nombre de domaines compilés et de blocs de tâches en cache"""
+    return {'domains': len(_DOMAINS), 'blocks': len(_BLOCKS)}
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encodage par gabarits de clauses compilés par domaine")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problems", nargs="+", help="Fichiers problèmes PDDL")
+    parser.add_argument("--horizon", type=int, default=12)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--check", action="store_true",
+                        help="Vérifie que la formule est identique à l'encodage direct")
+    args = parser.parse_args()
+
+    # Le cache est celui du module importé par encodeur_sat, pas de __main__
+    import domain_compiler
+    from encodeur_sat import encode_task, encode_task_direct
+    from grounding import GroundTask, load_task
+
+    print(f"{'Problème':<40} {'Clauses':>8} {'Direct (ms)':>12} {'Gabarits (ms)':>14} "
+          f"{'Bloc (ms)':>10} {'Horizon (ms)':>13}")
+    identical = True
+    for problem in args.problems:
+        task = load_task(args.domain, problem)
+        direct = []
+        for _ in range(args.repetitions):
+            start = time.perf_counter()
+            expected, expected_map = encode_task_direct(task, args.horizon)
+            direct.append(time.perf_counter() - start)
+
+        # Premier encodage : instanciation du bloc de la tâche (le domaine est
+        # compilé au premier problème seulement) ; ensuite, décalages seuls
+        start = time.perf_counter()
+        cnf, var_map = encode_task(task, args.horizon)
+        first = time.perf_counter() - start
+
+        # Instanciation du bloc mesurée seule : le cache est indexé par tâche,
+        # chaque mesure porte donc sur une copie neuve de la tâche
+        compiled = domain_compiler.compile_domain(task.domain)
+        block = []
+        for _ in range(args.repetitions):
+            fresh = GroundTask(task.name, task.facts, task.actions, task.init, task.goal, task.domain)
+            start = time.perf_counter()
+            compiled.step_block(fresh)
+            block.append(time.perf_counter() - start)
+        again = []
+        for _ in range(args.repetitions):
+            start = time.perf_counter()
+            cnf, var_map = encode_task(task, args.horizon)
+            again.append(time.perf_counter() - start)
+
+        if args.check and (cnf.clauses != expected.clauses or cnf.nv != expected.nv
+                           or var_map != expected_map):
+            identical = False
+            print(f"  DIFFÉRENCE pour {problem}")
+        name = problem.rsplit("/", 1)[-1]
+        print(f"{name:<40} {len(cnf.clauses):>8} {_median(direct)*1000:12.2f} "
+              f"{first*1000:14.2f} {_median(block)*1000:10.2f} {_median(again)*1000:13.2f}")
+
+    print(f"\nDomaines compilés: {domain_compiler.cache_info()['domains']}")
+    if args.check:
+        print("Formules identiques à l'encodage direct" if identical else "Formules différentes !")
+        sys.exit(0 if identical else 1)
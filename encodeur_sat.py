@@ -8,7 +8,11 @@ consiste en un robot qui doit déplacer une balle entre différentes pièces.
 
 from pysat.formula import CNF
 
+import metrics
+from domain_compiler import PAIRWISE_AMO_MAX, step_block
 
+
+@metrics.timed("encode")
 def encode_gripper(horizon=4):
 
     # Initialisation de la formule CNF et du compteur de variables
@@ -190,4 +194,134 @@ def encode_gripper(horizon=4):
     # L'objectif du problème Gripper est d'avoir la balle dans roomB à la fin, Cette contrainte force le solveur à trouver un plan qui atteint cet objectif
     cnf.append([var_map[("fact", "at_ball_roomB", horizon)]])
     
-    return cnf, var_map
\ No newline at end of file
+    metrics.count("encode.variables", cnf.nv)
+    metrics.count("encode.clauses", len(cnf.clauses))
+    return cnf, var_map
+
+@metrics.timed("encode")
+def encode_task(task, horizon=4):
+    """Encodage SAT d'une tâche STRIPS instanciée (voir grounding.py)
+
+    Même schéma que encode_gripper, mais dérivé automatiquement des actions
+    instanciées : préconditions, effets, axiomes de cadre explicatifs et au
+    plus une action par instant. Les clés de var_map sont ("fact", fait, t)
+    et ("act", action, t), où fait et action sont les tuples de la tâche.
+
+    Les clauses d'un instant viennent des gabarits compilés une fois par
+    domaine (domain_compiler.py) et sont décalées pour chaque instant.
+    """
+    cnf, var_map = step_block(task).encode(horizon)
+    metrics.count("encode.variables", cnf.nv)
+    metrics.count("encode.clauses", len(cnf.clauses))
+    return cnf, var_map
+
+@metrics.timed("encode")
+def encode_task_buffer(task, horizon=4):
+    """encode_task dans un ClauseBuffer (tampon int32, voir clause_buffer.py)
+
+    Mêmes clauses et même var_map, sans liste Python par clause : c'est la
+    forme utilisée pour construire le solveur et écrire les fichiers DIMACS.
+    """
+    buffer, var_map = step_block(task).encode_buffer(horizon)
+    metrics.count("encode.variables", buffer.nv)
+    metrics.count("encode.clauses", len(buffer))
+    return buffer, var_map
+
+@metrics.timed("encode")
+def encode_transitions(task, horizon=4):
+    """Clauses des instants seules, sans état initial ni but (ClauseBuffer)
+
+    L'état initial et le but sont donnés au solveur comme hypothèses
+    (StepBlock.init_literals, goal_literals) : la même formule sert à tous
+    les problèmes qui ne diffèrent que par ces deux parties (batch_planner.py).
+    """
+    block = step_block(task)
+    buffer = block.step_buffer(horizon, 0, horizon)
+    metrics.count("encode.variables", buffer.nv)
+    metrics.count("encode.clauses", len(buffer))
+    return buffer, block.var_map(horizon)
+
+def encode_task_direct(task, horizon=4):
+    """Encodage de référence de encode_task, clause par clause à chaque instant"""
+    cnf = CNF()
+    var_counter = 1
+    var_map = {}
+
+    n_facts = len(task.facts)
+    n_actions = len(task.actions)
+    # Variables auxiliaires du compteur séquentiel, après les actions de chaque instant
+    n_aux = n_actions - 1 if n_actions > PAIRWISE_AMO_MAX else 0
+
+    # Variables de faits pour chaque instant, puis variables d'actions
+    for t in range(horizon + 1):
+        for fact in task.facts:
+            var_map[("fact", fact, t)] = var_counter
+            var_counter += 1
+
+    for t in range(horizon):
+        for action in task.actions:
+            var_map[("act", action.name, t)] = var_counter
+            var_counter += 1
+        var_counter += n_aux
+
+    def fact_var(f, t):
+        return 1 + t * n_facts + f
+
+    def act_var(a, t):
+        return 1 + (horizon + 1) * n_facts + t * (n_actions + n_aux) + a
+
+    # État initial complet (hypothèse du monde clos)
+    for f in range(n_facts):
+        cnf.append([fact_var(f, 0) if f in task.init else -fact_var(f, 0)])
+
+    # Pour chaque fait, les actions qui l'ajoutent et celles qui le suppriment
+    adders = [[] for _ in range(n_facts)]
+    deleters = [[] for _ in range(n_facts)]
+    for a, action in enumerate(task.actions):
+        for f in action.add:
+            adders[f].append(a)
+        for f in action.delete:
+            deleters[f].append(a)
+
+    for t in range(horizon):
+        for a, action in enumerate(task.actions):
+            act = act_var(a, t)
+            # Préconditions à t et effets à t+1
+            for f in action.pre:
+                cnf.append([-act, fact_var(f, t)])
+            for f in action.add:
+                cnf.append([-act, fact_var(f, t + 1)])
+            for f in action.delete:
+                cnf.append([-act, -fact_var(f, t + 1)])
+
+        # Axiomes de cadre explicatifs : un fait ne change de valeur que si
+        # une action qui l'ajoute (ou le supprime) est exécutée
+        for f in range(n_facts):
+            cnf.append([fact_var(f, t), -fact_var(f, t + 1)]
+                       + [act_var(a, t) for a in adders[f]])
+            cnf.append([-fact_var(f, t), fact_var(f, t + 1)]
+                       + [act_var(a, t) for a in deleters[f]])
+
+        # Au plus une action par instant
+        acts = [act_var(a, t) for a in range(n_actions)]
+        if n_aux:
+            # Compteur séquentiel : aux[i] vrai dès qu'une des actions 0..i l'est
+            aux = [act_var(n_actions + i, t) for i in range(n_aux)]
+            cnf.append([-acts[0], aux[0]])
+            for i in range(1, n_actions - 1):
+                cnf.append([-acts[i], aux[i]])
+                cnf.append([-aux[i - 1], aux[i]])
+                cnf.append([-acts[i], -aux[i - 1]])
+            cnf.append([-acts[-1], -aux[-1]])
+        else:
+            for i in range(len(acts)):
+                for j in range(i + 1, len(acts)):
+                    cnf.append([-acts[i], -acts[j]])
+
+    # But atteint à l'horizon
+    for f in task.goal:
+        cnf.append([fact_var(f, horizon)])
+
+    metrics.count("encode.variables", cnf.nv)
+    metrics.count("encode.clauses", len(cnf.clauses))
+    return cnf, var_map
@@ -0,0 +1,374 @@
+"""
+Générateur de familles d'instances Gripper pour les benchmarks
+
+Chaque instance est paramétrée par le nombre de pièces (N), de balles (M) et
+de pinces (K), par la topologie du graphe des pièces et par une graine. Les
+instances sont écrites en PDDL pour le domaine domains/gripper_family.pddl,
+accompagnées d'un manifeste JSON qui donne, quand elle est connue, la
+longueur du plan optimal.
+
+Les instances du Gripper standard de l'IPC (domains/gripper_ipc.pddl : deux
+pièces rooma et roomb, deux pinces left et right, n balles à transporter de
+rooma vers roomb) sont générées avec --ipc ; le problème n° k de l'IPC 1998
+compte 2k + 2 balles. Leur longueur optimale est 2n + 2 * ceil(n / 2) - 1.
+
+Placement "clustered" (défaut) : toutes les balles et le robot sont dans la
+première pièce S et doivent être amenées dans la pièce G la plus éloignée.
+Chaque aller transporte au plus K balles, d'où la longueur optimale
+    2M + d(S, G) * (2 * ceil(M / K) - 1)
+(M ramassages, M dépôts, ceil(M/K) allers et un retour de moins). Avec le
+placement "random" (positions et buts tirés au hasard), elle est inconnue.
+
+Utilisation :
+    python generate_problems.py                       # familles par défaut
+    python generate_problems.py --rooms 2 --balls 1 2 4 8 --grippers 2
+    python generate_problems.py --rooms 6 --topology random --density 0.2 --seed 3
+    python generate_problems.py --ipc                 # Gripper IPC, 4 à 22 balles
+    python generate_problems.py --ipc 4 10 20 42
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+from collections import deque
+
+import metrics
+
+DOMAIN_FILE = "domains/gripper_family.pddl"
+IPC_DOMAIN_FILE = "domains/gripper_ipc.pddl"
+OUTPUT_DIR = "problems/generated"
+IPC_OUTPUT_DIR = "problems/ipc"
+TOPOLOGIES = ["complete", "line", "ring", "star", "grid", "random"]
+
+# Familles par défaut : un seul paramètre varie dans chacune
+DEFAULT_FAMILIES = [
+    {'axis': 'balls', 'rooms': [2], 'balls': [1, 2, 3, 4, 5], 'grippers': [2],
+     'topology': 'complete'},
+    {'axis': 'rooms', 'rooms': [2, 3, 4, 5, 6, 7], 'balls': [2], 'grippers': [1],
+     'topology': 'line'},
+    {'axis': 'grippers', 'rooms': [2], 'balls': [4], 'grippers': [1, 2, 3, 4],
+     'topology': 'complete'},
+]
+
+# Gripper IPC : problèmes 1 à 10 de l'IPC 1998 (4 à 22 balles)
+DEFAULT_IPC_BALLS = [2 * k + 2 for k in range(1, 11)]
+
+# Objectifs de performance de chaque instance IPC, vérifiés par le benchmark :
+# encodage de l'horizon optimal (ms), taille de sa CNF et temps jusqu'au
+# plan optimal prouvé (s, sert aussi d'échéance à la mesure)
+IPC_TARGETS = {'encode_ms': 1000, 'clauses': 1_000_000, 'optimal_s': 60}
+
+
+def build_graph(n_rooms, topology, rng, density=0.3):
+    """Arêtes non orientées (i, j), i < j, du graphe des pièces"""
+    edges = set()
+
+    def link(i, j):
+        if i != j:
+            edges.add((min(i, j), max(i, j)))
+
+    if topology == "complete":
+        for i in range(n_rooms):
+            for j in range(i + 1, n_rooms):
+                link(i, j)
+    elif topology == "line":
+        for i in range(n_rooms - 1):
+            link(i, i + 1)
+    elif topology == "ring":
+        for i in range(n_rooms):
+            link(i, (i + 1) % n_rooms)
+    elif topology == "star":
+        for i in range(1, n_rooms):
+            link(0, i)
+    elif topology == "grid":
+        width = math.ceil(math.sqrt(n_rooms))
+        for i in range(n_rooms):
+            if (i + 1) % width and i + 1 < n_rooms:
+                link(i, i + 1)
+            if i + width < n_rooms:
+                link(i, i + width)
+    elif topology == "random":
+        # Arbre couvrant aléatoire (graphe connexe), puis arêtes supplémentaires
+        order = list(range(n_rooms))
+        rng.shuffle(order)
+        for k in range(1, n_rooms):
+            link(order[k], order[rng.randrange(k)])
+        for i in range(n_rooms):
+            for j in range(i + 1, n_rooms):
+                if rng.random() < density:
+                    link(i, j)
+    else:
+        raise ValueError(f"topologie inconnue: {topology}")
+
+    return sorted(edges)
+
+
+def distances_from(n_rooms, edges, source):
+    """Distances (nombre de déplacements) depuis une pièce, par parcours en largeur"""
+    neighbours = [[] for _ in range(n_rooms)]
+    for i, j in edges:
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+
+    dist = [None] * n_rooms
+    dist[source] = 0
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        for v in neighbours[u]:
+            if dist[v] is None:
+                dist[v] = dist[u] + 1
+                queue.append(v)
+    return dist
+
+
+def instance_name(rooms, balls, grippers, topology, placement, seed):
+    name = f"gripper_r{rooms}_b{balls}_g{grippers}_{topology}"
+    if placement != "clustered":
+        name += f"_{placement}"
+    return f"{name}_s{seed}"
+
+
+@metrics.timed("generate")
+def generate_instance(rooms, balls, grippers, topology="complete", placement="clustered",
+                      seed=0, density=0.3):
+    """Construit une instance ; retourne (texte PDDL, métadonnées du manifeste)"""
+    if rooms < 2:
+        raise ValueError("il faut au moins deux pièces")
+    if grippers < 1:
+        raise ValueError("il faut au moins une pince")
+
+    # Graine dérivée des paramètres : chaque instance est reproductible seule
+    rng = random.Random(f"{seed}-{rooms}-{balls}-{grippers}-{topology}-{placement}-{density}")
+    edges = build_graph(rooms, topology, rng, density)
+
+    room_names = [f"room{i+1}" for i in range(rooms)]
+    ball_names = [f"ball{i+1}" for i in range(balls)]
+    gripper_names = [f"gripper{i+1}" for i in range(grippers)]
+
+    optimal = None
+    if placement == "clustered":
+        source = 0
+        dist = distances_from(rooms, edges, source)
+        target = max(range(rooms), key=lambda r: (dist[r], r))
+        robot = source
+        ball_start = [source] * balls
+        ball_goal = [target] * balls
+        trips = math.ceil(balls / grippers)
+        optimal = 2 * balls + dist[target] * (2 * trips - 1) if balls else 0
+    elif placement == "random":
+        robot = rng.randrange(rooms)
+        ball_start = [rng.randrange(rooms) for _ in range(balls)]
+        ball_goal = [rng.choice([r for r in range(rooms) if r != s]) for s in ball_start]
+    else:
+        raise ValueError(f"placement inconnu: {placement}")
+
+    name = instance_name(rooms, balls, grippers, topology, placement, seed)
+
+    init = [f"(room {r})" for r in room_names]
+    init += [f"(ball {b})" for b in ball_names]
+    init += [f"(gripper {g})" for g in gripper_names]
+    for i, j in edges:
+        init.append(f"(connected {room_names[i]} {room_names[j]})")
+        init.append(f"(connected {room_names[j]} {room_names[i]})")
+    init.append(f"(at-robby {room_names[robot]})")
+    init += [f"(at {b} {room_names[r]})" for b, r in zip(ball_names, ball_start)]
+    init += [f"(free {g})" for g in gripper_names]
+
+    goal = [f"(at {b} {room_names[r]})" for b, r in zip(ball_names, ball_goal)]
+
+    lines = [f"(define (problem {name})",
+             "  (:domain gripper-family)",
+             "",
+             "  (:objects",
+             "    " + " ".join(room_names + ball_names + gripper_names),
+             "  )",
+             "",
+             "  (:init"]
+    lines += ["    " + atom for atom in init]
+    lines += ["  )", "", "  (:goal", "    (and"]
+    lines += ["      " + atom for atom in goal]
+    lines += ["    )", "  )", ")", ""]
+
+    metadata = {
+        'name': name,
+        'rooms': rooms,
+        'balls': balls,
+        'grippers': grippers,
+        'topology': topology,
+        'placement': placement,
+        'seed': seed,
+        'edges': len(edges),
+        'optimal_length': optimal,
+    }
+    return "\n".join(lines), metadata
+
+
+def ipc_optimal_length(balls):
+    """Longueur optimale d'une instance Gripper IPC (deux pinces, deux pièces)"""
+    trips = math.ceil(balls / 2)
+    return 2 * balls + 2 * trips - 1 if balls else 0
+
+
+@metrics.timed("generate")
+def generate_ipc_instance(balls):
+    """Instance du Gripper IPC à n balles ; retourne (texte PDDL, métadonnées)
+
+    Même écriture que les problèmes de l'IPC 1998 (strips-gripper-x-k pour
+    n = 2k + 2) : prédicats de type, robby dans rooma, les deux pinces
+    libres, toutes les balles dans rooma et à amener dans roomb.
+    """
+    if balls < 1:
+        raise ValueError("il faut au moins une balle")
+    ball_names = [f"ball{i+1}" for i in range(balls)]
+    name = (f"strips-gripper-x-{(balls - 2) // 2}" if balls >= 4 and balls % 2 == 0
+            else f"strips-gripper-{balls}")
+
+    init = ["(room rooma)", "(room roomb)"]
+    init += [f"(ball {b})" for b in ball_names]
+    init += ["(at-robby rooma)", "(free left)", "(free right)"]
+    init += [f"(at {b} rooma)" for b in ball_names]
+    init += ["(gripper left)", "(gripper right)"]
+    goal = [f"(at {b} roomb)" for b in ball_names]
+
+    lines = [f"(define (problem {name})",
+             "  (:domain gripper-strips)",
+             "  (:objects rooma roomb " + " ".join(ball_names) + " left right)",
+             "  (:init"]
+    lines += ["    " + atom for atom in init]
+    lines += ["  )", "  (:goal", "    (and"]
+    lines += ["      " + atom for atom in goal]
+    lines += ["    )", "  )", ")", ""]
+
+    metadata = {
+        'name': f"gripper_ipc_b{balls}",
+        'ipc_name': name,
+        'rooms': 2,
+        'balls': balls,
+        'grippers': 2,
+        'topology': 'complete',
+        'placement': 'clustered',
+        'seed': 0,
+        'edges': 1,
+        'optimal_length': ipc_optimal_length(balls),
+        'targets': dict(IPC_TARGETS),
+    }
+    return "\n".join(lines), metadata
+
+
+def write_ipc_family(balls_list=DEFAULT_IPC_BALLS, output_dir=IPC_OUTPUT_DIR):
+    """Écrit les instances IPC et leur manifeste ; retourne (chemin du manifeste, entrées)"""
+    os.makedirs(output_dir, exist_ok=True)
+    entries = []
+    for balls in balls_list:
+        text, meta = generate_ipc_instance(balls)
+        path = os.path.join(output_dir, meta['name'] + ".pddl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        meta['axis'] = 'balls'
+        meta['problem'] = path
+        meta['domain'] = IPC_DOMAIN_FILE
+        entries.append(meta)
+        metrics.count("generate.instances")
+
+    manifest = os.path.join(output_dir, "manifest.json")
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump({'domain': IPC_DOMAIN_FILE, 'instances': entries}, f, indent=2)
+    return manifest, entries
+
+
+def write_family(configs, output_dir=OUTPUT_DIR, seed=0, placement="clustered", density=0.3):
+    """Écrit les instances et le manifeste ; retourne (chemin du manifeste, entrées)"""
+    os.makedirs(output_dir, exist_ok=True)
+    entries = []
+    seen = set()
+
+    for config in configs:
+        for rooms in config['rooms']:
+            for balls in config['balls']:
+                for grippers in config['grippers']:
+                    text, meta = generate_instance(rooms, balls, grippers, config['topology'],
+                                                   placement, seed, density)
+                    key = (meta['name'], config.get('axis'))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+
+                    path = os.path.join(output_dir, meta['name'] + ".pddl")
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(text)
+                    meta['axis'] = config.get('axis')
+                    meta['problem'] = path
+                    meta['domain'] = DOMAIN_FILE
+                    entries.append(meta)
+                    metrics.count("generate.instances")
+
+    manifest = os.path.join(output_dir, "manifest.json")
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump({'domain': DOMAIN_FILE, 'instances': entries}, f, indent=2)
+    return manifest, entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Générateur d'instances Gripper paramétrées")
+    parser.add_argument("--rooms", type=int, nargs="+", help="Nombre(s) de pièces N")
+    parser.add_argument("--balls", type=int, nargs="+", help="Nombre(s) de balles M")
+    parser.add_argument("--grippers", type=int, nargs="+", help="Nombre(s) de pinces K")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="complete",
+                        help="Graphe des pièces (défaut: complete)")
+    parser.add_argument("--density", type=float, default=0.3,
+                        help="Probabilité d'arête supplémentaire (topologie random)")
+    parser.add_argument("--placement", choices=["clustered", "random"], default="clustered",
+                        help="Position initiale et buts des balles")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ipc", type=int, nargs="*", metavar="BALLES",
+                        help="Instances du Gripper IPC (défaut: 4 à 22 balles, problèmes 1 à 10)")
+    parser.add_argument("--out", default=None,
+                        help=f"Répertoire de sortie (défaut: {OUTPUT_DIR}, {IPC_OUTPUT_DIR} avec --ipc)")
+    metrics.add_argument(parser)
+    args = parser.parse_args(argv)
+    metrics.start(args, "generate_problems")
+    try:
+        return generate(args)
+    finally:
+        metrics.finish(args)
+
+
+def generate(args):
+    """Écrit les instances demandées en ligne de commande ; retourne le code de sortie"""
+    if args.ipc is not None:
+        manifest, entries = write_ipc_family(args.ipc or DEFAULT_IPC_BALLS, args.out or IPC_OUTPUT_DIR)
+        print(f"{len(entries)} instances IPC générées dans {args.out or IPC_OUTPUT_DIR}/")
+        for meta in entries:
+            print(f"  {meta['name']:<40} ({meta['ipc_name']}) optimal: {meta['optimal_length']}")
+        print(f"Manifeste: {manifest}")
+        return 0
+
+    if args.rooms or args.balls or args.grippers:
+        config = {
+            'rooms': args.rooms or [2],
+            'balls': args.balls or [1],
+            'grippers': args.grippers or [1],
+            'topology': args.topology,
+        }
+        varying = [axis for axis in ('rooms', 'balls', 'grippers') if len(config[axis]) > 1]
+        config['axis'] = varying[0] if len(varying) == 1 else None
+        configs = [config]
+    else:
+        configs = DEFAULT_FAMILIES
+
+    out = args.out or OUTPUT_DIR
+    manifest, entries = write_family(configs, out, args.seed, args.placement, args.density)
+
+    print(f"{len(entries)} instances générées dans {out}/")
+    for meta in entries:
+        optimal = meta['optimal_length'] if meta['optimal_length'] is not None else "?"
+        print(f"  {meta['name']:<40} optimal: {optimal}")
+    print(f"Manifeste: {manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# Instanciation (grounding) d'un problème PDDL en tâche STRIPS propositionnelle
+#
+# Chaque schéma d'action est instancié sur les objets du problème. Les
+# prédicats statiques (jamais modifiés par une action, comme `connected` ou
+# les prédicats de type) sont évalués dès l'instanciation et disparaissent de
+# la tâche. Une analyse d'atteignabilité relâchée (sans les effets négatifs)
+# élimine ensuite les faits et les actions qui ne peuvent jamais se produire.
+#
+# Les faits et les actions sont numérotés : les préconditions et effets des
+# actions sont des tuples d'indices de faits, ce qui rend l'encodage SAT et la
+# recherche explicite indépendants des noms.
+
+from collections import namedtuple
+
+import metrics
+from pddl_parser import load_domain, load_problem
+
+# name : tuple (schéma, paramètres...), ex. ('move', 'roomA', 'roomB')
+# pre, add, delete : tuples d'indices de faits
+GroundAction = namedtuple('GroundAction', 'name pre add delete')
+
+
+class GroundTask:
+    """Tâche STRIPS propositionnelle issue d'un domaine et d'un problème PDDL"""
+
+    def __init__(self, name, facts, actions, init, goal, domain=None):
+        self.name = name
+        self.facts = facts                  # liste de tuples (prédicat, objets...)
+        self.fact_index = {fact: i for i, fact in enumerate(facts)}
+        self.actions = actions              # liste de GroundAction
+        self.init = frozenset(init)         # indices des faits vrais initialement
+        self.goal = tuple(goal)             # indices des faits à atteindre
+        self.domain = domain                # domaine analysé (gabarits de clauses), si connu
+
+    def __repr__(self):
+        return (f"GroundTask({self.name}: {len(self.facts)} faits, "
+                f"{len(self.actions)} actions, but {len(self.goal)} faits)")
+
+
+def fact_name(fact):
+    """Nom lisible d'un fait : ('at_ball', 'roomA') -> at_ball_roomA"""
+    return "_".join(fact)
+
+
+def _object_types(domain, problem):
+    """Ensemble des types (ancêtres compris) de chaque objet"""
+    parents = domain.get('types', {})
+    types = {}
+    for obj, typ in problem['objects']:
+        chain = {"object", typ}
+        while typ in parents and parents[typ] not in chain:
+            typ = parents[typ]
+            chain.add(typ)
+        types[obj] = chain
+    return types
+
+
+def _static_predicates(domain):
+    changed = set()
+    for schema in domain['actions']:
+        changed.update(atom[0] for atom in schema['add'])
+        changed.update(atom[0] for atom in schema['delete'])
+    return set(domain['predicates']) - changed
+
+
+def _instantiate(atom, binding):
+    return (atom[0],) + tuple(binding.get(arg, arg) for arg in atom[1:])
+
+
+def _ground_schema(schema, objects_by_type, static, static_init):
+    """Énumère les instanciations d'un schéma compatibles avec les faits statiques
+
+    Les paramètres sont liés un par un ; chaque contrainte statique ou
+    d'égalité est vérifiée dès que tous ses arguments sont liés, ce qui coupe
+    l'énumération au plus tôt (par ex. `connected ?from ?to` pour move).
+    """
+    params = [name for name, _ in schema['parameters']]
+    domains = [objects_by_type(typ) for _, typ in schema['parameters']]
+    position = {p: i for i, p in enumerate(params)}
+
+    def ready_at(args):
+        # Indice du paramètre à partir duquel tous les arguments sont liés
+        indices = [position[a] for a in args if a in position]
+        return max(indices) if indices else -1
+
+    # static_checks[niveau + 1] : contraintes vérifiables dès que le paramètre
+    # de ce niveau est lié ; l'entrée 0 regroupe les contraintes sans variable
+    static_checks = [[] for _ in range(len(params) + 1)]
+    for atom in schema['precondition']:
+        if atom[0] in static:
+            static_checks[ready_at(atom[1:]) + 1].append(('atom', atom))
+    for a, b in schema['equalities']:
+        static_checks[ready_at([a, b]) + 1].append(('eq', (a, b)))
+    for a, b in schema['inequalities']:
+        static_checks[ready_at([a, b]) + 1].append(('neq', (a, b)))
+
+    binding = {}
+
+    def consistent(level):
+        for kind, data in static_checks[level + 1]:
+            if kind == 'atom':
+                if _instantiate(data, binding) not in static_init:
+                    return False
+            else:
+                a, b = (binding.get(x, x) for x in data)
+                if (a == b) != (kind == 'eq'):
+                    return False
+        return True
+
+    def extend(level):
+        if level == len(params):
+            yield dict(binding)
+            return
+        for obj in domains[level]:
+            binding[params[level]] = obj
+            if consistent(level):
+                yield from extend(level + 1)
+        binding.pop(params[level], None)
+
+    if consistent(-1):
+        yield from extend(0)
+
+
+@metrics.timed("ground")
+def ground(domain, problem):
+    """Instancie le problème et retourne la GroundTask correspondante"""
+    static = _static_predicates(domain)
+    init_atoms = set(problem['init'])
+    static_init = {atom for atom in init_atoms if atom[0] in static}
+
+    types = _object_types(domain, problem)
+    objects = [obj for obj, _ in problem['objects']]
+    type_cache = {}
+
+    def objects_by_type(typ):
+        if typ not in type_cache:
+            type_cache[typ] = [o for o in objects if typ in types[o]]
+        return type_cache[typ]
+
+    # Instanciation des schémas : actions exprimées sur des atomes fluents
+    candidates = []
+    for schema in domain['actions']:
+        for binding in _ground_schema(schema, objects_by_type, static, static_init):
+            pre = tuple(dict.fromkeys(_instantiate(a, binding) for a in schema['precondition']
+                                      if a[0] not in static))
+            add = tuple(dict.fromkeys(_instantiate(a, binding) for a in schema['add']))
+            delete = tuple(dict.fromkeys(d for d in (_instantiate(a, binding) for a in schema['delete'])
+                                         if d not in add))
+            if not delete and all(a in pre for a in add):
+                # Action sans effet (par ex. move d'une pièce vers elle-même)
+                continue
+            name = (schema['name'],) + tuple(binding[p] for p, _ in schema['parameters'])
+            candidates.append((name, pre, add, delete))
+
+    # Atteignabilité relâchée : une action est retenue quand toutes ses
+    # préconditions ont été atteintes (compteur de préconditions manquantes)
+    reached = {atom for atom in init_atoms if atom[0] not in static}
+    waiting = {}
+    missing = []
+    queue = []
+    for i, (_, pre, _, _) in enumerate(candidates):
+        count = 0
+        for atom in pre:
+            if atom not in reached:
+                waiting.setdefault(atom, []).append(i)
+                count += 1
+        missing.append(count)
+        if count == 0:
+            queue.append(i)
+
+    applicable = []
+    while queue:
+        i = queue.pop()
+        applicable.append(i)
+        for atom in candidates[i][2]:
+            if atom in reached:
+                continue
+            reached.add(atom)
+            for j in waiting.pop(atom, ()):
+                missing[j] -= 1
+                if missing[j] == 0:
+                    queue.append(j)
+    applicable.sort()
+
+    # Faits retenus : atteignables ou mentionnés dans le but (un but
+    # inatteignable reste encodé et rend simplement le problème insatisfiable)
+    goal_atoms = [atom for atom in problem['goal'] if atom[0] not in static]
+    unreachable_static_goal = [atom for atom in problem['goal']
+                               if atom[0] in static and atom not in static_init]
+    facts = sorted(reached | set(goal_atoms))
+    index = {fact: i for i, fact in enumerate(facts)}
+
+    actions = []
+    for i in applicable:
+        name, pre, add, delete = candidates[i]
+        actions.append(GroundAction(
+            name,
+            tuple(index[a] for a in pre),
+            tuple(index[a] for a in add),
+            # Un effet négatif sur un fait jamais atteignable est sans objet
+            tuple(index[a] for a in delete if a in index)))
+
+    init = [index[a] for a in init_atoms if a in index]
+    goal = [index[a] for a in goal_atoms]
+    if unreachable_static_goal:
+        # But statique faux : on garde la tâche mais elle n'a pas de solution
+        facts.append(("false",) + unreachable_static_goal[0])
+        goal.append(len(facts) - 1)
+
+    metrics.count("ground.facts", len(facts))
+    metrics.count("ground.actions", len(actions))
+    return GroundTask(problem['name'], facts, actions, init, goal, domain)
+
+
+def load_task(domain_file, problem_file):
+    """Lit et instancie un couple domaine / problème PDDL"""
+    return ground(load_domain(domain_file), load_problem(problem_file))
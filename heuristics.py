@@ -0,0 +1,300 @@
+"""
+Heuristiques de la famille HSP : h_max, h_add et h_FF, et LM-cut
+
+Les trois heuristiques reposent sur le problème relâché (effets négatifs
+ignorés) et sur un même calcul : un Dijkstra généralisé sur les faits. Le coût
+d'un fait est celui de l'action la moins chère qui l'ajoute ; le coût d'une
+action est 1 plus le coût combiné de ses préconditions, par le maximum (h_max,
+admissible) ou par la somme (h_add). h_FF extrait ensuite un plan relâché en
+remontant les meilleurs supports depuis le but et compte ses actions.
+
+Tout ce qui ne dépend pas de l'état est précalculé : index précondition ->
+actions, nombre de préconditions, effets positifs. Chaque évaluation ne
+touche que les faits et actions effectivement atteints : les tableaux de
+travail ne sont pas réinitialisés, une valeur n'est valide que si son tampon
+correspond au numéro de l'évaluation courante, et le calcul s'arrête dès que
+tous les faits du but sont fixés. Les valeurs déjà calculées sont gardées
+par état (les recherches réévaluent souvent les mêmes états).
+
+Utilisation :
+    h = RelaxedHeuristic(task, "ff")
+    h(state)            # state : entier de bits (state_space.py)
+    h.stats()           # évaluations, temps, évaluations/s
+"""
+
+import heapq
+import math
+import time
+
+from state_space import set_bits, state_space_of
+
+KINDS = ("max", "add", "ff")
+
+
+class RelaxedHeuristic:
+    """h_max, h_add ou h_FF d'une tâche, évaluée sur des états en bits"""
+
+    def __init__(self, task, kind="add", cache=True):
+        if kind not in KINDS:
+            raise ValueError(f"heuristique inconnue: {kind} (choix: {', '.join(KINDS)})")
+        self.task = task
+        self.kind = kind
+        self.space = state_space_of(task)
+
+        n_facts = len(task.facts)
+        n_actions = len(task.actions)
+        self.goal = list(task.goal)
+        self.goal_set = frozenset(task.goal)
+        self.n_pre = [len(action.pre) for action in task.actions]
+        self.add = [action.add for action in task.actions]
+        self.pre = [action.pre for action in task.actions]
+        # Index précondition -> actions qui l'attendent
+        self.waiting = [[] for _ in range(n_facts)]
+        for a, action in enumerate(task.actions):
+            for f in action.pre:
+                self.waiting[f].append(a)
+        self.no_pre = [a for a in range(n_actions) if not task.actions[a].pre]
+
+        # Tableaux de travail réutilisés d'une évaluation à l'autre
+        self.generation = 0
+        self.fact_stamp = [0] * n_facts
+        self.fact_cost = [0] * n_facts
+        self.supporter = [None] * n_facts
+        self.done = [0] * n_facts
+        self.action_stamp = [0] * n_actions
+        self.remaining = [0] * n_actions
+        self.action_cost = [0] * n_actions
+
+        self.cache = {} if cache else None
+        self.evaluations = 0
+        self.computed = 0
+        self.elapsed = 0.0
+
+    def __call__(self, state):
+        self.evaluations += 1
+        if self.cache is not None:
+            value = self.cache.get(state)
+            if value is not None:
+                return value
+        start = time.perf_counter()
+        value = self._evaluate(state)
+        self.elapsed += time.perf_counter() - start
+        self.computed += 1
+        if self.cache is not None:
+            self.cache[state] = value
+        return value
+
+    def _evaluate(self, state):
+        """Dijkstra généralisé depuis les faits de state, arrêté au but"""
+        self.generation += 1
+        gen = self.generation
+        fact_stamp, fact_cost, supporter, done = (self.fact_stamp, self.fact_cost,
+                                                  self.supporter, self.done)
+        action_stamp, remaining, action_cost = self.action_stamp, self.remaining, self.action_cost
+        n_pre, add, waiting = self.n_pre, self.add, self.waiting
+        goal_set = self.goal_set
+        use_max = self.kind == "max"
+
+        heap = []
+        for f in set_bits(state):
+            fact_stamp[f] = gen
+            fact_cost[f] = 0
+            supporter[f] = None
+            heap.append((0, f))
+
+        def reach(a, cost):
+            # Action devenue applicable dans le relâché : propage ses effets
+            for g in add[a]:
+                if fact_stamp[g] != gen or cost < fact_cost[g]:
+                    fact_stamp[g] = gen
+                    fact_cost[g] = cost
+                    supporter[g] = a
+                    heapq.heappush(heap, (cost, g))
+
+        for a in self.no_pre:
+            reach(a, 1)
+
+        goals_left = sum(1 for g in self.goal if not (state >> g) & 1)
+        if goals_left == 0:
+            return 0
+
+        while heap:
+            cost, f = heapq.heappop(heap)
+            if done[f] == gen or cost > fact_cost[f]:
+                continue
+            done[f] = gen
+            if f in goal_set and not (state >> f) & 1:
+                goals_left -= 1
+                if goals_left == 0:
+                    break
+            for a in waiting[f]:
+                if action_stamp[a] != gen:
+                    action_stamp[a] = gen
+                    remaining[a] = n_pre[a]
+                    action_cost[a] = 0
+                remaining[a] -= 1
+                action_cost[a] = max(action_cost[a], cost) if use_max else action_cost[a] + cost
+                if remaining[a] == 0:
+                    reach(a, action_cost[a] + 1)
+
+        if goals_left:
+            return math.inf
+
+        if self.kind == "max":
+            return max(fact_cost[g] for g in self.goal)
+        if self.kind == "add":
+            return sum(fact_cost[g] for g in self.goal)
+        return len(self._relaxed_plan(state))
+
+    def _relaxed_plan(self, state):
+        """Actions du plan relâché, en remontant les meilleurs supports du dernier calcul"""
+        plan = set()
+        stack = [g for g in self.goal if not (state >> g) & 1]
+        seen = set(stack)
+        while stack:
+            f = stack.pop()
+            a = self.supporter[f]
+            if a is None or a in plan:
+                continue
+            plan.add(a)
+            for p in self.pre[a]:
+                if p not in seen and not (state >> p) & 1:
+                    seen.add(p)
+                    stack.append(p)
+        return plan
+
+    def relaxed_plan(self, state):
+        """Plan relâché (ensemble d'indices d'actions) depuis state, None si le but est inaccessible"""
+        if self._evaluate(state) == math.inf:
+            return None
+        return self._relaxed_plan(state)
+
+    def stats(self):
+        return {
+            'heuristic': "h_" + self.kind,
+            'evaluations': self.evaluations,
+            'computed': self.computed,
+            'heuristic_time': self.elapsed,
+            'evaluations_per_sec': self.computed / self.elapsed if self.elapsed > 0 else 0.0,
+        }
+
+
+class LMCutHeuristic:
+    """Heuristique LM-cut (Helmert et Domshlak, 2009), admissible
+
+    À chaque itération : h_max avec les coûts courants, graphe de
+    justification (chaque action est rattachée à sa précondition de plus
+    grand h_max), coupe entre la zone des faits atteignables depuis l'état et
+    la zone du but, puis le coût minimal de la coupe est ajouté à h et retiré
+    des actions coupées. Nettement plus informative que h_max, elle sert de
+    borne inférieure sur la longueur du plan (sat_planner.py).
+    """
+
+    def __init__(self, task, cache=True):
+        self.task = task
+        self.kind = "lmcut"
+        self.space = state_space_of(task)
+        n_facts = len(task.facts)
+        self.pre = [action.pre for action in task.actions]
+        self.add = [action.add for action in task.actions]
+        self.goal = list(task.goal)
+        self.waiting = [[] for _ in range(n_facts)]
+        for a, pre in enumerate(self.pre):
+            for f in pre:
+                self.waiting[f].append(a)
+        self.no_pre = [a for a, pre in enumerate(self.pre) if not pre]
+
+        self.cache = {} if cache else None
+        self.evaluations = 0
+        self.computed = 0
+        self.elapsed = 0.0
+
+    __call__ = RelaxedHeuristic.__call__
+    stats = RelaxedHeuristic.stats
+
+    def _hmax(self, state, cost):
+        """Valeurs h_max de tous les faits avec les coûts d'actions `cost`"""
+        hm = [math.inf] * len(self.task.facts)
+        remaining = [len(pre) for pre in self.pre]
+        action_value = [0] * len(self.pre)
+        heap = []
+        for f in set_bits(state):
+            hm[f] = 0
+            heap.append((0, f))
+
+        def reach(a):
+            value = action_value[a] + cost[a]
+            for g in self.add[a]:
+                if value < hm[g]:
+                    hm[g] = value
+                    heapq.heappush(heap, (value, g))
+
+        for a in self.no_pre:
+            reach(a)
+        while heap:
+            value, f = heapq.heappop(heap)
+            if value > hm[f]:
+                continue
+            for a in self.waiting[f]:
+                remaining[a] -= 1
+                action_value[a] = max(action_value[a], value)
+                if remaining[a] == 0:
+                    reach(a)
+        return hm
+
+    def _evaluate(self, state):
+        cost = [1] * len(self.pre)
+        h = 0
+        while True:
+            hm = self._hmax(state, cost)
+            goal_value = max((hm[g] for g in self.goal), default=0)
+            if goal_value == math.inf:
+                return math.inf
+            if goal_value == 0:
+                return h
+
+            # Précondition « la plus chère » de chaque action atteinte (None :
+            # action sans précondition, rattachée à l'état initial)
+            pcf = {}
+            for a, pre in enumerate(self.pre):
+                if all(hm[p] < math.inf for p in pre):
+                    pcf[a] = max(pre, key=lambda p: hm[p]) if pre else None
+            goal_pcf = max(self.goal, key=lambda g: hm[g])
+
+            # Zone du but : faits qui mènent au but par des arcs de coût nul
+            goal_zone = {goal_pcf}
+            stack = [goal_pcf]
+            zero_into = {}
+            for a, p in pcf.items():
+                if cost[a] == 0 and p is not None:
+                    for e in self.add[a]:
+                        zero_into.setdefault(e, []).append(p)
+            while stack:
+                e = stack.pop()
+                for p in zero_into.get(e, ()):
+                    if p not in goal_zone:
+                        goal_zone.add(p)
+                        stack.append(p)
+
+            # Zone de départ : atteignable depuis l'état sans entrer dans la zone du but
+            by_pcf = {}
+            for a, p in pcf.items():
+                by_pcf.setdefault(p, []).append(a)
+            start_zone = set()
+            stack = [None] + [f for f in set_bits(state) if f not in goal_zone]
+            start_zone.update(stack)
+            cut = set()
+            while stack:
+                p = stack.pop()
+                for a in by_pcf.get(p, ()):
+                    for e in self.add[a]:
+                        if e in goal_zone:
+                            cut.add(a)
+                        elif e not in start_zone:
+                            start_zone.add(e)
+                            stack.append(e)
+
+            m = min(cost[a] for a in cut)
+            h += m
+            for a in cut:
+                cost[a] -= m
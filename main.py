@@ -1,18 +1,34 @@
 import os
 import sys
+import json
 import argparse
+import importlib.util
+import subprocess
+import tempfile
 import time
-from pathlib import Path
 
-def check_dependencies():
-   
-    required_packages = ['pysat', 'matplotlib', 'pandas']
+import metrics
+
+# Dépendances nécessaires à chaque mode : les modes qui ne tracent pas de
+# graphiques ne doivent pas payer le chargement de matplotlib
+MODE_DEPENDENCIES = {
+    "basic": ["pysat"],
+    "validation": [],
+    "benchmark": ["pysat", "matplotlib"],
+    "generate": [],
+    "serve": ["pysat"],
+    "clean": [],
+    "full": ["pysat", "matplotlib"],
+}
+
+def check_dependencies(mode="full"):
+    # find_spec localise le paquet sans l'importer : la vérification reste
+    # quasi gratuite, l'import réel n'a lieu que dans le code qui l'utilise
+    required_packages = MODE_DEPENDENCIES.get(mode, MODE_DEPENDENCIES["full"])
     missing = []
     
     for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+        if importlib.util.find_spec(package) is None:
             missing.append(package)
     
     if missing:
@@ -20,11 +36,35 @@ def check_dependencies():
         for pkg in missing:
             print(f"   - {pkg}")
         print("\nInstallation:")
-        print(f"   pip install {' '.join(missing)}")
+        install_names = {"pysat": "python-sat"}
+        print(f"   pip install {' '.join(install_names.get(pkg, pkg) for pkg in missing)}")
         return False
     
     return True
 
+def run_script(script, *script_args):
+    """Lance un script du projet ; retourne True s'il s'est terminé sans erreur
+
+    Quand main.py enregistre ses métriques (--metrics), le script reçoit
+    lui aussi --metrics et son enregistrement rejoint celui de main.py, sous
+    une phase au nom du script.
+    """
+    command = [sys.executable, script] + list(script_args)
+    if metrics.active() is None:
+        return subprocess.call(command) == 0
+    
+    fd, record_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        with metrics.phase(os.path.splitext(script)[0]):
+            code = subprocess.call(command + ["--metrics", record_path])
+            if os.path.getsize(record_path):
+                with open(record_path, "r", encoding="utf-8") as f:
+                    metrics.merge(json.load(f))
+    finally:
+        os.remove(record_path)
+    return code == 0
+
 def run_basic_planning():
  
     print(" PLANIFICATION DE BASE")
@@ -33,17 +73,13 @@ def run_basic_planning():
     try:
       
         print(" Génération du fichier CNF...")
-        os.system("python write_cnf.py")
-        
-        if not os.path.exists("problem.cnf"):
+        if not run_script("write_cnf.py") or not os.path.exists("problem.cnf"):
             print(" Échec de la génération du CNF")
             return False
         
  
         print("\n Résolution du problème...")
-        os.system("python run_solver.py")
-        
-        return True
+        return run_script("run_solver.py")
         
     except Exception as e:
         print(f" Erreur lors de la planification: {e}")
@@ -55,8 +91,7 @@ def run_validation():
     print("=" * 15)
     
     try:
-        os.system("python validation.py")
-        return True
+        return run_script("val_validator.py")
     except Exception as e:
         print(f" Erreur lors de la validation: {e}")
         return False
@@ -67,8 +102,7 @@ def run_benchmarks():
     print("=" * 15)
     
     try:
-        os.system("python benchmark.py")
-        return True
+        return run_script("benchmark.py")
     except Exception as e:
         print(f" Erreur lors du benchmark: {e}")
         return False
@@ -79,12 +113,24 @@ def run_problem_generation():
     print("=" * 30)
     
     try:
-        os.system("python generate_problems.py")
-        return True
+        return run_script("generate_problems.py")
     except Exception as e:
         print(f" Erreur lors de la génération: {e}")
         return False
 
+def run_service(port):
+
+    print("\n SERVICE DE PLANIFICATION")
+    print("=" * 30)
+    
+    try:
+        from planning_service import serve
+        serve(port=port)
+        return True
+    except Exception as e:
+        print(f" Erreur du service: {e}")
+        return False
+
 def clean_files():
 
     files_to_clean = [
@@ -138,13 +184,23 @@ def show_results():
 def main():
    
     parser = argparse.ArgumentParser(description="Planificateur SAT pour le domaine Gripper")
-    parser.add_argument("--mode", choices=["basic", "full", "validation", "benchmark", "generate", "clean"], 
+    parser.add_argument("--mode", choices=["basic", "full", "validation", "benchmark", "generate", "serve", "clean"], 
                        default="basic", help="Mode d'exécution")
     parser.add_argument("--horizon", type=int, default=4, help="Horizon temporel (défaut: 4)")
     parser.add_argument("--quiet", action="store_true", help="Mode silencieux")
+    parser.add_argument("--port", type=int, default=8765, help="Port du service local (mode serve)")
+    metrics.add_argument(parser)
     
     args = parser.parse_args()
-    
+    metrics.start(args, "main")
+    metrics.set_info('mode', args.mode)
+    try:
+        return run(args)
+    finally:
+        metrics.finish(args)
+
+def run(args):
+    """Exécute le mode demandé ; retourne le code de sortie"""
     if not args.quiet:
         print("PLANIFICATEUR SAT - DOMAINE GRIPPER")
         print("=" * 40)
@@ -153,7 +209,7 @@ def main():
         print()
     
     # Vérification des dépendances
-    if not check_dependencies():
+    if not check_dependencies(args.mode):
         return 1
     
     success = True
@@ -175,6 +231,9 @@ def main():
         elif args.mode == "generate":
             success = run_problem_generation()
             
+        elif args.mode == "serve":
+            success = run_service(args.port)
+            
         elif args.mode == "full":
             
             success = (run_basic_planning() and 
@@ -0,0 +1,268 @@
+"""
+Instrumentation des phases du planificateur : chronomètres imbriqués et compteurs
+
+Les modules marquent leurs phases (parse, ground, encode, write, load, solve,
+decode) avec `metrics.phase(nom)` ou le décorateur `metrics.timed(nom)`, et
+incrémentent des compteurs avec `metrics.count(nom, n)`. Tant qu'aucun
+enregistrement n'est actif, ces appels ne font qu'un test sur une variable
+globale : l'instrumentation peut rester en place dans le code mesuré.
+
+Chaque point d'entrée accepte `--metrics FICHIER` (ou `--metrics -` pour la
+sortie standard) et produit un enregistrement JSON par exécution :
+
+    {"entry": "sat_planner", "timestamp": ..., "argv": [...], "wall_ns": ...,
+     "phases": {"parse": {...}, "plan/encode": {...}, ...},
+     "totals": {"encode": {...}, ...},
+     "counters": {"encode.clauses": 1234, ...},
+     "info": {...}}
+
+Les phases imbriquées sont nommées par leur chemin ("plan/solve") ; `totals`
+regroupe les temps par nom de phase, quel que soit le niveau d'imbrication.
+Un point d'entrée qui lance d'autres scripts (main.py) leur passe --metrics
+et ajoute leurs enregistrements au sien avec `metrics.merge(record)`.
+"""
+
+import functools
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+STANDARD_PHASES = ["parse", "ground", "encode", "write", "load", "solve", "decode"]
+
+
+class _NullPhase:
+    """Chronomètre inactif, partagé par tous les appels quand rien n'est enregistré"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ("recorder", "name", "path", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        stack = self.recorder._stack()
+        stack.append(self.name)
+        self.path = "/".join(stack)
+        self.recorder._open(self.path, self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter_ns() - self.start
+        self.recorder._stack().pop()
+        self.recorder._add(self.path, self.name, elapsed)
+        return False
+
+
+def _new_timing():
+    return {'calls': 0, 'total_ns': 0, 'min_ns': None, 'max_ns': 0}
+
+
+def _update(timing, elapsed):
+    timing['calls'] += 1
+    timing['total_ns'] += elapsed
+    timing['min_ns'] = elapsed if timing['min_ns'] is None else min(timing['min_ns'], elapsed)
+    timing['max_ns'] = max(timing['max_ns'], elapsed)
+
+
+def _combine(timing, other):
+    timing['calls'] += other['calls']
+    timing['total_ns'] += other['total_ns']
+    if other['min_ns'] is not None and (timing['min_ns'] is None or other['min_ns'] < timing['min_ns']):
+        timing['min_ns'] = other['min_ns']
+    timing['max_ns'] = max(timing['max_ns'], other['max_ns'])
+
+
+class MetricsRecorder:
+    """Temps par phase, compteurs et informations d'une exécution"""
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.timestamp = datetime.now().isoformat()
+        self.started = time.perf_counter_ns()
+        self.phases = {}
+        self.totals = {}
+        self.counters = {}
+        self.info = {}
+        self._lock = threading.Lock()
+        # Pile des phases ouvertes, propre à chaque thread (service de planification)
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _open(self, path, name):
+        # Les phases apparaissent dans l'ordre où elles commencent
+        with self._lock:
+            self.phases.setdefault(path, _new_timing())
+            self.totals.setdefault(name, _new_timing())
+
+    def _add(self, path, name, elapsed):
+        with self._lock:
+            _update(self.phases[path], elapsed)
+            _update(self.totals[name], elapsed)
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_info(self, key, value):
+        self.info[key] = value
+
+    def merge(self, record):
+        """Ajoute l'enregistrement d'une autre exécution (sous-processus) sous la phase courante
+
+        Ses phases sont rangées sous le chemin de la phase ouverte, ses temps
+        par nom et ses compteurs s'ajoutent à ceux de cet enregistrement, ses
+        informations sont gardées sous le nom de son point d'entrée.
+        """
+        prefix = "/".join(self._stack())
+        with self._lock:
+            for path, timing in record['phases'].items():
+                path = prefix + "/" + path if prefix else path
+                _combine(self.phases.setdefault(path, _new_timing()), timing)
+            for name, timing in record['totals'].items():
+                _combine(self.totals.setdefault(name, _new_timing()), timing)
+            for name, value in record['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            if record['info']:
+                self.info[record['entry']] = record['info']
+
+    def to_dict(self):
+        return {
+            'entry': self.entry,
+            'timestamp': self.timestamp,
+            'argv': sys.argv[1:],
+            'wall_ns': time.perf_counter_ns() - self.started,
+            'phases': self.phases,
+            'totals': self.totals,
+            'counters': self.counters,
+            'info': self.info,
+        }
+
+
+_recorder = None
+
+
+def enable(entry):
+    """Active l'enregistrement pour le point d'entrée courant"""
+    global _recorder
+    _recorder = MetricsRecorder(entry)
+    return _recorder
+
+
+def disable():
+    """Arrête l'enregistrement et retourne l'enregistreur (ou None)"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def active():
+    return _recorder
+
+
+def phase(name):
+    """Chronomètre une phase : `with metrics.phase("solve"): ...`"""
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_PHASE
+    return recorder.phase(name)
+
+
+def timed(name):
+    """Décorateur : chronomètre chaque appel de la fonction comme la phase `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder
+            if recorder is None:
+                return func(*args, **kwargs)
+            with recorder.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, n)
+
+
+def set_info(key, value):
+    recorder = _recorder
+    if recorder is not None:
+        recorder.set_info(key, value)
+
+
+def merge(record):
+    """Ajoute l'enregistrement JSON d'un sous-processus à l'enregistrement actif"""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.merge(record)
+
+
+def add_argument(parser):
+    """Ajoute l'option --metrics à un parseur argparse"""
+    parser.add_argument("--metrics", metavar="FICHIER",
+                        help="Écrit les temps par phase et les compteurs de "
+                             "l'exécution en JSON ('-' pour la sortie standard)")
+
+
+def start(args, entry):
+    """Active l'enregistrement si --metrics a été donné"""
+    if getattr(args, "metrics", None):
+        enable(entry)
+
+
+def finish(args):
+    """Écrit l'enregistrement de l'exécution demandé par --metrics"""
+    path = getattr(args, "metrics", None)
+    recorder = disable()
+    if not path or recorder is None:
+        return None
+
+    record = recorder.to_dict()
+    if path == "-":
+        json.dump(record, sys.stdout, indent=2)
+        print()
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        print("\n".join(format_summary(record)))
+        print(f"Métriques sauvegardées dans '{path}'")
+    return record
+
+
+def format_summary(record):
+    """Tableau lisible des temps par phase d'un enregistrement"""
+    lines = [f"{'Phase':<24} {'Appels':>7} {'Total (ms)':>12} {'Max (ms)':>10}"]
+    for path, timing in record['phases'].items():
+        indent = "  " * path.count("/")
+        lines.append(f"{indent + path.rsplit('/', 1)[-1]:<24} {timing['calls']:>7} "
+                     f"{timing['total_ns']/1e6:>12.3f} {timing['max_ns']/1e6:>10.3f}")
+    lines.append(f"{'(temps total)':<24} {'':>7} {record['wall_ns']/1e6:>12.3f}")
+    for name, value in sorted(record['counters'].items()):
+        lines.append(f"{name:<32} {value:>12}")
+    return lines
@@ -0,0 +1,340 @@
+"""
+Encodage SAT parallèle par tranches d'instants
+
+Pour des horizons de plusieurs milliers d'instants, l'encodage (en Python,
+sur un seul cœur) devient plus long que la résolution. Les instants étant
+indépendants une fois le bloc de la tâche construit (domain_compiler.py),
+l'horizon est découpé en tranches contiguës [début, fin) générées par un
+pool de processus :
+
+- encode() : chaque tranche revient sous forme de listes de clauses,
+  concaténées dans l'ordre des instants ;
+- encode_buffer() : chaque processus écrit sa tranche à sa place dans un
+  tampon int32 en mémoire partagée (clause_buffer.py), sans sérialisation ;
+- write_dimacs() : chaque processus formate directement le texte DIMACS de
+  sa tranche, ajouté au fichier dans l'ordre (le formatage est la partie la
+  plus coûteuse de l'écriture, et le parent ne matérialise jamais la
+  formule).
+
+Le bloc est transmis une seule fois à chaque processus (initialisation du
+pool) ; le pool est réutilisé d'un horizon à l'autre. La formule et le
+fichier produits sont identiques, octet pour octet, à ceux de l'encodage
+séquentiel (encode_task, write_cnf.save_cnf_file ; vérifié par --check).
+
+Utilisation :
+    python parallel_encoding.py domains/gripper_ipc.pddl problems/ipc/gripper_ipc_b20.pddl --horizon 2000 --workers 1 2 4
+    python parallel_encoding.py domains/gripper_ipc.pddl problems/ipc/gripper_ipc_b4.pddl --horizon 500 --check
+"""
+
+import argparse
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from pysat.formula import CNF
+
+import metrics
+from clause_buffer import OFFSET_TYPE, ClauseBuffer, SharedClauses
+from domain_compiler import step_block
+
+# Tranches par processus : assez pour équilibrer la charge sans multiplier
+# les échanges avec le parent
+SHARDS_PER_WORKER = 4
+
+# Bloc de la tâche dans chaque processus du pool (voir _init_worker)
+_BLOCK = None
+
+
+def _init_worker(block):
+    global _BLOCK
+    _BLOCK = block
+
+
+def _shard_clauses(job):
+    horizon, start, stop = job
+    return _BLOCK.step_clauses(horizon, start, stop)
+
+
+def _shard_buffer(job):
+    # Un ClauseBuffer se sérialise comme deux tableaux d'octets
+    horizon, start, stop = job
+    return _BLOCK.step_buffer(horizon, start, stop)
+
+
+def _shard_fill(job):
+    """Écrit la tranche directement à sa place dans le tampon partagé"""
+    horizon, start, stop, handle, first_literal, first_clause = job
+    shard = _BLOCK.step_buffer(horizon, start, stop)
+    shared = SharedClauses.attach(handle)
+    try:
+        n_literals, n_clauses = len(shard.literals), len(shard)
+        shared.literals[first_literal:first_literal + n_literals] = memoryview(shard.literals)
+        shared.offsets[first_clause + 1:first_clause + 1 + n_clauses] = \
+            array(OFFSET_TYPE, [first_literal + o for o in shard.offsets[1:]])
+    finally:
+        shared.close()
+    return n_clauses
+
+
+def _shard_text(job):
+    horizon, start, stop = job
+    return _BLOCK.step_buffer(horizon, start, stop).dimacs()
+
+
+def shard_ranges(horizon, shards):
+    """Découpe [0, horizon) en au plus shards tranches contiguës de tailles voisines"""
+    shards = max(1, min(shards, horizon))
+    size, extra = divmod(horizon, shards)
+    ranges, start = [], 0
+    for i in range(shards):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+class ShardedEncoder:
+    """Encodage d'une tâche par tranches d'instants sur un pool de processus
+
+    Avec workers=1, les tranches sont générées dans le processus courant :
+    même découpage, sans pool (référence des mesures d'accélération).
+    """
+
+    def __init__(self, task, workers=None, shards_per_worker=SHARDS_PER_WORKER):
+        self.task = task
+        self.block = step_block(task)
+        self.workers = workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self.pool = None
+        self.counts = {'encodings': 0, 'shards': 0, 'clauses': 0}
+        self.elapsed = 0.0
+
+    def _jobs(self, horizon):
+        return [(horizon, start, stop) for start, stop in
+                shard_ranges(horizon, self.workers * self.shards_per_worker)]
+
+    def _map(self, function, horizon, jobs=None):
+        jobs = self._jobs(horizon) if jobs is None else jobs
+        self.counts['encodings'] += 1
+        self.counts['shards'] += len(jobs)
+        if self.workers == 1:
+            _init_worker(self.block)
+            return map(function, jobs)
+        if self.pool is None:
+            if _has_shared_memory():
+                # Suivi des ressources démarré avant le pool : les processus le
+                # partagent et n'y inscrivent pas le segment en double
+                from multiprocessing import resource_tracker
+                resource_tracker.ensure_running()
+            with metrics.phase("pool"):
+                self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                initargs=(self.block,))
+        # map rend les tranches dans l'ordre des instants
+        return self.pool.map(function, jobs)
+
+    def encode(self, horizon):
+        """(CNF, var_map) identiques à encode_task(task, horizon)"""
+        start = time.perf_counter()
+        block = self.block
+        with metrics.phase("encode"):
+            clauses = block.initial_clauses()
+            for shard in self._map(_shard_clauses, horizon):
+                clauses.extend(shard)
+            clauses.extend(block.goal_clauses(horizon))
+            cnf = CNF()
+            cnf.clauses = clauses
+            cnf.nv = block.n_vars(horizon)
+            var_map = block.var_map(horizon)
+        self.counts['clauses'] += len(clauses)
+        self.elapsed += time.perf_counter() - start
+        metrics.count("encode.variables", cnf.nv)
+        metrics.count("encode.clauses", len(clauses))
+        return cnf, var_map
+
+    def encode_buffer(self, horizon):
+        """(ClauseBuffer, var_map) : même formule que encode_task_buffer
+
+        Les tailles de chaque tranche étant connues d'avance (un bloc par
+        instant), le tampon final est alloué en mémoire partagée et chaque
+        processus y écrit sa tranche à sa place : rien n'est sérialisé au
+        retour. Sans mémoire partagée (Python 3.7), les tranches reviennent
+        en ClauseBuffer et sont concaténées.
+        """
+        start = time.perf_counter()
+        block = self.block
+        with metrics.phase("encode"):
+            buffer = ClauseBuffer.from_clauses(block.initial_clauses())
+            if self.workers > 1 and horizon > 0 and _has_shared_memory():
+                buffer.extend(self._fill_shared(horizon))
+            else:
+                for shard in self._map(_shard_buffer, horizon):
+                    buffer.extend(shard)
+            buffer.extend(block.goal_clauses(horizon))
+            buffer.nv = block.n_vars(horizon)
+            var_map = block.var_map(horizon)
+        self.counts['clauses'] += len(buffer)
+        self.elapsed += time.perf_counter() - start
+        metrics.count("encode.variables", buffer.nv)
+        metrics.count("encode.clauses", len(buffer))
+        return buffer, var_map
+
+    def _fill_shared(self, horizon):
+        block = self.block
+        step_literals, step_clauses = len(block.bases), len(block.spans)
+        with SharedClauses.allocate(horizon * step_literals, horizon * step_clauses,
+                                    block.n_vars(horizon)) as shared:
+            shared.offsets[0] = 0
+            jobs = [(h, start, stop, shared.handle, start * step_literals, start * step_clauses)
+                    for h, start, stop in self._jobs(horizon)]
+            for _ in self._map(_shard_fill, horizon, jobs):
+                pass
+            # Une copie mémoire par tableau avant de libérer le segment
+            return shared.copy()
+
+    def write_dimacs(self, horizon, filename):
+        """Écrit la formule de l'horizon au format DIMACS, tranche par tranche
+
+        Retourne (variables, clauses). Le fichier est identique à celui de
+        save_cnf_file(encode_task(task, horizon)[0], filename).
+        """
+        start = time.perf_counter()
+        block = self.block
+        n_vars, n_clauses = block.n_vars(horizon), block.n_clauses(horizon)
+        with metrics.phase("write"), open(filename, "w") as f:
+            f.write(f"p cnf {n_vars} {n_clauses}\n")
+            f.write(ClauseBuffer.from_clauses(block.initial_clauses()).dimacs())
+            for text in self._map(_shard_text, horizon):
+                f.write(text)
+            f.write(ClauseBuffer.from_clauses(block.goal_clauses(horizon)).dimacs())
+        self.counts['clauses'] += n_clauses
+        self.elapsed += time.perf_counter() - start
+        return n_vars, n_clauses
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        stats = dict(self.counts)
+        stats.update({
+            'workers': self.workers,
+            'time': self.elapsed,
+            'clauses_per_sec': self.counts['clauses'] / self.elapsed if self.elapsed > 0 else 0.0,
+        })
+        return stats
+
+
+def _has_shared_memory():
+    try:
+        from multiprocessing import shared_memory  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def encode_task_parallel(task, horizon, workers=None):
+    """Raccourci : encode_task par tranches sur un pool éphémère"""
+    with ShardedEncoder(task, workers) as encoder:
+        return encoder.encode(horizon)
+
+
+def write_dimacs_parallel(task, horizon, filename, workers=None):
+    """Raccourci : fichier DIMACS de l'horizon écrit par tranches"""
+    with ShardedEncoder(task, workers) as encoder:
+        return encoder.write_dimacs(horizon, filename)
+
+
+def _same_file(a, b):
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        while True:
+            chunk = fa.read(1 << 20)
+            if chunk != fb.read(1 << 20):
+                return False
+            if not chunk:
+                return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encodage SAT parallèle par tranches d'instants")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problem", help="Fichier problème PDDL")
+    parser.add_argument("--horizon", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Nombres de processus à mesurer (défaut: 1 et tous les cœurs)")
+    parser.add_argument("--out", default="problem_parallel.cnf",
+                        help="Fichier DIMACS écrit (défaut: problem_parallel.cnf)")
+    parser.add_argument("--check", action="store_true",
+                        help="Vérifie formule et fichier contre l'encodage séquentiel")
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "parallel_encoding")
+
+    from encodeur_sat import encode_task
+    from grounding import load_task
+    from write_cnf import save_cnf_file
+
+    task = load_task(args.domain, args.problem)
+    workers_list = args.workers or sorted({1, os.cpu_count() or 1})
+    print(f"{task} - horizon {args.horizon}, {os.cpu_count()} cœur(s)")
+
+    start = time.perf_counter()
+    expected, expected_map = encode_task(task, args.horizon)
+    sequential = time.perf_counter() - start
+    print(f"Encodage séquentiel: {len(expected.clauses)} clauses en {sequential*1000:.0f} ms")
+    if args.check:
+        reference = args.out + ".seq"
+        save_cnf_file(expected, reference)
+    else:
+        del expected, expected_map
+
+    if args.check:
+        expected_buffer = ClauseBuffer.from_clauses(expected.clauses, expected.nv)
+
+    print(f"{'Processus':>9} {'Listes (ms)':>12} {'Accél.':>7} {'Tampon (ms)':>12} {'Accél.':>7} "
+          f"{'DIMACS (ms)':>12} {'Accél.':>7}")
+    identical = True
+    base = None
+    for workers in workers_list:
+        with ShardedEncoder(task, workers) as encoder:
+            # Premier appel : démarrage du pool, non compté
+            encoder.encode(1)
+            start = time.perf_counter()
+            cnf, var_map = encoder.encode(args.horizon)
+            encode_time = time.perf_counter() - start
+            if args.check:
+                identical &= (cnf.clauses == expected.clauses and cnf.nv == expected.nv
+                              and var_map == expected_map)
+            del cnf, var_map
+            start = time.perf_counter()
+            buffer, _ = encoder.encode_buffer(args.horizon)
+            buffer_time = time.perf_counter() - start
+            if args.check:
+                identical &= buffer == expected_buffer
+            del buffer
+            start = time.perf_counter()
+            encoder.write_dimacs(args.horizon, args.out)
+            write_time = time.perf_counter() - start
+        if args.check:
+            identical &= _same_file(args.out, reference)
+        if base is None:
+            base = (encode_time, buffer_time, write_time)
+        print(f"{workers:>9} {encode_time*1000:12.0f} {base[0]/encode_time:6.2f}x "
+              f"{buffer_time*1000:12.0f} {base[1]/buffer_time:6.2f}x "
+              f"{write_time*1000:12.0f} {base[2]/write_time:6.2f}x")
+
+    metrics.finish(args)
+    if args.check:
+        os.remove(reference)
+        print("Formules et fichiers identiques à l'encodage séquentiel" if identical
+              else "Différences avec l'encodage séquentiel !")
+        sys.exit(0 if identical else 1)
@@ -0,0 +1,187 @@
+# Lecture des fichiers PDDL (sous-ensemble STRIPS)
+#
+# Ce module lit les domaines et problèmes PDDL du projet : actions STRIPS à
+# préconditions positives, égalités (= / not =) dans les préconditions, objets
+# et paramètres éventuellement typés. Les effets numériques des domaines avec
+# coûts (increase (total-cost) ...) sont ignorés.
+#
+# Les atomes sont représentés par des tuples : (at_ball, ?x) ou (at_ball, roomA).
+
+import metrics
+
+
+class PDDLError(Exception):
+    """Fichier PDDL mal formé ou hors du sous-ensemble supporté"""
+
+
+def tokenize(text):
+    """Découpe le texte PDDL en jetons, sans les commentaires ;"""
+    tokens = []
+    for line in text.splitlines():
+        line = line.split(";", 1)[0]
+        tokens.extend(line.replace("(", " ( ").replace(")", " ) ").split())
+    return tokens
+
+
+def parse_sexpr(text):
+    """Construit l'arbre de listes imbriquées correspondant au texte"""
+    stack = [[]]
+    for token in tokenize(text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) == 1:
+                raise PDDLError("parenthèse fermante inattendue")
+            expr = stack.pop()
+            stack[-1].append(expr)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise PDDLError("parenthèse non fermée")
+    if len(stack[0]) != 1:
+        raise PDDLError("le fichier doit contenir une seule expression define")
+    return stack[0][0]
+
+
+def parse_typed_list(items):
+    """Liste typée PDDL 'a b - t c' -> [(a, t), (b, t), (c, 'object')]"""
+    result = []
+    pending = []
+    i = 0
+    while i < len(items):
+        if items[i] == "-":
+            if i + 1 >= len(items):
+                raise PDDLError("type manquant après '-'")
+            result.extend((name, items[i + 1]) for name in pending)
+            pending = []
+            i += 2
+        else:
+            pending.append(items[i])
+            i += 1
+    result.extend((name, "object") for name in pending)
+    return result
+
+
+def _conjunction(expr):
+    """Liste des littéraux d'une formule (and ...) ou d'un littéral seul"""
+    if not expr:
+        return []
+    if expr[0] == "and":
+        literals = []
+        for sub in expr[1:]:
+            literals.extend(_conjunction(sub))
+        return literals
+    return [expr]
+
+
+def _parse_precondition(expr, action_name):
+    positive, equalities, inequalities = [], [], []
+    for literal in _conjunction(expr):
+        if literal[0] == "not":
+            inner = literal[1]
+            if inner[0] == "=":
+                inequalities.append(tuple(inner[1:]))
+            else:
+                raise PDDLError(f"{action_name}: préconditions négatives non supportées")
+        elif literal[0] == "=":
+            equalities.append(tuple(literal[1:]))
+        else:
+            positive.append(tuple(literal))
+    return positive, equalities, inequalities
+
+
+def _parse_effect(expr, action_name):
+    add, delete = [], []
+    for literal in _conjunction(expr):
+        if literal[0] == "not":
+            delete.append(tuple(literal[1]))
+        elif literal[0] in ("increase", "decrease", "assign"):
+            # Effets numériques (coûts d'action) : sans incidence sur le plan
+            continue
+        elif literal[0] in ("forall", "when"):
+            raise PDDLError(f"{action_name}: effets {literal[0]} non supportés")
+        else:
+            add.append(tuple(literal))
+    return add, delete
+
+
+def parse_domain(text):
+    """Analyse le texte d'un domaine PDDL"""
+    expr = parse_sexpr(text)
+    if expr[0] != "define" or expr[1][0] != "domain":
+        raise PDDLError("un domaine doit commencer par (define (domain ...))")
+
+    domain = {'name': expr[1][1], 'types': {}, 'predicates': {}, 'actions': []}
+    for section in expr[2:]:
+        key = section[0]
+        if key == ":types":
+            domain['types'] = dict(parse_typed_list(section[1:]))
+        elif key == ":predicates":
+            for pred in section[1:]:
+                domain['predicates'][pred[0]] = len(parse_typed_list(pred[1:]))
+        elif key == ":action":
+            domain['actions'].append(_parse_action(section))
+
+    return domain
+
+
+def _parse_action(section):
+    name = section[1]
+    fields = {}
+    i = 2
+    while i < len(section):
+        if i + 1 >= len(section):
+            raise PDDLError(f"{name}: valeur manquante pour {section[i]}")
+        fields[section[i]] = section[i + 1]
+        i += 2
+
+    parameters = parse_typed_list(fields.get(":parameters", []))
+    positive, equalities, inequalities = _parse_precondition(fields.get(":precondition", []), name)
+    add, delete = _parse_effect(fields.get(":effect", []), name)
+
+    return {
+        'name': name,
+        'parameters': parameters,
+        'precondition': positive,
+        'equalities': equalities,
+        'inequalities': inequalities,
+        'add': add,
+        'delete': delete,
+    }
+
+
+def parse_problem(text):
+    """Analyse le texte d'un problème PDDL"""
+    expr = parse_sexpr(text)
+    if expr[0] != "define" or expr[1][0] != "problem":
+        raise PDDLError("un problème doit commencer par (define (problem ...))")
+
+    problem = {'name': expr[1][1], 'domain': None, 'objects': [], 'init': [], 'goal': []}
+    for section in expr[2:]:
+        key = section[0]
+        if key == ":domain":
+            problem['domain'] = section[1]
+        elif key == ":objects":
+            problem['objects'] = parse_typed_list(section[1:])
+        elif key == ":init":
+            # Les fluents numériques (= (total-cost) 0) sont ignorés
+            problem['init'] = [tuple(atom) for atom in section[1:] if atom[0] != "="]
+        elif key == ":goal":
+            goal = _conjunction(section[1])
+            if any(literal[0] == "not" for literal in goal):
+                raise PDDLError("buts négatifs non supportés")
+            problem['goal'] = [tuple(literal) for literal in goal]
+
+    return problem
+
+
+@metrics.timed("parse")
+def load_domain(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return parse_domain(f.read())
+
+
+@metrics.timed("parse")
+def load_problem(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return parse_problem(f.read())
@@ -0,0 +1,357 @@
+"""
+Comptage des plans par horizon : #SAT projeté sur les variables d'action
+
+Un plan de l'horizon h est une affectation des variables d'action de
+l'encodage qui s'étend en un modèle de la formule ; les variables de faits
+sont quantifiées existentiellement. Énumérer ces plans devient vite
+impossible : on les compte.
+
+- Compteur exact (ProjectedCounter) : DPLL qui ne branche que sur les
+  variables d'action, avec propagation unitaire, décomposition de la formule
+  résiduelle en composantes indépendantes (le compte est le produit des
+  comptes) et cache des composantes déjà comptées. Une composante sans
+  variable d'action compte 1 si elle est satisfiable, 0 sinon.
+- Repli approché (approximate_count), quand le compteur exact dépasse son
+  budget de nœuds : hachage par contraintes XOR aléatoires sur les variables
+  d'action, à la manière d'ApproxMC. Chaque XOR divise l'espace des plans en
+  deux cellules ; on cherche le nombre m de XOR pour lequel la cellule
+  choisie contient moins de `seuil` plans (énumérés sur un solveur
+  incrémental), et l'estimation est (plans de la cellule) * 2^m. La médiane
+  de plusieurs itérations donne le résultat.
+
+Utilisation :
+    python plan_counting.py --horizon 4 6 8
+    python plan_counting.py --domain domains/gripper_family.pddl --problem problems/generated/<instance>.pddl --horizon 9
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from pysat.solvers import Minisat22
+
+import metrics
+
+DEFAULT_NODE_LIMIT = 1000
+
+
+def projection_of(var_map):
+    """Variables d'action de l'encodage (ensemble de projection), triées"""
+    return sorted(var for (typ, _, _), var in var_map.items() if typ == "act")
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def _propagate(clauses, literals):
+    """Propagation unitaire ; retourne (clauses résiduelles, littéraux fixés) ou None si conflit
+
+    Seules les clauses qui contiennent la négation d'un littéral fixé sont
+    réexaminées (listes d'occurrences), puis la formule résiduelle est
+    construite en un passage.
+    """
+    occurrences = {}
+    queue = list(literals)
+    for i, clause in enumerate(clauses):
+        if len(clause) == 1:
+            queue.append(clause[0])
+        for lit in clause:
+            occurrences.setdefault(lit, []).append(i)
+
+    assigned = set()
+    while queue:
+        lit = queue.pop()
+        if lit in assigned:
+            continue
+        if -lit in assigned:
+            return None
+        assigned.add(lit)
+        for i in occurrences.get(-lit, ()):
+            clause = clauses[i]
+            if any(l in assigned for l in clause):
+                continue
+            open_literals = [l for l in clause if -l not in assigned]
+            if not open_literals:
+                return None
+            if len(open_literals) == 1:
+                queue.append(open_literals[0])
+
+    residual = []
+    for clause in clauses:
+        if any(lit in assigned for lit in clause):
+            continue
+        residual.append(tuple(lit for lit in clause if -lit not in assigned))
+    return residual, assigned
+
+
+def _components(clauses):
+    """Partition des clauses en composantes connexes (variables partagées)"""
+    parent = {}
+
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for clause in clauses:
+        first = abs(clause[0])
+        parent.setdefault(first, first)
+        root = find(first)
+        for lit in clause[1:]:
+            v = abs(lit)
+            parent.setdefault(v, v)
+            other = find(v)
+            if other != root:
+                parent[other] = root
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(clause[0])), []).append(clause)
+    return list(groups.values())
+
+
+class ProjectedCounter:
+    """Compteur exact de modèles projetés sur `projection`
+
+    count() lève _BudgetExceeded au-delà de node_limit nœuds de branchement
+    (count_projected passe alors au comptage approché).
+    """
+
+    def __init__(self, clauses, projection, node_limit=DEFAULT_NODE_LIMIT):
+        self.clauses = [tuple(clause) for clause in clauses]
+        self.projection = frozenset(projection)
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.cache = {}
+        self.cache_hits = 0
+        self.sat_checks = 0
+
+    def count(self):
+        propagated = _propagate(self.clauses, ())
+        if propagated is None:
+            return 0
+        residual, assigned = propagated
+        mentioned = {abs(lit) for clause in residual for lit in clause}
+        fixed = {abs(lit) for lit in assigned}
+        free = len(self.projection - mentioned - fixed)
+        return (2 ** free) * self._count_clauses(residual)
+
+    def _count_clauses(self, clauses):
+        total = 1
+        for component in _components(clauses):
+            total *= self._count_component(component)
+            if total == 0:
+                return 0
+        return total
+
+    def _count_component(self, clauses):
+        key = tuple(sorted(tuple(sorted(clause)) for clause in clauses))
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+
+        variables = {abs(lit) for clause in clauses for lit in clause}
+        projected = variables & self.projection
+        if not projected:
+            result = 1 if self._satisfiable(clauses) else 0
+        else:
+            self.nodes += 1
+            if self.nodes > self.node_limit:
+                raise _BudgetExceeded()
+            # Plus petite variable d'action, c'est-à-dire le premier instant
+            # non décidé : une fois l'action de t choisie, la propagation fixe
+            # l'état à t+1, et deux préfixes menant au même état laissent la
+            # même formule résiduelle (succès du cache)
+            var = min(projected)
+
+            result = 0
+            for lit in (var, -var):
+                propagated = _propagate(clauses, (lit,))
+                if propagated is None:
+                    continue
+                residual, assigned = propagated
+                mentioned = {abs(l) for clause in residual for l in clause}
+                fixed = {abs(l) for l in assigned}
+                # Variables d'action disparues sans être fixées : libres
+                free = len(projected - mentioned - fixed)
+                result += (2 ** free) * self._count_clauses(residual)
+
+        self.cache[key] = result
+        return result
+
+    def _satisfiable(self, clauses):
+        self.sat_checks += 1
+        with Minisat22(bootstrap_with=clauses) as solver:
+            return solver.solve()
+
+    def stats(self):
+        return {'nodes': self.nodes, 'cache_entries': len(self.cache),
+                'cache_hits': self.cache_hits, 'sat_checks': self.sat_checks}
+
+
+def _xor_clauses(variables, parity, selector, next_var):
+    """Contrainte XOR(variables) = parity, active quand selector est vrai
+
+    Chaîne de Tseitin y_i = y_{i-1} xor x_i (variables auxiliaires à partir
+    de next_var) ; seule la clause finale dépend du sélecteur, le reste ne fait
+    que définir les y_i. Retourne (clauses, prochaine variable libre).
+    """
+    if not variables:
+        # XOR vide = 0 : la contrainte est fausse si parity vaut 1
+        return ([[-selector]] if parity else []), next_var
+    clauses = []
+    current = variables[0]
+    for x in variables[1:]:
+        y = next_var
+        next_var += 1
+        clauses += [[-y, current, x], [-y, -current, -x], [y, -current, x], [y, current, -x]]
+        current = y
+    clauses.append([-selector, current] if parity else [-selector, -current])
+    return clauses, next_var
+
+
+def _bounded_count(solver, projection, threshold, assumptions, selector):
+    """Nombre de plans (jusqu'à threshold) sous les hypothèses, blocage retirable"""
+    found = 0
+    while found < threshold and solver.solve(assumptions=assumptions + [selector]):
+        model = solver.get_model()
+        # Blocage sur les variables d'action seules, désactivable par selector
+        solver.add_clause([-selector] + [-model[v - 1] for v in projection])
+        found += 1
+    # Les blocages de cette cellule ne servent plus
+    solver.add_clause([-selector])
+    return found
+
+
+def approximate_count(clauses, projection, epsilon=0.8, iterations=9, seed=0):
+    """Estimation du nombre de plans par hachage XOR (ApproxMC simplifié)
+
+    Retourne (estimation, détail des itérations). Avec peu de plans (moins
+    que le seuil), le compte retourné est exact.
+    """
+    projection = list(projection)
+    threshold = int(1 + 9.84 * (1 + epsilon / (1 + epsilon)) * (1 + 1 / epsilon) ** 2)
+    rng = random.Random(seed)
+    top = max((abs(lit) for clause in clauses for lit in clause), default=0)
+    top = max(top, max(projection, default=0))
+
+    with Minisat22(bootstrap_with=clauses) as solver:
+        exact = _bounded_count(solver, projection, threshold, [], top + 1)
+    if exact < threshold:
+        return exact, {'threshold': threshold, 'exact': True, 'iterations': []}
+
+    estimates = []
+    rounds = []
+    for _ in range(iterations):
+        next_var = top + 1
+        selectors = []
+
+        with Minisat22(bootstrap_with=clauses) as solver:
+            cells = {}
+
+            def cell(m):
+                nonlocal next_var
+                # Les XOR sont ajoutés au solveur au fur et à mesure : seuls
+                # les log2(nombre de plans) premiers environ servent
+                while len(selectors) < m:
+                    chosen = [v for v in projection if rng.random() < 0.5]
+                    selector = next_var
+                    xor, next_var = _xor_clauses(chosen, rng.random() < 0.5, selector, next_var + 1)
+                    solver.append_formula(xor)
+                    selectors.append(selector)
+                if m not in cells:
+                    cells[m] = _bounded_count(solver, projection, threshold, selectors[:m], next_var)
+                    next_var += 1
+                return cells[m]
+
+            # Le nombre de plans d'une cellule décroît avec m (XOR emboîtés) :
+            # recherche exponentielle puis dichotomique du plus petit m sous le seuil
+            low, high = 0, 1
+            while high < len(projection) and cell(high) >= threshold:
+                low, high = high, min(2 * high, len(projection))
+            while high - low > 1:
+                middle = (low + high) // 2
+                if cell(middle) >= threshold:
+                    low = middle
+                else:
+                    high = middle
+            m = high
+            estimates.append(cell(m) * 2 ** m)
+            rounds.append({'xor': m, 'cell': cell(m)})
+
+    return int(statistics.median(estimates)), {'threshold': threshold, 'exact': False,
+                                                'iterations': rounds}
+
+
+@metrics.timed("count")
+def count_projected(clauses, projection, node_limit=DEFAULT_NODE_LIMIT, epsilon=0.8,
+                    iterations=9, seed=0):
+    """Nombre de modèles projetés : exact si possible, approché sinon
+
+    Retourne un dictionnaire : count, method ('exact' ou 'approx'), time,
+    et le détail du compteur (nœuds, cache) ou des itérations de hachage.
+    """
+    start = time.perf_counter()
+    counter = ProjectedCounter(clauses, projection, node_limit)
+    try:
+        count = counter.count()
+        result = {'count': count, 'method': 'exact', 'counter': counter.stats()}
+    except _BudgetExceeded:
+        count, detail = approximate_count(clauses, projection, epsilon, iterations, seed)
+        result = {'count': count, 'method': 'exact' if detail['exact'] else 'approx',
+                  'epsilon': epsilon, 'approx': detail, 'counter': counter.stats()}
+    result['time'] = time.perf_counter() - start
+    result['projection'] = len(projection)
+    metrics.count("count.nodes", counter.nodes)
+    return result
+
+
+def count_plans(cnf, var_map, **options):
+    """Nombre de plans (affectations des variables d'action) d'un encodage"""
+    return count_projected(cnf.clauses, projection_of(var_map), **options)
+
+
+def format_count(result):
+    approx = "≈ " if result['method'] == 'approx' else ""
+    return f"{approx}{result['count']} plans ({result['method']}, {result['time']*1000:.2f} ms)"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comptage des plans par horizon (#SAT projeté)")
+    parser.add_argument("--horizon", type=int, nargs="+", default=[2, 3, 4, 5, 6, 8])
+    parser.add_argument("--domain", help="Domaine PDDL (défaut: encodage Gripper de base)")
+    parser.add_argument("--problem", help="Problème PDDL (avec --domain)")
+    parser.add_argument("--node-limit", type=int, default=DEFAULT_NODE_LIMIT,
+                        help="Nœuds du compteur exact avant le repli approché")
+    parser.add_argument("--approx", action="store_true", help="Comptage approché seulement")
+    parser.add_argument("--epsilon", type=float, default=0.8)
+    parser.add_argument("--iterations", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=0)
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "plan_counting")
+
+    if args.domain:
+        from encodeur_sat import encode_task
+        from grounding import load_task
+        task = load_task(args.domain, args.problem)
+        encode = lambda horizon: encode_task(task, horizon)
+    else:
+        from encodeur_sat import encode_gripper
+        encode = lambda horizon: encode_gripper(horizon=horizon)
+
+    for horizon in args.horizon:
+        cnf, var_map = encode(horizon)
+        result = count_plans(cnf, var_map, node_limit=0 if args.approx else args.node_limit,
+                             epsilon=args.epsilon, iterations=args.iterations, seed=args.seed)
+        print(f"horizon {horizon:3}: {format_count(result)}, "
+              f"{result['projection']} variables d'action, "
+              f"{result['counter']['nodes']} nœuds, {result['counter']['cache_hits']} succès du cache")
+
+    metrics.finish(args)
+    sys.exit(0)
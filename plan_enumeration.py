@@ -0,0 +1,292 @@
+"""
+Énumération de k plans distincts sur un solveur incrémental
+
+Après chaque modèle, une clause bloque le plan trouvé sur les seules
+variables d'action : deux modèles qui ne diffèrent que par des valeurs de
+faits sans importance donnent le même plan, et ne sont donc pas énumérés
+deux fois. Le même solveur est réinterrogé (les clauses apprises sont
+conservées) et les plans sont produits au fil de l'eau.
+
+Pour une tâche instanciée, deux plans qui ne diffèrent que par l'ordre
+d'actions indépendantes (ni l'une ni l'autre ne touche les préconditions ou
+les effets de l'autre) sont le même plan. Chaque plan est ramené à une forme
+canonique : la plus petite linéarisation, dans l'ordre des indices d'actions,
+parmi celles obtenues en échangeant des actions indépendantes. Les doublons
+sont écartés. Des clauses supplémentaires, valides pour au moins un
+représentant de chaque classe, élaguent la plupart de ces doublons dans le
+solveur même :
+- pas d'instant vide avant une action (les instants vides sont à la fin) ;
+- jamais b à t puis a à t+1 quand a < b et a, b indépendantes.
+
+Utilisation :
+    python plan_enumeration.py domain.pddl problem.pddl -k 10
+    python plan_enumeration.py domains/gripper_family.pddl problems/generated/<instance>.pddl -k 50 --slack 2
+    python plan_enumeration.py domain.pddl problem.pddl -k 1000 --quiet --out plans.bin
+"""
+
+import argparse
+import sys
+import time
+
+from pysat.solvers import Minisat22
+
+import metrics
+from decode_plan import decode_plan, format_plan_lines
+from encodeur_sat import encode_task
+from grounding import load_task
+from plan_ir import write_plans
+from sat_planner import plan_task
+from solver_budget import SAT, UNSAT, Deadline, add_arguments, budget_from_args, solve_limited
+from state_space import state_space_of
+
+
+def action_steps(var_map):
+    """Variables d'action regroupées par instant : {t: [variable, ...]}"""
+    steps = {}
+    for (typ, _, t), var in var_map.items():
+        if typ == "act":
+            steps.setdefault(t, []).append(var)
+    return steps
+
+
+class PlanEnumerator:
+    """Plans distincts d'une formule, sur un seul solveur incrémental
+
+    key(plan) donne la forme sous laquelle deux plans sont considérés égaux
+    (par défaut la suite de ses étapes (t, action)) ; les plans de même clé ne sont
+    produits qu'une fois.
+    """
+
+    def __init__(self, clauses, var_map, key=None, budget=None, deadline=None):
+        self.var_map = var_map
+        self.rev_map = {v: k for k, v in var_map.items()}
+        self.steps = action_steps(var_map)
+        self.key = key
+        self.budget = budget
+        self.deadline = deadline if isinstance(deadline, Deadline) else Deadline(deadline)
+        with metrics.phase("build"):
+            self.solver = Minisat22(bootstrap_with=clauses)
+
+        self.found = set()
+        self.solver_calls = 0
+        self.duplicates = 0
+        self.elapsed = 0.0
+        self.status = None
+
+    def add_clauses(self, clauses):
+        for clause in clauses:
+            self.solver.add_clause(clause)
+
+    def _blocking_clause(self, model_vars):
+        """Exclut exactement l'affectation des variables d'action du modèle
+
+        Aux instants où une action est vraie, elle doit devenir fausse ; aux
+        instants vides, une action doit devenir vraie. Les variables de faits
+        n'apparaissent pas : les modèles qui ne diffèrent que par elles sont
+        exclus avec celui-ci.
+        """
+        clause = []
+        for variables in self.steps.values():
+            chosen = [v for v in variables if v in model_vars]
+            clause.extend([-v for v in chosen] if chosen else variables)
+        return clause
+
+    def plans(self, k):
+        """Génère au plus k plans distincts, au fur et à mesure qu'ils sont trouvés
+
+        Chaque plan est un dictionnaire : index, plan (plan_ir.Plan), temps
+        écoulé depuis le début de l'énumération.
+        """
+        start = time.perf_counter()
+        produced = 0
+        try:
+            while produced < k:
+                with metrics.phase("solve"):
+                    self.status = solve_limited(self.solver, self.budget, self.deadline)
+                self.solver_calls += 1
+                metrics.count("solver.calls")
+                if self.status != SAT:
+                    break
+
+                model = self.solver.get_model()
+                model_vars = {v for v in model if v > 0}
+                plan = decode_plan(model, rev_map=self.rev_map, horizon=len(self.steps))
+                self.solver.add_clause(self._blocking_clause(model_vars))
+
+                key = self.key(plan) if self.key is not None else tuple(plan)
+                if key in self.found:
+                    self.duplicates += 1
+                    continue
+                self.found.add(key)
+                produced += 1
+                yield {'index': produced, 'plan': plan,
+                       'time': time.perf_counter() - start}
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def stats(self):
+        plans = len(self.found)
+        return {
+            'plans': plans,
+            'duplicates': self.duplicates,
+            'solver_calls': self.solver_calls,
+            'status': self.status,
+            'time': self.elapsed,
+            'plans_per_sec': plans / self.elapsed if self.elapsed > 0 else 0.0,
+        }
+
+    def close(self):
+        if self.solver is not None:
+            self.solver.delete()
+            self.solver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def independence(task):
+    """Fonction indépendant(a, b) entre indices d'actions de la tâche
+
+    Deux actions sont indépendantes quand aucune ne modifie les préconditions
+    de l'autre ni ne supprime ses effets : elles sont alors applicables dans
+    les deux ordres, avec le même résultat.
+    """
+    space = state_space_of(task)
+    pre, add = space.pre, space.add
+    delete = [~keep for keep in space.keep]
+    touched = [add[a] | delete[a] for a in range(len(task.actions))]
+
+    def independent(a, b):
+        return (pre[a] & touched[b] == 0 and pre[b] & touched[a] == 0
+                and add[a] & delete[b] == 0 and add[b] & delete[a] == 0)
+    return independent
+
+
+def canonical_order(task, plan, independent=None):
+    """Forme canonique d'un plan modulo l'échange d'actions indépendantes
+
+    Tuple d'indices d'actions : à chaque étape, parmi les actions restantes
+    qui peuvent passer devant toutes celles qui les précèdent, on prend celle
+    de plus petit indice (plus petite linéarisation lexicographique).
+    """
+    independent = independent or independence(task)
+    index = state_space_of(task).action_index
+    remaining = [index[name] for _, name in plan]
+    canonical = []
+    while remaining:
+        best = None
+        for i, a in enumerate(remaining):
+            if all(independent(a, b) for b in remaining[:i]) and (best is None or a < remaining[best]):
+                best = i
+        canonical.append(remaining.pop(best))
+    return tuple(canonical)
+
+
+def ordering_clauses(task, horizon, var_map, independent=None):
+    """Clauses d'élagage des plans équivalents (voir l'en-tête du module)"""
+    independent = independent or independence(task)
+    n_actions = len(task.actions)
+    names = [action.name for action in task.actions]
+    pairs = [(a, b) for a in range(n_actions) for b in range(a + 1, n_actions)
+             if independent(a, b)]
+
+    clauses = []
+    for t in range(horizon - 1):
+        now = [var_map[("act", names[a], t)] for a in range(n_actions)]
+        following = [var_map[("act", names[a], t + 1)] for a in range(n_actions)]
+        # Pas d'action à t+1 sans action à t
+        for var in following:
+            clauses.append([-var] + now)
+        # Ordre canonique entre deux actions indépendantes consécutives
+        for a, b in pairs:
+            clauses.append([-now[b], -following[a]])
+    return clauses
+
+
+def task_enumerator(task, horizon, distinct_orders=True, budget=None, deadline=None):
+    """PlanEnumerator pour une tâche instanciée à un horizon donné
+
+    Avec distinct_orders, les plans qui ne diffèrent que par l'ordre d'actions
+    indépendantes ou par la place des instants vides sont confondus.
+    """
+    cnf, var_map = encode_task(task, horizon)
+    if not distinct_orders:
+        return PlanEnumerator(cnf.clauses, var_map, budget=budget, deadline=deadline)
+
+    independent = independence(task)
+    enumerator = PlanEnumerator(cnf.clauses, var_map,
+                                key=lambda plan: canonical_order(task, plan, independent),
+                                budget=budget, deadline=deadline)
+    enumerator.add_clauses(ordering_clauses(task, horizon, var_map, independent))
+    return enumerator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Énumération de k plans distincts")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problem", help="Fichier problème PDDL")
+    parser.add_argument("-k", type=int, default=10, help="Nombre de plans")
+    parser.add_argument("--horizon", type=int, default=None,
+                        help="Horizon d'énumération (défaut: longueur optimale + --slack)")
+    parser.add_argument("--slack", type=int, default=0,
+                        help="Actions supplémentaires permises au-delà de l'optimum")
+    parser.add_argument("--keep-reorderings", action="store_true",
+                        help="Garder les plans qui ne diffèrent que par l'ordre d'actions indépendantes")
+    parser.add_argument("--max-horizon", type=int, default=40)
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDES",
+                        help="Échéance de l'énumération")
+    parser.add_argument("--quiet", action="store_true", help="N'affiche pas le détail des plans")
+    parser.add_argument("--out", default=None, metavar="FICHIER",
+                        help="Enregistre les plans (FICHIER.jsonl ou binaire, voir plan_ir.py)")
+    add_arguments(parser)
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "plan_enumeration")
+
+    task = load_task(args.domain, args.problem)
+    print(f"Tâche: {len(task.facts)} faits, {len(task.actions)} actions")
+
+    horizon = args.horizon
+    if horizon is None:
+        result = plan_task(task, args.max_horizon)
+        if result['plan'] is None:
+            print(f"Aucun plan de longueur <= {args.max_horizon}")
+            metrics.finish(args)
+            sys.exit(1)
+        horizon = result['horizon'] + args.slack
+        print(f"Longueur optimale: {result['horizon']}, énumération à l'horizon {horizon}")
+
+    def report(found_plans):
+        for found in found_plans:
+            print(f"\nPlan {found['index']}: {len(found['plan'])} actions "
+                  f"({found['time']*1000:.2f} ms)")
+            if not args.quiet:
+                for line in format_plan_lines(found['plan']):
+                    print("  " + line)
+            found['plan'].task = task.name
+            yield found['plan']
+
+    with task_enumerator(task, horizon, not args.keep_reorderings,
+                         budget_from_args(args), args.deadline) as enumerator:
+        plans = report(enumerator.plans(args.k))
+        if args.out:
+            # Écriture au fil de l'énumération : les plans ne sont pas gardés en mémoire
+            write_plans(plans, args.out)
+        else:
+            for _ in plans:
+                pass
+        stats = enumerator.stats()
+
+    print(f"\n{stats['plans']} plans distincts en {stats['time']:.3f}s "
+          f"({stats['plans_per_sec']:.1f} plans/s), {stats['solver_calls']} appels au solveur, "
+          f"{stats['duplicates']} doublons écartés")
+    if args.out:
+        print(f"Plans enregistrés dans {args.out}")
+    if stats['plans'] < args.k:
+        reason = "plus aucun plan" if stats['status'] == UNSAT else "budget épuisé"
+        print(f"Énumération arrêtée avant {args.k} plans ({reason})")
+    metrics.set_info('plans', stats['plans'])
+    metrics.finish(args)
@@ -0,0 +1,317 @@
+"""
+Représentation structurée des plans et sérialisation compacte
+
+Un plan circulait sous forme de texte : run_solver écrivait « Étape 1:
+pickup_roomA à t=0 » dans plan_output.txt, puis val_validator retrouvait
+les actions PDDL par recherche de sous-chaînes codées en dur. Ici un plan
+est un objet : une suite de PlanStep (instant t, action instanciée), avec la
+tâche et l'horizon dont il vient. Le décodeur (decode_plan.py) le produit ;
+le validateur, les rapports et les exports le lisent directement.
+
+PlanStep reste une paire (t, action) : les appelants qui déballent
+`for t, action in plan` ou rejouent le plan (StateSpace.validate) n'ont pas
+à changer. action est le nom de l'action dans var_map : un tuple
+(schéma, paramètres...) pour une tâche instanciée, ou un nom de
+encode_gripper (pickup_roomA...), traduit en action PDDL par
+LEGACY_ACTIONS.
+
+Deux formats de stockage, choisis par l'extension du fichier :
+- .jsonl : un plan par ligne, {"task", "horizon", "steps": [[t, schéma,
+  paramètres...], ...]} ;
+- sinon binaire : chaque plan est une suite d'entiers int32 (nombre
+  d'étapes, horizon, tâche, puis t et numéro d'action par étape), la table
+  des actions et des tâches est écrite une fois à la fin du fichier. Il est
+  relu par mmap.
+
+Utilisation :
+    plan = decode_plan(model, var_map, task="gripper", horizon=4)
+    write_plans([plan], "plans.jsonl")
+    for plan in iter_plans("plans.bin"): ...
+    python plan_ir.py plan_output.jsonl --convert plans.bin
+    python plan_ir.py plan_output.jsonl --bench 1000000
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
+
+# Actions de encode_gripper (domain.pddl) en actions instanciées
+LEGACY_ACTIONS = {
+    "pickup_roomA": ("pickup", "roomA"),
+    "pickup_roomB": ("pickup", "roomB"),
+    "drop_roomA": ("drop", "roomA"),
+    "drop_roomB": ("drop", "roomB"),
+    "move_A_to_B": ("move", "roomA", "roomB"),
+    "move_B_to_A": ("move", "roomB", "roomA"),
+}
+
+# Fichier binaire : signature, nombre de plans, position de la table
+PLANS_MAGIC = b"PLANIR01"
+PLANS_HEADER = struct.Struct("<8sqq")
+# Horizon ou tâche inconnus dans un enregistrement binaire
+MISSING = -1
+
+# Ligne de plan_output.txt (format_plan_lines)
+_PLAN_LINE = re.compile(r"Étape \d+: (?P<name>[^\s(]+)(?:\((?P<params>[^)]*)\))? à t=(?P<t>\d+)")
+
+
+def format_action(action):
+    """Représentation textuelle d'une action (simple ou paramétrée)"""
+    if isinstance(action, tuple):
+        act_name, *params = action
+        return f"{act_name}({', '.join(params)})"
+    return str(action)
+
+
+class PlanStep(namedtuple('PlanStep', 't action')):
+    """Action instanciée à l'instant t ; se déballe comme la paire (t, action)"""
+
+    __slots__ = ()
+
+    @property
+    def grounded(self):
+        """Action sous forme (schéma, paramètres...)"""
+        if isinstance(self.action, tuple):
+            return self.action
+        return LEGACY_ACTIONS.get(self.action, (self.action,))
+
+    @property
+    def name(self):
+        return self.grounded[0]
+
+    @property
+    def params(self):
+        return self.grounded[1:]
+
+    def pddl(self):
+        """Action au format des plans PDDL (VAL) : (move roomA roomB)"""
+        return "(" + " ".join(self.grounded) + ")"
+
+    def record(self):
+        return [self.t] + list(self.grounded)
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record[0], tuple(record[1:]))
+
+
+class Plan:
+    """Plan séquentiel : étapes (PlanStep) triées par instant, tâche et horizon
+
+    Se comporte comme la liste de ses étapes (len, itération, indices).
+    """
+
+    __slots__ = ('steps', 'task', 'horizon')
+
+    def __init__(self, steps=(), task=None, horizon=None):
+        self.steps = tuple(step if isinstance(step, PlanStep) else PlanStep(*step) for step in steps)
+        self.task = task
+        self.horizon = horizon
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __getitem__(self, index):
+        return self.steps[index]
+
+    def __eq__(self, other):
+        if not isinstance(other, Plan):
+            return NotImplemented
+        # Noms historiques et actions instanciées sont la même action
+        return ([s.record() for s in self.steps] == [s.record() for s in other.steps]
+                and (self.task, self.horizon) == (other.task, other.horizon))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Plan({self.task or '?'}: {len(self.steps)} actions, horizon {self.horizon})"
+
+    def grounded(self):
+        """Copie du plan en actions (schéma, paramètres...) : rejouable sur une GroundTask"""
+        return Plan([PlanStep(s.t, s.grounded) for s in self.steps], self.task, self.horizon)
+
+    def lines(self):
+        """Lignes au format de plan_output.txt"""
+        return [f"Étape {i+1}: {format_action(step.action)} à t={step.t}"
+                for i, step in enumerate(self.steps)]
+
+    def to_pddl(self):
+        return "".join(step.pddl() + "\n" for step in self.steps)
+
+    def write_pddl(self, filename):
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(self.to_pddl())
+
+    def to_record(self):
+        return {'task': self.task, 'horizon': self.horizon,
+                'steps': [step.record() for step in self.steps]}
+
+    @classmethod
+    def from_record(cls, record):
+        return cls([PlanStep.from_record(step) for step in record['steps']],
+                   record.get('task'), record.get('horizon'))
+
+    @classmethod
+    def from_lines(cls, lines, task=None, horizon=None):
+        """Plan relu depuis les lignes de plan_output.txt (ancien format texte)"""
+        steps = []
+        for line in lines:
+            match = _PLAN_LINE.search(line)
+            if match is None:
+                continue
+            name, params = match.group('name'), match.group('params')
+            action = (name,) + tuple(p.strip() for p in params.split(",") if p.strip()) \
+                if params is not None else name
+            steps.append(PlanStep(int(match.group('t')), action))
+        return cls(steps, task, horizon)
+
+
+# JSON lignes
+
+def write_jsonl(plans, filename):
+    """Un plan par ligne ; retourne le nombre de plans écrits"""
+    count = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        for plan in plans:
+            f.write(json.dumps(plan.to_record(), ensure_ascii=False, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def iter_jsonl(filename):
+    with open(filename, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield Plan.from_record(json.loads(line))
+
+
+# Binaire
+
+def write_binary(plans, filename):
+    """Plans en enregistrements int32, table des actions et des tâches à la fin"""
+    actions, tasks = {}, {}
+    count = 0
+    with open(filename, "wb") as f:
+        f.write(PLANS_HEADER.pack(PLANS_MAGIC, 0, 0))
+        for plan in plans:
+            task = MISSING if plan.task is None else tasks.setdefault(plan.task, len(tasks))
+            record = array('i', [len(plan.steps), MISSING if plan.horizon is None else plan.horizon, task])
+            for step in plan.steps:
+                record.append(step.t)
+                record.append(actions.setdefault(step.grounded, len(actions)))
+            f.write(record.tobytes())
+            count += 1
+        table = f.tell()
+        f.write(json.dumps({'actions': [list(a) for a in actions], 'tasks': list(tasks)},
+                           ensure_ascii=False).encode("utf-8"))
+        f.seek(0)
+        f.write(PLANS_HEADER.pack(PLANS_MAGIC, count, table))
+    return count
+
+
+def iter_binary(filename):
+    with open(filename, "rb") as f:
+        magic, count, table = PLANS_HEADER.unpack(f.read(PLANS_HEADER.size))
+        if magic != PLANS_MAGIC:
+            raise ValueError(f"{filename}: fichier de plans invalide")
+        f.seek(table)
+        names = json.loads(f.read().decode("utf-8"))
+        if count == 0:
+            return
+        actions = [tuple(a) for a in names['actions']]
+        tasks = names['tasks']
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            ints = view[PLANS_HEADER.size:table].cast('i')
+            try:
+                position = 0
+                for _ in range(count):
+                    n, horizon, task = ints[position:position + 3]
+                    pairs = ints[position + 3:position + 3 + 2 * n].tolist()
+                    position += 3 + 2 * n
+                    yield Plan([PlanStep(pairs[i], actions[pairs[i + 1]]) for i in range(0, 2 * n, 2)],
+                               None if task == MISSING else tasks[task],
+                               None if horizon == MISSING else horizon)
+            finally:
+                ints.release()
+                view.release()
+
+
+def write_plans(plans, filename):
+    """Écrit des plans (itérable, parcouru une seule fois) : .jsonl ou binaire"""
+    if filename.endswith(".jsonl"):
+        return write_jsonl(plans, filename)
+    return write_binary(plans, filename)
+
+
+def iter_plans(filename):
+    """Plans d'un fichier écrit par write_plans, au fil de la lecture"""
+    if filename.endswith(".jsonl"):
+        return iter_jsonl(filename)
+    return iter_binary(filename)
+
+
+def load_plan(filename):
+    """Premier plan d'un fichier de plans, ou d'un plan_output.txt"""
+    if filename.endswith(".txt"):
+        with open(filename, "r", encoding="utf-8") as f:
+            return Plan.from_lines(f)
+    for plan in iter_plans(filename):
+        return plan
+    raise ValueError(f"{filename}: aucun plan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plans structurés : conversion et mesure des formats")
+    parser.add_argument("plans", nargs="?", default="plan_output.jsonl",
+                        help="Fichier de plans (.jsonl, binaire ou plan_output.txt)")
+    parser.add_argument("--convert", metavar="FICHIER",
+                        help="Réécrit les plans dans FICHIER (.jsonl ou binaire)")
+    parser.add_argument("--bench", type=int, default=None, metavar="N",
+                        help="Écrit et relit N copies du premier plan dans chaque format")
+    args = parser.parse_args()
+
+    if args.convert:
+        source = [load_plan(args.plans)] if args.plans.endswith(".txt") else iter_plans(args.plans)
+        count = write_plans(source, args.convert)
+        print(f"{args.convert}: {count} plans ({os.path.getsize(args.convert)} octets)")
+
+    if args.bench:
+        plan = load_plan(args.plans)
+        print(f"{plan!r} x {args.bench}")
+        text = "bench_plans.txt"
+        start = time.perf_counter()
+        with open(text, "w", encoding="utf-8") as f:
+            for _ in range(args.bench):
+                f.write("\n".join(plan.lines()) + "\n\n")
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(text, "r", encoding="utf-8") as f:
+            blocks = f.read().split("\n\n")
+        read_count = sum(1 for block in blocks if Plan.from_lines(block.splitlines()))
+        read = time.perf_counter() - start
+        results = [("Texte (plan_output.txt)", os.path.getsize(text), written, read, read_count)]
+        os.remove(text)
+        for label, filename in (("JSON lignes", "bench_plans.jsonl"), ("Binaire int32", "bench_plans.bin")):
+            start = time.perf_counter()
+            write_plans((plan for _ in range(args.bench)), filename)
+            written = time.perf_counter() - start
+            start = time.perf_counter()
+            read_count = sum(1 for _ in iter_plans(filename))
+            read = time.perf_counter() - start
+            results.append((label, os.path.getsize(filename), written, read, read_count))
+            os.remove(filename)
+        print(f"{'Format':<25} {'Taille (Mio)':>13} {'Écriture (s)':>13} {'Lecture (s)':>12} {'Plans':>9}")
+        for label, size, written, read, read_count in results:
+            print(f"{label:<25} {size/2**20:13.2f} {written:13.3f} {read:12.3f} {read_count:9}")
+    sys.exit(0)
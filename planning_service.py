@@ -0,0 +1,371 @@
+"""
+Service de planification local (mode démon) pour le domaine Gripper
+
+Chaque appel aux scripts paie le démarrage de Python et l'import de pysat.
+Ce service garde en mémoire, entre deux requêtes, les imports, les encodages
+CNF déjà calculés pour chaque horizon et un pool de solveurs MiniSat prêts à
+l'emploi. Les requêtes sont servies en parallèle en HTTP sur localhost
+uniquement : aucun accès réseau externe n'est nécessaire.
+
+Utilisation :
+    python planning_service.py serve --port 8765 --workers 4
+    python planning_service.py client --port 8765 --requests 20 --concurrency 4
+    python planning_service.py selftest
+
+Requêtes acceptées :
+    POST /plan    {"horizon": 4}  -> plan, statut SAT/UNSAT et latence
+                  {"horizon": 4, "time_limit": 0.5}
+                                  -> statut UNKNOWN si la limite (s) est atteinte
+    GET  /stats                   -> nombre de requêtes et latences
+    GET  /health                  -> {"status": "ok"}
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pysat.solvers import Minisat22
+
+from clause_buffer import ClauseBuffer
+from decode_plan import decode_actions, format_action
+from encodeur_sat import encode_gripper
+from solver_budget import SAT, solve_limited
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_HORIZON = 64
+
+
+class EncodingCache:
+    """Encodages CNF déjà calculés, partagés entre tous les workers"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, horizon):
+        """Retourne (clauses, rev_map) pour l'horizon et indique si l'entrée était en cache"""
+        with self._lock:
+            entry = self._entries.get(horizon)
+        if entry is not None:
+            return entry, True
+
+        # L'encodage est fait hors du verrou : deux requêtes simultanées
+        # peuvent encoder le même horizon, seule la première entrée est gardée
+        cnf, var_map = encode_gripper(horizon=horizon)
+        # Les encodages restent en cache toute la vie du démon : tampon int32
+        entry = (ClauseBuffer.from_clauses(cnf.clauses, cnf.nv), {v: k for k, v in var_map.items()})
+        with self._lock:
+            entry = self._entries.setdefault(horizon, entry)
+        return entry, False
+
+    def horizons(self):
+        with self._lock:
+            return sorted(self._entries)
+
+
+class PlanningService:
+    """Pool de solveurs chauds servant des requêtes de planification"""
+
+    def __init__(self, workers=4):
+        self.workers = workers
+        self.cache = EncodingCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="solveur")
+        # Chaque thread du pool garde un solveur par horizon : un solveur
+        # pysat n'est pas partageable entre threads, mais il peut être
+        # réinterrogé autant de fois que nécessaire sur la même formule
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._solvers = []
+        self._latencies = []
+        self._errors = 0
+        self._started = time.time()
+
+    def warm_up(self, horizons):
+        """Pré-calcule les encodages des horizons les plus demandés"""
+        for horizon in horizons:
+            self.cache.get(horizon)
+
+    def _get_solver(self, horizon, clauses):
+        solvers = getattr(self._local, "solvers", None)
+        if solvers is None:
+            solvers = self._local.solvers = {}
+
+        solver = solvers.get(horizon)
+        if solver is None:
+            solver = Minisat22(bootstrap_with=clauses)
+            solvers[horizon] = solver
+            with self._lock:
+                self._solvers.append(solver)
+            return solver, False
+        return solver, True
+
+    def _solve(self, horizon, submitted, budget=None):
+        started = time.perf_counter()
+        (clauses, rev_map), cached = self.cache.get(horizon)
+        encoded = time.perf_counter()
+
+        solver, warm = self._get_solver(horizon, clauses)
+        # Un solveur interrompu reste utilisable pour les requêtes suivantes
+        status = solve_limited(solver, budget)
+        solved = time.perf_counter()
+
+        plan = []
+        if status == SAT:
+            actions = decode_actions(solver.get_model(), rev_map=rev_map)
+            plan = [{"t": t, "action": format_action(action)} for t, action in actions]
+
+        return {
+            "horizon": horizon,
+            "status": status,
+            "plan": plan,
+            "encoding_cached": cached,
+            "solver_warm": warm,
+            "timings_ms": {
+                "queue": (started - submitted) * 1000,
+                "encode": (encoded - started) * 1000,
+                "solve": (solved - encoded) * 1000,
+            },
+        }
+
+    def plan(self, request):
+        """Traite une requête de planification et mesure sa latence"""
+        start = time.perf_counter()
+        horizon = request.get("horizon", 4)
+        if isinstance(horizon, bool) or not isinstance(horizon, int) \
+                or not 1 <= horizon <= MAX_HORIZON:
+            with self._lock:
+                self._errors += 1
+            raise ValueError(f"horizon invalide: {horizon!r} (attendu: entier entre 1 et {MAX_HORIZON})")
+        time_limit = request.get("time_limit")
+        if time_limit is not None and (isinstance(time_limit, bool)
+                                       or not isinstance(time_limit, (int, float))
+                                       or time_limit <= 0):
+            with self._lock:
+                self._errors += 1
+            raise ValueError(f"time_limit invalide: {time_limit!r} (attendu: secondes > 0)")
+        budget = {'time': time_limit} if time_limit is not None else None
+
+        result = self.executor.submit(self._solve, horizon, start, budget).result()
+        latency = (time.perf_counter() - start) * 1000
+        result["latency_ms"] = latency
+
+        with self._lock:
+            self._latencies.append(latency)
+        return result
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            errors = self._errors
+            solvers = len(self._solvers)
+
+        stats = {
+            "requests": len(latencies),
+            "errors": errors,
+            "workers": self.workers,
+            "warm_solvers": solvers,
+            "cached_horizons": self.cache.horizons(),
+            "uptime_s": time.time() - self._started,
+        }
+        if latencies:
+            stats["latency_ms"] = summarize_latencies(latencies)
+        return stats
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            for solver in self._solvers:
+                solver.delete()
+            self._solvers = []
+
+
+def summarize_latencies(latencies):
+    """Résumé min / médiane / p95 / max d'une liste de latences en ms"""
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": p95,
+        "max": ordered[-1],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+class PlanningRequestHandler(BaseHTTPRequestHandler):
+    """Traduction HTTP <-> PlanningService"""
+
+    server_version = "GripperPlanningService/1.0"
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.server.service.stats())
+        else:
+            self._send_json(404, {"error": f"chemin inconnu: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/plan":
+            self._send_json(404, {"error": f"chemin inconnu: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("la requête doit être un objet JSON")
+            result = self.server.service.plan(request)
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": f"erreur interne: {e}"})
+            return
+
+        self._send_json(200, result)
+        if not self.server.quiet:
+            print(f" /plan horizon={result['horizon']} {result['status']} "
+                  f"{result['latency_ms']:.2f} ms")
+
+    def log_message(self, format, *args):
+        # Les requêtes sont déjà journalisées avec leur latence dans do_POST
+        pass
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4,
+                  warm_horizons=(2, 3, 4, 5, 6, 8), quiet=False):
+    """Crée le serveur HTTP (port 0 = port libre choisi par le système)"""
+    service = PlanningService(workers=workers)
+    service.warm_up(warm_horizons)
+
+    server = ThreadingHTTPServer((host, port), PlanningRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=4):
+    """Lance le service jusqu'à interruption (Ctrl+C)"""
+    server = create_server(host, port, workers)
+    print(f"Service de planification à l'écoute sur http://{host}:{server.server_address[1]}")
+    print(f"Workers: {workers}, horizons pré-encodés: {server.service.cache.horizons()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nArrêt du service")
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+# Client de test : aucun proxy, même si l'environnement en définit un
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+def request_plan(horizon, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30):
+    """Envoie une requête /plan et retourne (réponse, latence côté client en ms)"""
+    body = json.dumps({"horizon": horizon}).encode("utf-8")
+    request = urllib.request.Request(f"http://{host}:{port}/plan", data=body,
+                                     headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with _opener.open(request, timeout=timeout) as response:
+        payload = json.loads(response.read())
+    return payload, (time.perf_counter() - start) * 1000
+
+
+def fetch_stats(host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30):
+    with _opener.open(f"http://{host}:{port}/stats", timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def run_client(host=DEFAULT_HOST, port=DEFAULT_PORT, requests=20, concurrency=4,
+               horizons=(2, 3, 4, 5, 6, 8)):
+    """Client de test : envoie des requêtes concurrentes et affiche les latences"""
+    print(f"Envoi de {requests} requêtes ({concurrency} en parallèle)...")
+    jobs = [horizons[i % len(horizons)] for i in range(requests)]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        responses = list(pool.map(lambda h: request_plan(h, host, port), jobs))
+
+    for payload, client_ms in responses[:len(horizons)]:
+        plan = ", ".join(step["action"] for step in payload["plan"]) or "-"
+        print(f"  horizon {payload['horizon']}: {payload['status']:5} "
+              f"serveur {payload['latency_ms']:7.2f} ms | client {client_ms:7.2f} ms | {plan}")
+
+    summary = summarize_latencies([client_ms for _, client_ms in responses])
+    print(f"\nLatence client (ms): min {summary['min']:.2f} | médiane {summary['median']:.2f} "
+          f"| p95 {summary['p95']:.2f} | max {summary['max']:.2f}")
+    return responses
+
+
+def run_selftest(requests=20, concurrency=4, workers=4):
+    """Démarre un service éphémère, l'interroge avec le client de test puis l'arrête"""
+    server = create_server(port=0, workers=workers, quiet=True)
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        responses = run_client(port=port, requests=requests, concurrency=concurrency)
+        stats = fetch_stats(port=port)
+        print(f"Statistiques serveur: {stats['requests']} requêtes, "
+              f"{stats['warm_solvers']} solveurs chauds")
+        return all(payload["status"] in ("SAT", "UNSAT") for payload, _ in responses)
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service de planification SAT local")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Lance le service")
+    p_serve.add_argument("--host", default=DEFAULT_HOST)
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--workers", type=int, default=4)
+
+    p_client = sub.add_parser("client", help="Client de test")
+    p_client.add_argument("--host", default=DEFAULT_HOST)
+    p_client.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_client.add_argument("--requests", type=int, default=20)
+    p_client.add_argument("--concurrency", type=int, default=4)
+
+    p_test = sub.add_parser("selftest", help="Service éphémère + client de test")
+    p_test.add_argument("--requests", type=int, default=20)
+    p_test.add_argument("--concurrency", type=int, default=4)
+    p_test.add_argument("--workers", type=int, default=4)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers)
+    elif args.command == "client":
+        run_client(args.host, args.port, args.requests, args.concurrency)
+    elif args.command == "selftest":
+        if not run_selftest(args.requests, args.concurrency, args.workers):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
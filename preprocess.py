@@ -0,0 +1,257 @@
+"""
+Prétraitement de la CNF entre l'encodage et la résolution
+
+L'encodage produit des clauses redondantes : l'état initial est donné par des
+clauses unitaires dont les variables (t=0) atteignent pourtant le solveur,
+et les axiomes de cadre et d'exclusion écrits à la main se recouvrent. Le
+prétraitement simplifie la formule, dans l'ordre :
+
+1. propagation unitaire : les littéraux fixés disparaissent de la formule ;
+2. subsomption (une clause qui en contient une autre est retirée) et
+   résolution auto-subsumante (C v l et D v -l avec C inclus dans D : -l
+   est retiré de D) ;
+3. élimination bornée de variables (BVE) : une variable est remplacée par
+   les résolvantes de ses clauses quand elles ne sont pas plus nombreuses
+   que les clauses retirées. Les variables gelées (les actions) ne sont
+   jamais éliminées : le plan se décode directement sur le modèle.
+
+La formule obtenue est équisatisfiable. extend() reconstruit un modèle
+complet de la formule d'origine à partir d'un modèle de la formule
+simplifiée : valeurs fixées par la propagation, puis variables éliminées,
+dans l'ordre inverse de leur élimination.
+
+Utilisation :
+    pre = Preprocessor(cnf.clauses, frozen=actions, n_vars=cnf.nv)
+    clauses = pre.run()
+    ... résolution de clauses ...
+    model = pre.extend(solver.get_model())
+"""
+
+import time
+
+import metrics
+
+# Au-delà, l'élimination d'une variable n'est pas tentée (trop de résolvantes)
+MAX_OCCURRENCES = 16
+MAX_RESOLVENT_LENGTH = 20
+
+
+class Preprocessor:
+    """Simplification d'une CNF avec reconstruction des modèles"""
+
+    def __init__(self, clauses, frozen=(), n_vars=None):
+        self.frozen = set(frozen)
+        self.n_vars = n_vars if n_vars is not None else max(
+            (abs(lit) for clause in clauses for lit in clause), default=0)
+        self.original_clauses = len(clauses)
+        self.clauses = []          # frozenset de littéraux, None si retirée
+        self.occurs = {}           # littéral -> indices des clauses qui le contiennent
+        self.units = []
+        self.assigned = {}         # variable -> valeur fixée par la propagation
+        self.eliminated = []       # (variable, clauses retirées), dans l'ordre
+        self.unsat = False
+        self.counts = {'fixed': 0, 'satisfied': 0, 'subsumed': 0, 'strengthened': 0,
+                       'eliminated': 0, 'resolvents': 0, 'tautologies': 0}
+        self.elapsed = 0.0
+        for clause in clauses:
+            self._add(clause)
+
+    # Gestion des clauses et des listes d'occurrences
+
+    def _add(self, literals):
+        clause = frozenset(literals)
+        if any(-lit in clause for lit in clause):
+            self.counts['tautologies'] += 1
+            return None
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        for lit in clause:
+            self.occurs.setdefault(lit, set()).add(index)
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.units.append(next(iter(clause)))
+        return index
+
+    def _remove(self, index):
+        clause = self.clauses[index]
+        for lit in clause:
+            self.occurs[lit].discard(index)
+        self.clauses[index] = None
+
+    def _strengthen(self, index, lit):
+        """Retire lit de la clause index"""
+        clause = self.clauses[index] - {lit}
+        self.occurs[lit].discard(index)
+        self.clauses[index] = clause
+        if not clause:
+            self.unsat = True
+        elif len(clause) == 1:
+            self.units.append(next(iter(clause)))
+
+    def _occurrences(self, lit):
+        return self.occurs.get(lit, ())
+
+    # 1. Propagation unitaire
+
+    def propagate(self):
+        while self.units and not self.unsat:
+            lit = self.units.pop()
+            var = abs(lit)
+            if var in self.assigned:
+                if self.assigned[var] != (lit > 0):
+                    self.unsat = True
+                continue
+            self.assigned[var] = lit > 0
+            self.counts['fixed'] += 1
+            for index in list(self._occurrences(lit)):
+                self._remove(index)
+                self.counts['satisfied'] += 1
+            for index in list(self._occurrences(-lit)):
+                self._strengthen(index, -lit)
+
+    # 2. Subsomption et résolution auto-subsumante
+
+    def subsume(self, queue=None):
+        """Traite les clauses de queue (toutes par défaut), plus courtes d'abord"""
+        if queue is None:
+            queue = [i for i, clause in enumerate(self.clauses) if clause is not None]
+        pending = set(queue)
+        while pending and not self.unsat:
+            batch = sorted(pending, key=lambda i: len(self.clauses[i]) if self.clauses[i] is not None else 0)
+            pending = set()
+            for index in batch:
+                clause = self.clauses[index]
+                if clause is None or not clause:
+                    continue
+                # Toute clause D qui contient la clause (ou la clause avec un
+                # littéral inversé) contient pivot ou -pivot
+                pivot = min(clause, key=lambda l: len(self._occurrences(l)) + len(self._occurrences(-l)))
+                candidates = set(self._occurrences(pivot)) | set(self._occurrences(-pivot))
+                candidates.discard(index)
+                for other in candidates:
+                    target = self.clauses[other]
+                    if target is None or len(target) < len(clause):
+                        continue
+                    missing = [lit for lit in clause if lit not in target]
+                    if not missing:
+                        self._remove(other)
+                        self.counts['subsumed'] += 1
+                    elif len(missing) == 1 and -missing[0] in target:
+                        self._strengthen(other, -missing[0])
+                        self.counts['strengthened'] += 1
+                        pending.add(other)
+                self.propagate()
+
+    # 3. Élimination bornée de variables
+
+    def _resolvents(self, var):
+        positive = [self.clauses[i] for i in self._occurrences(var)]
+        negative = [self.clauses[i] for i in self._occurrences(-var)]
+        resolvents = []
+        for p in positive:
+            rest = p - {var}
+            for n in negative:
+                resolvent = rest | (n - {-var})
+                if any(-lit in resolvent for lit in resolvent):
+                    continue
+                if len(resolvent) > MAX_RESOLVENT_LENGTH:
+                    return None
+                resolvents.append(resolvent)
+                if len(resolvents) > len(positive) + len(negative):
+                    return None
+        return resolvents
+
+    def eliminate(self):
+        candidates = [var for var in range(1, self.n_vars + 1)
+                      if var not in self.frozen and var not in self.assigned]
+        candidates.sort(key=lambda v: len(self._occurrences(v)) * len(self._occurrences(-v)))
+        for var in candidates:
+            if self.unsat:
+                break
+            if var in self.assigned:
+                continue
+            occurrences = len(self._occurrences(var)) + len(self._occurrences(-var))
+            if occurrences == 0 or occurrences > MAX_OCCURRENCES:
+                continue
+            resolvents = self._resolvents(var)
+            if resolvents is None:
+                continue
+
+            removed = list(self._occurrences(var)) + list(self._occurrences(-var))
+            self.eliminated.append((var, [self.clauses[i] for i in removed]))
+            self.counts['eliminated'] += 1
+            for index in removed:
+                self._remove(index)
+            added = []
+            for resolvent in resolvents:
+                index = self._add(resolvent)
+                if index is not None:
+                    added.append(index)
+            self.counts['resolvents'] += len(added)
+            self.propagate()
+            self.subsume(added)
+
+    @metrics.timed("preprocess")
+    def run(self, eliminate=True):
+        """Applique les trois étapes ; retourne les clauses simplifiées (listes)"""
+        start = time.perf_counter()
+        self.propagate()
+        self.subsume()
+        if eliminate:
+            self.eliminate()
+        self.elapsed = time.perf_counter() - start
+        return self.result()
+
+    def result(self):
+        if self.unsat:
+            return [[]]
+        return [sorted(clause, key=abs) for clause in self.clauses if clause is not None]
+
+    # Reconstruction des modèles
+
+    def extend(self, model):
+        """Modèle complet de la formule d'origine (liste ±v pour v = 1..n_vars)"""
+        values = {abs(lit): lit > 0 for lit in model}
+        values.update(self.assigned)
+
+        def satisfied(clause):
+            return any(values.get(abs(lit), False) == (lit > 0) for lit in clause)
+
+        # Ordre inverse : une variable éliminée ne dépend que de variables
+        # encore présentes au moment de son élimination
+        for var, clauses in reversed(self.eliminated):
+            values[var] = False
+            if not all(satisfied(clause) for clause in clauses):
+                values[var] = True
+        return [v if values.get(v, False) else -v for v in range(1, self.n_vars + 1)]
+
+    def stats(self):
+        remaining = [clause for clause in self.clauses if clause is not None]
+        variables = {abs(lit) for clause in remaining for lit in clause}
+        stats = dict(self.counts)
+        stats.update({
+            'clauses_before': self.original_clauses,
+            'clauses_after': len(remaining),
+            'variables_before': self.n_vars,
+            'variables_after': len(variables),
+            'literals_after': sum(len(clause) for clause in remaining),
+            'preprocess_time': self.elapsed,
+            'unsat': self.unsat,
+        })
+        return stats
+
+
+def preprocess(clauses, frozen=(), n_vars=None, eliminate=True):
+    """Raccourci : (clauses simplifiées, Preprocessor pour extend et stats)"""
+    pre = Preprocessor(clauses, frozen, n_vars)
+    return pre.run(eliminate), pre
+
+
+def format_stats(stats):
+    reduction = 1 - stats['clauses_after'] / stats['clauses_before'] if stats['clauses_before'] else 0.0
+    return (f"{stats['clauses_before']} -> {stats['clauses_after']} clauses (-{reduction:.0%}), "
+            f"{stats['variables_before']} -> {stats['variables_after']} variables, "
+            f"{stats['fixed']} fixées, {stats['eliminated']} éliminées, "
+            f"{stats['subsumed']} subsumées, {stats['strengthened']} renforcées "
+            f"({stats['preprocess_time']*1000:.1f} ms)")
@@ -1,7 +1,14 @@
 import os
 import sys
 import time
+import json
+import hashlib
+import argparse
+import ast
+import threading
 import subprocess
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 def check_dependencies():
 
@@ -10,11 +17,12 @@ def check_dependencies():
     required_packages = ['pysat', 'matplotlib']
     missing = []
     
+    # Les étapes tournent dans des sous-processus : inutile d'importer ici
+    # les paquets, il suffit de vérifier qu'ils sont installés
     for package in required_packages:
-        try:
-            __import__(package)
+        if importlib.util.find_spec(package) is not None:
             print(f" {package}")
-        except ImportError:
+        else:
             print(f" {package}")
             missing.append(package)
     
@@ -33,8 +41,11 @@ def check_files():
         'domain.pddl',
         'problem.pddl', 
         'encodeur_sat.py',
+        'domain_compiler.py',
+        'clause_buffer.py',
         'write_cnf.py',
         'run_solver.py',
+        'cnf_stream.py',
         'benchmark.py'
     ]
     
@@ -52,14 +63,126 @@ def check_files():
     
     return True
 
+# Fichier d'état de l'exécuteur : empreintes des entrées de chaque étape
+STATE_FILE = ".exercise_state.json"
+
+# Étapes de l'exercice et fichiers qu'elles lisent / produisent. Les
+# dépendances entre étapes sont déduites de ces déclarations : une étape
+# dépend de toutes celles qui produisent l'un de ses fichiers d'entrée.
+# Seuls les fichiers de données sont déclarés : les modules Python d'une
+# étape sont ceux que son script importe, directement ou non (step_inputs).
+STEPS = [
+    {
+        'id': 'cnf',
+        'name': '1. Génération du fichier CNF',
+        'command': [sys.executable, 'write_cnf.py'],
+        'description': 'Encode le problème en format SAT CNF',
+        'inputs': [],
+        'outputs': ['problem.cnf', 'var_map.pkl']
+    },
+    {
+        'id': 'solve',
+        'name': '2. Résolution SAT',
+        'command': [sys.executable, 'run_solver.py'],
+        'description': 'Résout le problème avec MiniSat et génère le plan',
+        'inputs': ['problem.cnf', 'var_map.pkl'],
+        'outputs': ['plan_output.txt', 'plan_output.jsonl']
+    },
+    {
+        'id': 'benchmark',
+        'name': '3. Benchmark performance',
+        'command': [sys.executable, 'benchmark.py'],
+        'description': 'Analyse les performances sur différents horizons',
+        'inputs': [],
+        'outputs': ['benchmark_report.txt', 'benchmark_results.png', 'benchmark_results.json']
+    },
+    {
+        'id': 'validation',
+        'name': '4. Validation VAL',
+        'command': [sys.executable, 'val_validator.py'],
+        'description': 'Valide le plan avec l\'outil VAL',
+        'inputs': ['domain.pddl', 'problem.pddl', 'plan_output.jsonl'],
+        'outputs': ['plan_pddl.txt']
+    },
+    {
+        'id': 'comparison',
+        'name': '5. Comparaison planificateurs',
+        'command': [sys.executable, 'compare_planners.py'],
+        'description': 'Compare avec BFS, DFS, HSP, GBFS et A* sur la même tâche',
+        'inputs': ['domain.pddl', 'problem.pddl'],
+        'outputs': ['planners_comparison.txt']
+    },
+    {
+        'id': 'results',
+        'name': '6. Génération résultats finaux',
+        'command': [sys.executable, 'generate_results.py'],
+        'description': 'Compile tous les résultats et génère le rapport',
+        'inputs': ['plan_output.txt', 'benchmark_report.txt', 'planners_comparison.txt'],
+        'outputs': ['exercise_summary.txt']
+    }
+]
+
+def module_imports(path, cache=None):
+    """Fichiers des modules importés par un fichier Python (premier nom de chaque import)
+
+    cache : dictionnaire chemin -> imports, réutilisé tant que la taille et
+    la date du fichier ne changent pas (conservé dans STATE_FILE).
+    """
+    st = os.stat(path)
+    key = [st.st_size, st.st_mtime_ns]
+    cached = cache.get(path) if cache is not None else None
+    if cached and cached['stat'] == key:
+        return cached['imports']
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+        else:
+            continue
+        imports.extend(name.split('.')[0] + '.py' for name in names)
+    imports = sorted(set(imports))
+    if cache is not None:
+        cache[path] = {'stat': key, 'imports': imports}
+    return imports
+
+def local_imports(script, cache=None):
+    """Modules du projet importés par le script, directement ou non (script compris)
+
+    Toutes les instructions import sont suivies, y compris celles placées
+    dans une fonction : un module importé seulement à l'exécution change
+    lui aussi le résultat de l'étape.
+    """
+    seen = set()
+    pending = [script]
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        pending.extend(module_imports(path, cache))
+    return seen
+
+def step_inputs(step, cache=None):
+    """Fichiers d'entrée d'une étape : modules importés par son script et données déclarées"""
+    script = step['command'][1] if isinstance(step['command'], list) else None
+    modules = local_imports(script, cache) if script and script.endswith('.py') else set()
+    return sorted(modules) + [path for path in step['inputs'] if path not in modules]
+
+_print_lock = threading.Lock()
+
 def run_step(step_name, command, description):
     """Exécute une étape de l'exercice"""
-    print(f"\n{'='*50}")
-    print(f"ÉTAPE: {step_name}")
-    print(f"{'='*50}")
-    print(f"Description: {description}")
-    print(f"Commande: {command}")
-    print()
+    # La sortie est affichée d'un bloc à la fin de l'étape pour que deux
+    # étapes exécutées en parallèle ne mélangent pas leurs messages
+    lines = [f"\n{'='*50}", f"ÉTAPE: {step_name}", f"{'='*50}",
+             f"Description: {description}",
+             f"Commande: {' '.join(command) if isinstance(command, list) else command}", ""]
+    success = False
     
     try:
         if isinstance(command, list):
@@ -68,80 +191,179 @@ def run_step(step_name, command, description):
             result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
         
         if result.stdout:
-            print("SORTIE:")
-            print(result.stdout)
+            lines.append("SORTIE:")
+            lines.append(result.stdout)
         
-        print(f" {step_name} terminé avec succès")
-        return True
+        lines.append(f" {step_name} terminé avec succès")
+        success = True
         
     except subprocess.CalledProcessError as e:
-        print(f" Erreur dans {step_name}:")
-        print(f"Code de retour: {e.returncode}")
+        lines.append(f" Erreur dans {step_name}:")
+        lines.append(f"Code de retour: {e.returncode}")
         if e.stdout:
-            print(f"Sortie: {e.stdout}")
+            lines.append(f"Sortie: {e.stdout}")
         if e.stderr:
-            print(f"Erreur: {e.stderr}")
-        return False
+            lines.append(f"Erreur: {e.stderr}")
     except Exception as e:
-        print(f" Erreur inattendue dans {step_name}: {e}")
+        lines.append(f" Erreur inattendue dans {step_name}: {e}")
+    
+    with _print_lock:
+        print("\n".join(lines))
+    return success
+
+def file_digest(path, cache):
+    """Empreinte SHA-256 d'un fichier, recalculée seulement si sa taille ou sa date changent"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    
+    key = [st.st_size, st.st_mtime_ns]
+    cached = cache.get(path)
+    if cached and cached['stat'] == key:
+        return cached['sha256']
+    
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    cache[path] = {'stat': key, 'sha256': h.hexdigest()}
+    return cache[path]['sha256']
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'files': {}, 'imports': {}, 'steps': {}}
+    state.setdefault('files', {})
+    state.setdefault('imports', {})
+    state.setdefault('steps', {})
+    return state
+
+def save_state(state):
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+def step_dependencies(steps, inputs=None):
+    """Déduit les dépendances de chaque étape à partir des entrées / sorties déclarées
+
+    inputs : id -> fichiers d'entrée (step_inputs), calculés ici s'ils manquent.
+    """
+    if inputs is None:
+        inputs = {step['id']: step_inputs(step) for step in steps}
+    producers = {}
+    for step in steps:
+        for output in step['outputs']:
+            producers[output] = step['id']
+    
+    return {step['id']: sorted({producers[i] for i in inputs[step['id']]
+                                if i in producers and producers[i] != step['id']})
+            for step in steps}
+
+def step_fingerprint(step, state, inputs=None):
+    """Empreinte des entrées et de la commande d'une étape"""
+    if inputs is None:
+        inputs = step_inputs(step, state.get('imports'))
+    return {
+        'command': step['command'][1:] if isinstance(step['command'], list) else step['command'],
+        'inputs': {path: file_digest(path, state['files']) for path in inputs}
+    }
+
+def is_up_to_date(step, state, inputs=None):
+    """Une étape est à jour si ses entrées n'ont pas changé depuis sa dernière réussite"""
+    previous = state['steps'].get(step['id'])
+    if not previous or not previous.get('success'):
         return False
+    if not all(os.path.exists(path) for path in step['outputs']):
+        return False
+    return previous['fingerprint'] == step_fingerprint(step, state, inputs)
+
+def run_step_graph(steps, jobs=4, force=False):
+    """Exécute les étapes en respectant leurs dépendances, en parallèle quand c'est possible
+
+    Retourne un dictionnaire id -> 'success' | 'skipped' | 'failed' | 'blocked'.
+    """
+    state = {'files': {}, 'imports': {}, 'steps': {}} if force else load_state()
+    # Les imports des scripts sont analysés une fois par exécution (et
+    # seulement pour les fichiers modifiés depuis la précédente)
+    inputs = {step['id']: step_inputs(step, state['imports']) for step in steps}
+    deps = step_dependencies(steps, inputs)
+    by_id = {step['id']: step for step in steps}
+    
+    status = {}
+    running = {}
+    
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(status) < len(steps):
+            settled = len(status)
+            for step in steps:
+                sid = step['id']
+                if sid in status or sid in running:
+                    continue
+                if any(d not in status for d in deps[sid]):
+                    continue
+                
+                if any(status[d] in ('failed', 'blocked') for d in deps[sid]):
+                    status[sid] = 'blocked'
+                    with _print_lock:
+                        print(f"\n {step['name']} non exécuté (dépendance en échec)")
+                    continue
+                
+                if is_up_to_date(step, state, inputs[sid]):
+                    status[sid] = 'skipped'
+                    with _print_lock:
+                        print(f"\n {step['name']} à jour (entrées inchangées)")
+                    continue
+                
+                running[sid] = pool.submit(run_step, step['name'], step['command'],
+                                           step['description'])
+            
+            if not running:
+                if len(status) == settled:
+                    raise RuntimeError("Dépendances cycliques entre les étapes")
+                continue
+            
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for sid, future in list(running.items()):
+                if future not in done:
+                    continue
+                del running[sid]
+                success = future.result()
+                status[sid] = 'success' if success else 'failed'
+                # Les entrées sont relues après l'étape : une étape qui réécrit
+                # l'un de ses propres fichiers d'entrée ne sera pas relancée
+                # pour autant à l'exécution suivante
+                state['steps'][sid] = {
+                    'success': success,
+                    'fingerprint': step_fingerprint(by_id[sid], state, inputs[sid])
+                }
+                save_state(state)
+    
+    # Conserve aussi les imports analysés quand aucune étape n'a tourné
+    save_state(state)
+    return status
 
-def run_complete_exercise():
+def run_complete_exercise(jobs=4, force=False):
 
     print(" EXERCICE 1 : PLANIFICATEUR SAT")
     print(" EXÉCUTION COMPLÈTE")
     print("=" * 50)
     
-    # Étapes
-    steps = [
-        {
-            'name': '1. Génération du fichier CNF',
-            'command': 'python write_cnf.py',
-            'description': 'Encode le problème en format SAT CNF'
-        },
-        {
-            'name': '2. Résolution SAT', 
-            'command': 'python run_solver.py',
-            'description': 'Résout le problème avec MiniSat et génère le plan'
-        },
-        {
-            'name': '3. Benchmark performance',
-            'command': 'python benchmark.py', 
-            'description': 'Analyse les performances sur différents horizons'
-        },
-        {
-            'name': '4. Validation VAL',
-            'command': 'python val_validator.py',
-            'description': 'Valide le plan avec l\'outil VAL'
-        },
-        {
-            'name': '5. Comparaison planificateurs',
-            'command': 'python compare_planners.py',
-            'description': 'Compare avec HSP et autres planificateurs'
-        },
-        {
-            'name': '6. Génération résultats finaux',
-            'command': 'python generate_results.py',
-            'description': 'Compile tous les résultats et génère le rapport'
-        }
-    ]
-    
-    # Compteurs de succès
-    success_count = 0
-    total_steps = len(steps)
+    start = time.perf_counter()
+    status = run_step_graph(STEPS, jobs=jobs, force=force)
+    elapsed = time.perf_counter() - start
     
-    # Exécution de chaque étape
-    for step in steps:
-        success = run_step(step['name'], step['command'], step['description'])
-        if success:
-            success_count += 1
-        
-        # Petite pause entre les étapes
-        time.sleep(1)
+    # Compteurs de succès : une étape à jour compte comme réussie
+    success_count = sum(1 for s in status.values() if s in ('success', 'skipped'))
+    skipped_count = sum(1 for s in status.values() if s == 'skipped')
+    total_steps = len(STEPS)
     
     # Résumé final
-    print("RÉSUMÉ DE L'EXÉCUTION")
-    print(f"Étapes réussies: {success_count}/{total_steps}")
+    print("\nRÉSUMÉ DE L'EXÉCUTION")
+    print(f"Étapes réussies: {success_count}/{total_steps} "
+          f"(dont {skipped_count} à jour, non relancées)")
+    print(f"Durée totale: {elapsed:.2f}s")
     
     if success_count == total_steps:
         print("EXERCICE COMPLÈTEMENT RÉUSSI!")
@@ -168,6 +390,7 @@ def run_complete_exercise():
         'problem.cnf',
         'var_map.pkl', 
         'plan_output.txt',
+        'plan_output.jsonl',
         'benchmark_results.png',
         'benchmark_report.txt',
         'validation_report.txt',
@@ -188,22 +411,22 @@ def create_submission_package():
     """Crée un package de soumission pour l'exercice"""
     print(f"\nCRÉATION DU PACKAGE DE SOUMISSION")
     
+    # Scripts livrés, avec tous les modules du projet qu'ils importent
+    scripts = [step['command'][1] for step in STEPS if isinstance(step['command'], list)]
+    scripts += ['batch_planner.py', 'parallel_encoding.py', 'run_full_exercise.py']
+    cache = load_state()['imports']
+    modules = set()
+    for script in scripts:
+        modules |= local_imports(script, cache)
+    
     # liste des fichiers à inclure dans la soumission
     submission_files = [
-       
         'domain.pddl',
         'problem.pddl',
-        'encodeur_sat.py', 
-        'write_cnf.py',
-        'run_solver.py',
-        'benchmark.py',
-        'val_validator.py',
-        'compare_planners.py',
-        'generate_results.py',
-        'run_full_exercise.py',
-        
+    ] + sorted(modules) + [
         # Résultats
         'plan_output.txt',
+        'plan_output.jsonl',
         'benchmark_results.png',
         'benchmark_report.txt',
         'validation_report.txt',
@@ -260,6 +483,13 @@ def create_submission_package():
     return submission_dir
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exécution complète de l'exercice")
+    parser.add_argument("--jobs", type=int, default=4,
+                        help="Nombre d'étapes indépendantes exécutées en parallèle")
+    parser.add_argument("--force", action="store_true",
+                        help="Relance toutes les étapes, même celles qui sont à jour")
+    args = parser.parse_args()
+    
     print("LANCEMENT DE L'EXERCICE COMPLET")
     print("=" * 40)
     
@@ -274,7 +504,7 @@ if __name__ == "__main__":
     print("Toutes les vérifications passées")
     
     # Lancement de l'exercice complet
-    success = run_complete_exercise()
+    success = run_complete_exercise(jobs=args.jobs, force=args.force)
     
     # Création de package de soumission
     if success:
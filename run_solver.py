@@ -1,7 +1,16 @@
 from pysat.solvers import Minisat22
+import argparse
 import pickle
 import time
+import metrics
+from cnf_stream import load_into_solver, read_buffer
+from decode_plan import decode_plan, format_action
+from grounding import fact_name
+from plan_ir import write_plans
+from solver_budget import SAT, UNKNOWN, add_arguments, budget_from_args, format_budget, solve_limited
+from solver_stats import collect, format_stats, with_rates
 
+@metrics.timed("load")
 def load_cnf_file(filename): #Chargement d'un fichier CNF au format DIMACS et retourne les clauses
     clauses = []
     with open(filename, "r") as f:
@@ -25,6 +34,13 @@ def print_state(var_map, model, t):
         if typ == "fact" and time == t:
             facts_at_t[fact] = var_id in model and model[model.index(var_id)] > 0
     
+    # Tâche instanciée depuis PDDL (plusieurs balles ou pinces) : faits
+    # (prédicat, objets...), affichés tels quels
+    if any(isinstance(fact, tuple) for fact in facts_at_t):
+        for fact in sorted(f for f, value in facts_at_t.items() if value):
+            print(f" {fact_name(fact)}")
+        return
+    
     # Position du robot
     if facts_at_t.get("at_robot_roomA", False):
         print(" Robot dans roomA")
@@ -46,100 +62,122 @@ def print_state(var_map, model, t):
         print(" Main occupée")
 
 if __name__ == "__main__":
-    try:
-        # chargement du fichier CNF qui venait d'être généré
-        print("Chargement du problème CNF...")
-        clauses = load_cnf_file("problem.cnf")
+    parser = argparse.ArgumentParser(description="Résolution de problem.cnf avec MiniSat")
+    parser.add_argument("--plans", type=int, default=1, metavar="K",
+                        help="Énumère jusqu'à K plans distincts (défaut: 1)")
+    parser.add_argument("--no-sidecar", action="store_true",
+                        help="Ignore problem.cnf.bin et lit le fichier DIMACS")
+    add_arguments(parser)
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "run_solver")
 
+    try:
         #Chargement du dictionnaire de mapping des variables
-        with open("var_map.pkl", "rb") as f:
+        with metrics.phase("load"), open("var_map.pkl", "rb") as f:
             var_map = pickle.load(f)
 
-        print(f"Clauses chargées: {len(clauses)}")
-        print(f"Variables mappées: {len(var_map)}")
+        # Chargement du fichier CNF qui venait d'être généré, directement
+        # dans le solveur et par paquets (cnf_stream.py) : la liste de toutes
+        # les clauses n'est jamais construite
+        print("Chargement du problème CNF...")
+        # Solveur libéré même si le chargement échoue (ligne DIMACS ou fichier binaire invalide)
+        with Minisat22() as solver:
+            with metrics.phase("build"):
+                loaded = load_into_solver(solver, "problem.cnf", use_sidecar=not args.no_sidecar)
+
+            print(f"Clauses chargées: {loaded['clauses']} ({loaded['source']}, "
+                  f"{loaded['chunks']} paquets, {loaded['time']:.3f}s)")
+            print(f"Variables mappées: {len(var_map)}")
         
-        # Créer le mapping inverse pour décoder la solution
-        rev_map = {v: k for k, v in var_map.items()}
+            # Créer le mapping inverse pour décoder la solution
+            rev_map = {v: k for k, v in var_map.items()}
 
-        # lancement du solveur SAT MiniSat
-        print("\nRésolution avec MiniSat...")
-        with Minisat22(bootstrap_with=clauses) as solver:
+            # lancement du solveur SAT MiniSat
+            budget = budget_from_args(args)
+            print(f"\nRésolution avec MiniSat (budget: {format_budget(budget)})...")
             start = time.time()
-            if solver.solve():
-                end = time.time()
+            with metrics.phase("solve"):
+                status = solve_limited(solver, budget)
+            end = time.time()
+            metrics.count("solver.calls")
+            metrics.set_info('status', status)
+            search = with_rates(collect(solver), end - start)
+            if status == SAT:
                 model = solver.get_model()
                 print(" Plan trouvé !")
                 print(f"  Temps de résolution: {round(end - start, 4)} secondes")
+                print(f"  Recherche: {format_stats(search)}")
 
-                # Extractions dees actions du modèle
-                actions = []
-                facts_true = []
-                
-                for v in model:
-                    if v > 0 and v in rev_map:
-                        typ, content, t = rev_map[v]
-                        if typ == "act":
-                            actions.append((t, content))
-                        elif typ == "fact":
-                            facts_true.append((content, t))
-
-                # organisation et affichage du plan
-                actions.sort()
+                # Extraction des actions du modèle, triées par instant
+                horizon = max(t for typ, _, t in var_map.keys() if typ == "fact")
+                plan = decode_plan(model, rev_map=rev_map, horizon=horizon)
                 
-                print(f"\n Plan de {len(actions)} actions:")
-                if actions:
+                print(f"\n Plan de {len(plan)} actions:")
+                if plan:
                     # Affichage de l'état initial
                     print_state(var_map, model, 0)
                     
                     # Afficher chaque action et l'état résultant
-                    for i, (t, action) in enumerate(actions):
-                         # Gère l'affichage selon le format de l'action
-                        if isinstance(action, tuple):
-                            if len(action) == 2:
-                                act_name, param = action
-                                print(f"\n Action {i+1}: {act_name}({param}) à t={t}")
-                            elif len(action) == 3:
-                                act_name, param1, param2 = action
-                                print(f"\n Action {i+1}: {act_name}({param1}, {param2}) à t={t}")
-                        else:
-                            print(f"\n Action {i+1}: {action} à t={t}")
+                    for i, (t, action) in enumerate(plan):
+                        print(f"\n Action {i+1}: {format_action(action)} à t={t}")
                         
                         # Affichage de l'état après l'action
                         print_state(var_map, model, t + 1)
 
-                    # Sauvegarde du plan
-                    with open("plan_output.txt", "w", encoding="utf-8") as f:
-                        f.write("Plan de résolution du problème Gripper\n")
-                        f.write("=" * 40 + "\n\n")
-                        
-                        for i, (t, action) in enumerate(actions):
-                            if isinstance(action, tuple):
-                                if len(action) == 2:
-                                    act_name, param = action
-                                    f.write(f"Étape {i+1}: {act_name}({param}) à t={t}\n")
-                                elif len(action) == 3:
-                                    act_name, param1, param2 = action
-                                    f.write(f"Étape {i+1}: {act_name}({param1}, {param2}) à t={t}\n")
-                            else:
-                                f.write(f"Étape {i+1}: {action} à t={t}\n")
-                    
-                    print(f"\n Plan détaillé sauvegardé dans 'plan_output.txt'")
+                    # Sauvegarde du plan : texte lisible et plan structuré
+                    # (plan_ir.py), lu directement par val_validator.py
+                    with metrics.phase("write"):
+                        with open("plan_output.txt", "w", encoding="utf-8") as f:
+                            f.write("Plan de résolution du problème Gripper\n")
+                            f.write("=" * 40 + "\n\n")
+
+                            for line in plan.lines():
+                                f.write(line + "\n")
+                        write_plans([plan], "plan_output.jsonl")
+
+                    print(f"\n Plan détaillé sauvegardé dans 'plan_output.txt' (plan structuré: 'plan_output.jsonl')")
                     
                     # Vérification de l'objectif
-                    horizon = max(t for typ, _, t in var_map.keys() if typ == "fact")
                     goal_var = var_map.get(("fact", "at_ball_roomB", horizon))
                     if goal_var and goal_var in [abs(v) for v in model if v > 0]:
                         print(" Objectif atteint: la balle est dans roomB!")
+                    elif goal_var is None:
+                        # Tâche PDDL : le but est imposé par des clauses unitaires
+                        print(f" Objectif atteint à t={horizon} (faits du but imposés par la formule)")
                     else:
                         print("Attention: l'objectif pourrait ne pas être atteint")
                         
                 else:
                     print(" Aucune action trouvée dans le modèle")
+
+                if args.plans > 1:
+                    # Plans alternatifs : blocage sur les variables d'action,
+                    # plans identiques à des instants vides près confondus
+                    from plan_enumeration import PlanEnumerator
+                    print(f"\n Énumération de {args.plans} plans distincts...")
+                    # Formule entière nécessaire ici : tampon int32 compact
+                    clauses = read_buffer("problem.cnf", use_sidecar=not args.no_sidecar)
+                    with PlanEnumerator(clauses, var_map,
+                                        key=lambda plan: tuple(a for _, a in plan),
+                                        budget=budget) as enumerator:
+                        for found in enumerator.plans(args.plans):
+                            steps = ", ".join(format_action(a) for _, a in found['plan'])
+                            print(f"  Plan {found['index']} ({len(found['plan'])} actions, "
+                                  f"{found['time']*1000:.2f} ms): {steps}")
+                        plans_stats = enumerator.stats()
+                    print(f"  {plans_stats['plans']} plans en {plans_stats['time']:.4f}s "
+                          f"({plans_stats['plans_per_sec']:.1f} plans/s, "
+                          f"{plans_stats['duplicates']} doublons écartés)")
                     
+            elif status == UNKNOWN:
+                print("Budget épuisé avant la fin de la recherche (statut UNKNOWN)")
+                print(f"Temps de recherche: {round(end - start, 4)} secondes")
+                print(f"Recherche: {format_stats(search)}")
             else:
-                end = time.time()
                 print("Aucun plan trouvé (problème non satisfiable)")
                 print(f"Temps de recherche: {round(end - start, 4)} secondes")
+                print(f"Recherche: {format_stats(search)}")
                
     except FileNotFoundError as e:
         print(f"Erreur: fichier manquant - {e}")
@@ -147,4 +185,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"Erreur inattendue: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+
+    metrics.finish(args)
@@ -0,0 +1,295 @@
+"""
+Planificateur SAT par recherche d'horizon
+
+Pour une tâche instanciée (grounding.py), on encode et résout successivement
+les horizons croissants : le premier horizon satisfiable donne un plan de
+longueur minimale, puisque l'encodage séquentiel autorise au plus une action
+par instant et laisse les instants inutilisés vides.
+
+Tout horizon inférieur à l'optimum est un appel UNSAT inutile, et prouver le
+dernier UNSAT est souvent la résolution la plus coûteuse. La recherche part
+donc d'une borne inférieure admissible (LM-cut de l'état initial, au moins
+h_max) ; la longueur d'un plan relâché (h_FF) est donnée comme indication de
+borne supérieure : ce n'en est pas une garantie, mais un horizon bien
+au-delà signale une tâche difficile.
+
+Chaque appel au solveur peut recevoir un budget (temps, conflits,
+propagations ; solver_budget.py) et la recherche entière une échéance. Un
+appel interrompu est UNKNOWN : l'horizon n'est pas prouvé insatisfiable, et
+le plan trouvé ensuite n'est plus garanti optimal. En mode « anytime », un
+premier plan est cherché sur des horizons croissant géométriquement avant la
+recherche ascendante : à l'échéance, le meilleur plan trouvé est retourné
+même si l'optimum n'est pas encore prouvé.
+
+Utilisation :
+    python sat_planner.py domain.pddl problems/three_rooms.pddl --max-horizon 12
+    python sat_planner.py domain.pddl problem.pddl --deadline 10 --anytime --conflict-limit 20000
+    python sat_planner.py domain.pddl problem.pddl --preprocess
+"""
+
+import argparse
+import math
+import sys
+import time
+
+from pysat.solvers import Minisat22
+
+import metrics
+from decode_plan import decode_plan, format_plan_lines
+from encodeur_sat import encode_task_buffer
+from grounding import load_task
+from heuristics import LMCutHeuristic, RelaxedHeuristic
+from plan_counting import projection_of
+from preprocess import Preprocessor, format_stats as format_preprocess
+from state_space import state_space_of
+from solver_budget import (SAT, UNKNOWN, UNSAT, Deadline, add_arguments, budget_from_args,
+                           format_budget, solve_limited)
+from solver_stats import collect
+
+
+def solve_horizon(task, horizon, budget=None, deadline=None, interrupter=None, preprocess=False):
+    """Encode et résout un horizon ; retourne (plan ou None, statistiques)
+
+    Les statistiques comprennent le statut (SAT, UNSAT ou UNKNOWN si le
+    budget ou l'échéance a interrompu la recherche), la taille de la formule,
+    le temps de chaque phase et les compteurs de recherche du solveur
+    (solver_stats.py). Avec preprocess, la formule est simplifiée avant la
+    résolution (preprocess.py, actions gelées) ; les statistiques du
+    prétraitement sont sous 'preprocess'.
+    """
+    start = time.perf_counter()
+    # Tampon int32 : le solveur lit les clauses sans liste Python par clause
+    buffer, var_map = encode_task_buffer(task, horizon)
+    encoded = time.perf_counter()
+
+    clauses, pre = buffer, None
+    if preprocess:
+        pre = Preprocessor(buffer, frozen=projection_of(var_map), n_vars=buffer.nv)
+        clauses = pre.run()
+    simplified = time.perf_counter()
+
+    with metrics.phase("build"):
+        solver = Minisat22(bootstrap_with=clauses)
+    try:
+        built = time.perf_counter()
+        with metrics.phase("solve"):
+            status = solve_limited(solver, budget, deadline, interrupter=interrupter)
+        solved = time.perf_counter()
+        satisfiable = status == SAT
+        metrics.count("solver.calls")
+        if status == UNKNOWN:
+            metrics.count("solver.unknown")
+        search = collect(solver)
+        plan = None
+        if satisfiable:
+            model = solver.get_model()
+            plan = decode_plan(pre.extend(model) if pre is not None else model, var_map,
+                               task=task.name, horizon=horizon)
+    finally:
+        solver.delete()
+
+    stats = {
+        'horizon': horizon,
+        'status': status,
+        'satisfiable': satisfiable,
+        'variables': buffer.nv,
+        'clauses': len(buffer),
+        'encode_time': encoded - start,
+        'build_time': built - simplified,
+        'solve_time': solved - built,
+        'solver_stats': search,
+    }
+    if pre is not None:
+        stats['preprocess'] = pre.stats()
+    return plan, stats
+
+
+@metrics.timed("bound")
+def horizon_bounds(task):
+    """(borne inférieure admissible, indication de borne supérieure) de la longueur du plan
+
+    La borne inférieure est LM-cut de l'état initial ; l'indication est la
+    longueur du plan relâché de h_FF. Les deux valent math.inf si le but est
+    inaccessible même dans le problème relâché.
+    """
+    init = state_space_of(task).init
+    lower = LMCutHeuristic(task, cache=False)(init)
+    upper_hint = RelaxedHeuristic(task, "ff", cache=False)(init)
+    return lower, upper_hint
+
+
+# Part du temps restant accordée à chaque sonde du mode anytime
+PROBE_SHARE = 0.25
+
+
+def _probe_horizons(start, max_horizon):
+    """Horizons du mode anytime : croissance géométrique de start à max_horizon"""
+    horizon = max(start, 1)
+    while horizon < max_horizon:
+        yield horizon
+        horizon = max(horizon + 1, math.ceil(horizon * 1.5))
+    yield max_horizon
+
+
+def plan_task(task, max_horizon=20, min_horizon=None, budget=None, deadline=None,
+              anytime=False, interrupter=None, on_event=None, preprocess=False):
+    """Cherche le plus petit horizon satisfiable entre min_horizon et max_horizon
+
+    Sans min_horizon, la recherche part de la borne inférieure de
+    horizon_bounds : les horizons en dessous sont insatisfiables et ne sont
+    pas soumis au solveur (saved_calls). budget limite chaque appel au
+    solveur, deadline (secondes) la recherche entière ; avec anytime, un
+    premier plan est cherché sur des horizons plus longs avant la recherche
+    ascendante, et reste disponible si l'échéance tombe avant l'optimum.
+    interrupter (solver_budget.Interrupter) permet d'annuler la recherche
+    depuis un autre thread ; on_event reçoit un événement (dictionnaire) après
+    le calcul des bornes et après chaque horizon essayé. preprocess simplifie
+    chaque formule avant sa résolution (voir solve_horizon).
+
+    Retourne un dictionnaire avec le plan trouvé (plan_ir.Plan, ou None), son horizon, le statut (SAT, UNSAT si aucun plan n'existe jusqu'à
+    max_horizon, UNKNOWN sinon), optimal (tous les horizons plus courts depuis
+    min_horizon prouvés UNSAT), le détail de chaque appel au solveur et les
+    bornes utilisées.
+    """
+    result = {'plan': None, 'horizon': None, 'status': UNKNOWN, 'optimal': False,
+              'timed_out': False, 'cancelled': False, 'calls': [],
+              'lower_bound': None, 'upper_hint': None, 'bound_time': 0.0, 'saved_calls': 0}
+    deadline = deadline if isinstance(deadline, Deadline) else Deadline(deadline)
+    if min_horizon is None:
+        start = time.perf_counter()
+        lower, upper_hint = horizon_bounds(task)
+        result['bound_time'] = time.perf_counter() - start
+        result['lower_bound'], result['upper_hint'] = lower, upper_hint
+        if on_event is not None:
+            on_event({'event': 'bounds', 'lower_bound': lower, 'upper_hint': upper_hint,
+                      'bound_time': result['bound_time']})
+        if lower == math.inf:
+            # Inaccessible même sans effets négatifs : aucun appel au solveur
+            result['status'] = UNSAT
+            return result
+        min_horizon = lower
+        result['saved_calls'] = min(lower, max_horizon + 1)
+        metrics.count("solver.saved_calls", result['saved_calls'])
+
+    # Horizons prouvés insatisfiables : l'encodage autorise les instants
+    # vides, donc UNSAT à h implique UNSAT pour tout horizon plus court
+    unsat_below = min_horizon
+
+    def stopped():
+        if interrupter is not None and interrupter.cancelled:
+            result['cancelled'] = True
+        elif deadline.expired():
+            result['timed_out'] = True
+        else:
+            return False
+        return True
+
+    def run(horizon, limit=deadline):
+        nonlocal unsat_below
+        plan, stats = solve_horizon(task, horizon, budget, limit, interrupter, preprocess)
+        result['calls'].append(stats)
+        if on_event is not None:
+            on_event(dict(stats, event='horizon'))
+        if stats['status'] == UNSAT:
+            unsat_below = max(unsat_below, horizon + 1)
+        elif plan is not None and (result['plan'] is None or len(plan) < len(result['plan'])):
+            result['plan'], result['horizon'] = plan, horizon
+        return stats['status']
+
+    with metrics.phase("plan"):
+        if anytime and min_horizon <= max_horizon:
+            first = max(min_horizon, result['upper_hint'] or 0)
+            for horizon in _probe_horizons(first, max_horizon):
+                if stopped():
+                    break
+                # Une sonde ne dispose que d'une part du temps restant : un
+                # horizon trop court, long à réfuter, n'épuise pas l'échéance
+                remaining = deadline.remaining()
+                limit = deadline if remaining is None else Deadline(remaining * PROBE_SHARE)
+                if run(horizon, limit) == SAT:
+                    break
+
+        # Recherche ascendante : seuls les horizons plus courts que le
+        # meilleur plan connu peuvent encore l'améliorer
+        horizon = unsat_below
+        while horizon <= max_horizon:
+            if result['plan'] is not None and horizon >= len(result['plan']):
+                break
+            if stopped():
+                break
+            if run(horizon) == SAT:
+                break
+            horizon = max(horizon + 1, unsat_below)
+
+    if result['plan'] is not None:
+        result['status'] = SAT
+        result['optimal'] = unsat_below >= len(result['plan'])
+    elif unsat_below > max_horizon:
+        result['status'] = UNSAT
+    result['timed_out'] = result['timed_out'] or deadline.expired()
+    result['cancelled'] = result['cancelled'] or (interrupter is not None and interrupter.cancelled)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planificateur SAT pour un problème PDDL")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problem", help="Fichier problème PDDL")
+    parser.add_argument("--max-horizon", type=int, default=20)
+    parser.add_argument("--min-horizon", type=int, default=None,
+                        help="Horizon de départ (défaut: borne inférieure LM-cut)")
+    parser.add_argument("--deadline", type=float, default=None, metavar="SECONDES",
+                        help="Échéance de la recherche entière")
+    parser.add_argument("--anytime", action="store_true",
+                        help="Chercher d'abord un plan sur des horizons plus longs ; à l'échéance, "
+                             "retourner le meilleur plan trouvé")
+    parser.add_argument("--preprocess", action="store_true",
+                        help="Simplifier chaque formule avant la résolution (preprocess.py)")
+    add_arguments(parser)
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "sat_planner")
+
+    start = time.perf_counter()
+    task = load_task(args.domain, args.problem)
+    print(f"Tâche: {len(task.facts)} faits, {len(task.actions)} actions")
+
+    budget = budget_from_args(args)
+    if budget is not None or args.deadline is not None:
+        print(f"Budget par appel: {format_budget(budget)}, échéance: "
+              f"{f'{args.deadline:g} s' if args.deadline is not None else 'aucune'}")
+    result = plan_task(task, args.max_horizon, args.min_horizon, budget=budget,
+                       deadline=args.deadline, anytime=args.anytime,
+                       preprocess=args.preprocess)
+    if result['lower_bound'] is not None:
+        print(f"Borne inférieure (LM-cut): {result['lower_bound']}, plan relâché (h_FF): "
+              f"{result['upper_hint']} ({result['bound_time']*1000:.2f} ms), "
+              f"{result['saved_calls']} appels au solveur évités")
+    for call in result['calls']:
+        print(f"  horizon {call['horizon']:3}: {call['status']:<7} {call['variables']:7} variables "
+              f"{call['clauses']:8} clauses {call['solve_time']*1000:9.2f} ms "
+              f"{call['solver_stats']['conflicts']:7} conflits "
+              f"{call['solver_stats']['decisions']:8} décisions")
+        if 'preprocess' in call:
+            print(f"               prétraitement: {format_preprocess(call['preprocess'])}")
+
+    if result['plan'] is None:
+        if result['status'] == UNSAT:
+            print(f"Aucun plan de longueur <= {args.max_horizon}")
+        else:
+            print("Budget épuisé avant de trouver un plan (statut UNKNOWN)")
+        metrics.finish(args)
+        sys.exit(1)
+
+    quality = "optimal" if result['optimal'] else "non prouvé optimal"
+    if result['timed_out']:
+        quality += ", échéance atteinte"
+    print(f"\nPlan de {len(result['plan'])} actions, {quality} "
+          f"(trouvé en {time.perf_counter() - start:.3f}s):")
+    for line in format_plan_lines(result['plan']):
+        print("  " + line)
+
+    metrics.set_info('task', task.name)
+    metrics.set_info('horizon', result['horizon'])
+    metrics.set_info('optimal', result['optimal'])
+    metrics.finish(args)
@@ -0,0 +1,266 @@
+"""
+Planificateurs par recherche explicite dans l'espace d'états
+
+Références pour le planificateur SAT : largeur d'abord (BFS), profondeur
+d'abord (DFS), meilleur d'abord glouton (GBFS) et A*, tous sur la même tâche
+instanciée (grounding.py). Un état est un entier dont les bits sont les faits
+vrais (state_space.py) : compact, rapide à hacher, et donc utilisable
+directement comme clé pour la détection des doublons. Chaque recherche compte
+les nœuds développés (expanded), générés (generated) et les doublons écartés.
+
+Utilisation :
+    python search_planners.py domain.pddl problem.pddl
+    python search_planners.py domains/gripper_family.pddl problems/generated/<instance>.pddl --algorithm astar
+"""
+
+import argparse
+import heapq
+import math
+import sys
+import time
+from collections import deque
+
+import metrics
+from decode_plan import format_plan_lines
+from grounding import load_task
+from heuristics import KINDS, LMCutHeuristic, RelaxedHeuristic
+from plan_ir import Plan
+from state_space import popcount, state_space_of
+
+
+def goal_count(space):
+    """Nombre de faits du but encore faux (non admissible : GBFS)"""
+    return space.missing_goals
+
+
+def goal_count_admissible(space):
+    """Faits du but manquants divisés par le maximum qu'une action peut ajouter
+
+    Une action ajoute au plus k faits du but : il faut donc au moins
+    ceil(manquants / k) actions, ce qui rend l'heuristique admissible (A*).
+    """
+    goal = space.goal
+    k = max((popcount(goal & add) for add in space.add), default=0)
+
+    def h(state):
+        missing = popcount(goal & ~state)
+        if missing == 0:
+            return 0
+        return math.ceil(missing / k) if k else math.inf
+    return h
+
+
+def _extract_plan(task, parents, state):
+    """Remonte les pointeurs parents jusqu'à l'état initial ; plan (plan_ir.Plan)"""
+    steps = []
+    while parents[state] is not None:
+        parent, a = parents[state]
+        steps.append(task.actions[a].name)
+        state = parent
+    steps.reverse()
+    return Plan(enumerate(steps), task.name, len(steps))
+
+
+def make_heuristic(task, name):
+    """Heuristique par nom : goalcount, goalcount-admissible, hmax, hadd, hff ou hlmcut"""
+    space = state_space_of(task)
+    if name == "goalcount":
+        return goal_count(space)
+    if name == "goalcount-admissible":
+        return goal_count_admissible(space)
+    if name == "hlmcut":
+        return LMCutHeuristic(task)
+    if name.startswith("h") and name[1:] in KINDS:
+        return RelaxedHeuristic(task, name[1:])
+    raise ValueError(f"heuristique inconnue: {name}")
+
+
+HEURISTICS = ["goalcount", "goalcount-admissible"] + ["h" + kind for kind in KINDS] + ["hlmcut"]
+
+
+def _result(algorithm, plan, expanded, generated, duplicates, start, heuristic=None):
+    elapsed = time.perf_counter() - start
+    metrics.count(f"search.{algorithm}.expanded", expanded)
+    metrics.count(f"search.{algorithm}.generated", generated)
+    result = {
+        'algorithm': algorithm,
+        'plan': plan,
+        'expanded': expanded,
+        'generated': generated,
+        'duplicates': duplicates,
+        'time': elapsed,
+        'nodes_per_sec': expanded / elapsed if elapsed > 0 else 0.0,
+    }
+    # L'évaluation de l'heuristique domine souvent le temps de recherche
+    if hasattr(heuristic, "stats"):
+        result.update(heuristic.stats())
+        metrics.count(f"search.{algorithm}.evaluations", heuristic.computed)
+    return result
+
+
+@metrics.timed("search")
+def breadth_first_search(task):
+    """BFS en graphe : plan de longueur minimale"""
+    start = time.perf_counter()
+    space = state_space_of(task)
+    init = space.init
+    parents = {init: None}
+    queue = deque([init])
+    expanded = generated = duplicates = 0
+
+    if space.is_goal(init):
+        return _result('bfs', [], 0, 0, 0, start)
+
+    while queue:
+        state = queue.popleft()
+        expanded += 1
+        for a, child in space.successors(state):
+            generated += 1
+            if child in parents:
+                duplicates += 1
+                continue
+            parents[child] = (state, a)
+            # Test du but à la génération : suffit pour l'optimalité en BFS
+            if space.is_goal(child):
+                return _result('bfs', _extract_plan(task, parents, child),
+                               expanded, generated, duplicates, start)
+            queue.append(child)
+
+    return _result('bfs', None, expanded, generated, duplicates, start)
+
+
+@metrics.timed("search")
+def depth_first_search(task, max_depth=None):
+    """DFS en graphe (pile explicite) : rapide mais sans garantie d'optimalité"""
+    start = time.perf_counter()
+    space = state_space_of(task)
+    init = space.init
+    parents = {init: None}
+    stack = [(init, 0)]
+    expanded = generated = duplicates = 0
+
+    while stack:
+        state, depth = stack.pop()
+        if space.is_goal(state):
+            return _result('dfs', _extract_plan(task, parents, state),
+                           expanded, generated, duplicates, start)
+        if max_depth is not None and depth >= max_depth:
+            continue
+        expanded += 1
+        # Ordre inversé : la première action applicable est développée en premier
+        for a, child in reversed(list(space.successors(state))):
+            generated += 1
+            if child in parents:
+                duplicates += 1
+                continue
+            parents[child] = (state, a)
+            stack.append((child, depth + 1))
+
+    return _result('dfs', None, expanded, generated, duplicates, start)
+
+
+def _best_first(task, space, algorithm, heuristic, weight_g):
+    """Meilleur d'abord générique : f = weight_g * g + h
+
+    weight_g = 0 donne GBFS, weight_g = 1 donne A*. Les états déjà fermés
+    avec un coût inférieur ou égal sont écartés (détection des doublons).
+    """
+    start = time.perf_counter()
+    init = space.init
+    h0 = heuristic(init)
+    parents = {init: None}
+    best_g = {init: 0}
+    closed = set()
+    counter = 0  # départage les égalités dans le tas (ordre d'insertion)
+    heap = [(h0, h0, counter, 0, init)]
+    expanded = generated = duplicates = 0
+
+    while heap:
+        _, _, _, g, state = heapq.heappop(heap)
+        if state in closed:
+            duplicates += 1
+            continue
+        if space.is_goal(state):
+            return _result(algorithm, _extract_plan(task, parents, state),
+                           expanded, generated, duplicates, start, heuristic)
+        closed.add(state)
+        expanded += 1
+
+        for a, child in space.successors(state):
+            generated += 1
+            child_g = g + 1
+            if child in closed or best_g.get(child, math.inf) <= child_g:
+                duplicates += 1
+                continue
+            h = heuristic(child)
+            if h == math.inf:
+                continue
+            best_g[child] = child_g
+            parents[child] = (state, a)
+            counter += 1
+            heapq.heappush(heap, (weight_g * child_g + h, h, counter, child_g, child))
+
+    return _result(algorithm, None, expanded, generated, duplicates, start, heuristic)
+
+
+@metrics.timed("search")
+def greedy_best_first_search(task, heuristic=None):
+    """GBFS : développe l'état de plus petite heuristique (par défaut, nombre de
+    buts manquants ; avec h_add, c'est la recherche d'HSP)"""
+    space = state_space_of(task)
+    return _best_first(task, space, 'gbfs', heuristic or goal_count(space), weight_g=0)
+
+
+@metrics.timed("search")
+def astar_search(task, heuristic=None):
+    """A* avec une heuristique admissible : plan de longueur minimale"""
+    space = state_space_of(task)
+    return _best_first(task, space, 'astar', heuristic or goal_count_admissible(space), weight_g=1)
+
+
+ALGORITHMS = {
+    'bfs': breadth_first_search,
+    'dfs': depth_first_search,
+    'gbfs': greedy_best_first_search,
+    'astar': astar_search,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Planificateurs par recherche explicite")
+    parser.add_argument("domain", help="Fichier domaine PDDL")
+    parser.add_argument("problem", help="Fichier problème PDDL")
+    parser.add_argument("--algorithm", choices=list(ALGORITHMS) + ["all"], default="all")
+    parser.add_argument("--heuristic", choices=HEURISTICS,
+                        help="Heuristique de GBFS et A* (défaut: goalcount pour GBFS, "
+                             "goalcount-admissible pour A*)")
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "search_planners")
+
+    task = load_task(args.domain, args.problem)
+    print(f"Tâche: {len(task.facts)} faits, {len(task.actions)} actions")
+
+    names = list(ALGORITHMS) if args.algorithm == "all" else [args.algorithm]
+    status = 0
+    for name in names:
+        if name in ('gbfs', 'astar') and args.heuristic:
+            result = ALGORITHMS[name](task, make_heuristic(task, args.heuristic))
+        else:
+            result = ALGORITHMS[name](task)
+        if result['plan'] is None:
+            print(f"\n{name}: aucun plan ({result['expanded']} nœuds développés)")
+            status = 1
+            continue
+        print(f"\n{name}: plan de {len(result['plan'])} actions en {result['time']*1000:.2f} ms, "
+              f"{result['expanded']} développés, {result['generated']} générés, "
+              f"{result['duplicates']} doublons, {result['nodes_per_sec']:.0f} nœuds/s")
+        if 'evaluations' in result:
+            print(f"  {result['heuristic']}: {result['computed']} évaluations "
+                  f"({result['evaluations']} demandées), "
+                  f"{result['evaluations_per_sec']:.0f} évaluations/s")
+        for line in format_plan_lines(result['plan']):
+            print("  " + line)
+
+    metrics.finish(args)
+    sys.exit(status)
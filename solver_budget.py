@@ -0,0 +1,177 @@
+# Résolution avec budgets : temps, conflits et propagations
+#
+# Un appel solver.solve() sans limite peut bloquer toute la chaîne sur une
+# instance difficile. Ici chaque appel reçoit un budget : les limites de
+# conflits et de propagations sont celles de MiniSat (conf_budget,
+# prop_budget), la limite de temps est appliquée par un thread minuteur qui
+# interrompt le solveur (interrupt). Le résultat a trois valeurs : SAT, UNSAT,
+# ou UNKNOWN quand le budget est épuisé avant la fin de la recherche.
+#
+# Un budget est un dictionnaire {'time': secondes, 'conflicts': n,
+# 'propagations': n} dont chaque entrée peut manquer ou valoir None (pas de
+# limite). Une échéance globale (Deadline) borne en plus la somme des appels,
+# et un Interrupter permet d'annuler la recherche depuis un autre thread.
+
+import threading
+import time
+
+SAT = "SAT"
+UNSAT = "UNSAT"
+UNKNOWN = "UNKNOWN"
+
+BUDGET_KEYS = ['time', 'conflicts', 'propagations']
+
+
+def status_of(value):
+    """Résultat pysat (True / False / None) -> SAT / UNSAT / UNKNOWN"""
+    if value is None:
+        return UNKNOWN
+    return SAT if value else UNSAT
+
+
+def is_unlimited(budget):
+    return not budget or all(budget.get(key) is None for key in BUDGET_KEYS)
+
+
+class Deadline:
+    """Échéance globale d'une suite d'appels (None : pas d'échéance)"""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.end = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        if self.end is None:
+            return None
+        return max(0.0, self.end - time.monotonic())
+
+    def expired(self):
+        return self.end is not None and time.monotonic() >= self.end
+
+
+class Interrupter:
+    """Annulation, depuis un autre thread, de la résolution en cours
+
+    Le thread qui résout attache son solveur le temps de l'appel ; cancel()
+    interrompt le solveur attaché et fait échouer (UNKNOWN) tous les appels
+    suivants. Un solveur déjà interrompu avant le début de la recherche
+    s'arrête immédiatement : il n'y a pas de fenêtre où l'annulation se perd.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._solver = None
+        self.cancelled = False
+
+    def attach(self, solver):
+        """Attache le solveur ; False si la recherche est déjà annulée"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._solver = solver
+            return True
+
+    def detach(self):
+        with self._lock:
+            self._solver = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            if self._solver is not None:
+                self._solver.interrupt()
+
+
+def time_limit(budget=None, deadline=None):
+    """Limite de temps effective d'un appel : la plus courte du budget et de l'échéance"""
+    limits = []
+    if budget and budget.get('time') is not None:
+        limits.append(budget['time'])
+    if deadline is not None and deadline.remaining() is not None:
+        limits.append(deadline.remaining())
+    return min(limits) if limits else None
+
+
+def solve_limited(solver, budget=None, deadline=None, assumptions=(), interrupter=None):
+    """Résout dans le budget ; retourne SAT, UNSAT ou UNKNOWN
+
+    Sans budget, échéance ni interrupter, c'est un simple solver.solve().
+    Sinon les limites de conflits et de propagations sont relatives aux
+    compteurs actuels du solveur (un solveur incrémental peut donc être
+    rappelé avec un nouveau budget), et un minuteur interrompt la recherche à
+    la fin du temps imparti. Le solveur reste utilisable après un UNKNOWN.
+
+    Avec une interruption possible, pysat relâche le GIL pendant la
+    recherche : les autres threads (boucle asyncio, autres solveurs)
+    continuent de s'exécuter.
+    """
+    limit = time_limit(budget, deadline)
+    if limit is None and is_unlimited(budget) and interrupter is None:
+        return status_of(solver.solve(assumptions=assumptions))
+    if limit is not None and limit <= 0:
+        return UNKNOWN
+    if interrupter is not None and not interrupter.attach(solver):
+        return UNKNOWN
+
+    budget = budget or {}
+    # -1 désactive toutes les limites (budgetOff de MiniSat), y compris celles
+    # restées d'un appel précédent : on remet à zéro puis on fixe les nouvelles
+    solver.conf_budget(-1)
+    if budget.get('conflicts') is not None:
+        solver.conf_budget(budget['conflicts'])
+    if budget.get('propagations') is not None:
+        solver.prop_budget(budget['propagations'])
+
+    timer = None
+    if limit is not None:
+        timer = threading.Timer(limit, solver.interrupt)
+        timer.daemon = True
+        timer.start()
+    interruptible = timer is not None or interrupter is not None
+    try:
+        value = solver.solve_limited(assumptions=assumptions, expect_interrupt=interruptible)
+    finally:
+        if timer is not None:
+            # Le minuteur a pu se déclencher juste après la fin de la
+            # recherche : on attend qu'il soit terminé avant d'effacer
+            # l'interruption, pour que l'appel suivant ne soit pas coupé
+            timer.cancel()
+            timer.join()
+        if interrupter is not None:
+            interrupter.detach()
+        if interruptible:
+            solver.clear_interrupt()
+    return status_of(value)
+
+
+def add_arguments(parser):
+    """Options --time-limit, --conflict-limit et --propagation-limit (budget par appel)"""
+    parser.add_argument("--time-limit", type=float, default=None, metavar="SECONDES",
+                        help="Temps maximal de chaque appel au solveur")
+    parser.add_argument("--conflict-limit", type=int, default=None, metavar="N",
+                        help="Nombre maximal de conflits par appel au solveur")
+    parser.add_argument("--propagation-limit", type=int, default=None, metavar="N",
+                        help="Nombre maximal de propagations par appel au solveur")
+
+
+def budget_from_args(args):
+    """Budget par appel lu depuis les options de add_arguments (None : illimité)"""
+    budget = {
+        'time': args.time_limit,
+        'conflicts': args.conflict_limit,
+        'propagations': args.propagation_limit,
+    }
+    return None if is_unlimited(budget) else budget
+
+
+def format_budget(budget):
+    if is_unlimited(budget):
+        return "illimité"
+    parts = []
+    if budget.get('time') is not None:
+        parts.append(f"{budget['time']:g} s")
+    if budget.get('conflicts') is not None:
+        parts.append(f"{budget['conflicts']} conflits")
+    if budget.get('propagations') is not None:
+        parts.append(f"{budget['propagations']} propagations")
+    return ", ".join(parts)
@@ -0,0 +1,62 @@
+# Statistiques de recherche du solveur SAT
+#
+# Les solveurs pysat comptent les conflits, décisions, propagations et
+# redémarrages depuis leur création (accum_stats). Ce sont ces compteurs, plus
+# que le temps d'horloge, qui indiquent si un changement d'encodage facilite
+# réellement la recherche. Ce module les relève après chaque appel au solveur,
+# en déduit les débits (conflits par seconde...) et les met en forme pour les
+# rapports.
+
+import metrics
+
+STAT_KEYS = ['conflicts', 'decisions', 'propagations', 'restarts']
+STAT_LABELS = {
+    'conflicts': 'Conflits',
+    'decisions': 'Décisions',
+    'propagations': 'Propagations',
+    'restarts': 'Redémarrages',
+}
+
+
+def empty_stats():
+    return {key: 0 for key in STAT_KEYS}
+
+
+def collect(solver, before=None):
+    """Compteurs du solveur, relatifs à `before` pour un solveur incrémental
+
+    Retourne un dictionnaire conflicts / decisions / propagations / restarts
+    (zéros si le solveur ne fournit pas de statistiques). Les compteurs sont
+    aussi ajoutés aux métriques de l'exécution (solver.conflicts...).
+    """
+    raw = solver.accum_stats() or {}
+    stats = {key: int(raw.get(key, 0)) for key in STAT_KEYS}
+    if before is not None:
+        stats = {key: stats[key] - before.get(key, 0) for key in STAT_KEYS}
+    for key in STAT_KEYS:
+        metrics.count("solver." + key, stats[key])
+    return stats
+
+
+def accumulate(total, stats):
+    """Ajoute les compteurs `stats` à `total` (modifié en place)"""
+    for key in STAT_KEYS:
+        total[key] = total.get(key, 0) + stats.get(key, 0)
+    return total
+
+
+def with_rates(stats, seconds):
+    """Copie des compteurs avec les débits par seconde de résolution"""
+    result = dict(stats)
+    result['solve_seconds'] = seconds
+    for key in ('conflicts', 'decisions', 'propagations'):
+        result[key + '_per_sec'] = stats.get(key, 0) / seconds if seconds > 0 else 0.0
+    return result
+
+
+def format_stats(stats):
+    """Résumé sur une ligne, par ex. pour la sortie de run_solver"""
+    text = ", ".join(f"{STAT_LABELS[key].lower()} {stats.get(key, 0)}" for key in STAT_KEYS)
+    if 'conflicts_per_sec' in stats:
+        text += f", {stats['conflicts_per_sec']:.0f} conflits/s"
+    return text
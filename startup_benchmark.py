@@ -0,0 +1,139 @@
+"""
+Benchmark du temps de démarrage de la ligne de commande
+
+Mesure le temps mural de `python main.py --mode basic` (processus principal et
+scripts enfants compris) ainsi que le temps passé dans les imports, relevé avec
+`-X importtime`. La variable PYTHONPROFILEIMPORTTIME est héritée par les
+sous-processus : les imports de write_cnf.py et run_solver.py sont donc comptés.
+
+Le benchmark échoue si un paquet de tracé (matplotlib, pandas) est importé
+pendant une planification simple, ou si la médiane dépasse le budget fixé.
+
+Utilisation :
+    python startup_benchmark.py --runs 5 --budget-ms 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Paquets qu'une planification simple ne doit jamais charger
+FORBIDDEN_PACKAGES = ["matplotlib", "pandas", "numpy"]
+
+RESULTS_FILE = "startup_benchmark.json"
+
+
+def parse_importtime(stderr):
+    """Agrège la sortie -X importtime par paquet de premier niveau (en µs)
+
+    Seules les lignes de niveau 0 (imports demandés directement par le code)
+    sont comptées : leur temps cumulé inclut déjà leurs dépendances.
+    """
+    per_package = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            _, cumulative_us, name = line.split("|", 2)
+            cumulative = int(cumulative_us.strip())
+        except ValueError:
+            continue
+        # L'indentation du nom (deux espaces par niveau) donne la profondeur
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        package = name.strip().split(".")[0]
+        if depth == 0:
+            per_package[package] = per_package.get(package, 0) + cumulative
+        else:
+            per_package.setdefault(package, 0)
+    return per_package
+
+
+def time_command(command, env=None):
+    """Exécute la commande et retourne (temps mural en s, stderr)"""
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} a échoué (code {result.returncode}):\n"
+                           f"{result.stderr}")
+    return elapsed, result.stderr
+
+
+def run_startup_benchmark(runs=5, mode="basic"):
+    command = [sys.executable, "main.py", "--mode", mode, "--quiet"]
+    print(f"Commande mesurée: {' '.join(command)}")
+
+    # Exécution de chauffe : remplit le cache de bytecode et le cache disque
+    time_command(command)
+
+    wall_times = []
+    for i in range(runs):
+        elapsed, _ = time_command(command)
+        wall_times.append(elapsed)
+        print(f"  essai {i+1}: {elapsed * 1000:.1f} ms")
+
+    # Mesure séparée des imports : -X importtime ralentit légèrement l'exécution
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    _, stderr = time_command(command, env=env)
+    imports = parse_importtime(stderr)
+    import_total_ms = sum(imports.values()) / 1000
+
+    loaded_forbidden = [pkg for pkg in FORBIDDEN_PACKAGES if pkg in imports]
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'command': " ".join(command[1:]),
+        'python': sys.version.split()[0],
+        'runs': runs,
+        'wall_ms': {
+            'median': statistics.median(wall_times) * 1000,
+            'min': min(wall_times) * 1000,
+            'max': max(wall_times) * 1000,
+        },
+        'import_ms': import_total_ms,
+        'top_imports_ms': {pkg: us / 1000 for pkg, us in
+                           sorted(imports.items(), key=lambda x: -x[1])[:10]},
+        'forbidden_imports': loaded_forbidden,
+    }
+
+
+def print_summary(results):
+    print("\nTEMPS DE DÉMARRAGE")
+    print("=" * 30)
+    wall = results['wall_ms']
+    print(f"Temps mural médian: {wall['median']:.1f} ms "
+          f"(min {wall['min']:.1f}, max {wall['max']:.1f})")
+    print(f"Temps total d'import: {results['import_ms']:.1f} ms")
+    print("Imports les plus coûteux:")
+    for pkg, ms in results['top_imports_ms'].items():
+        print(f"  {pkg:<20} {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage de main.py")
+    parser.add_argument("--runs", type=int, default=5, help="Nombre de mesures")
+    parser.add_argument("--mode", default="basic", help="Mode de main.py à mesurer")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Échoue si le temps mural médian dépasse ce budget")
+    args = parser.parse_args()
+
+    results = run_startup_benchmark(args.runs, args.mode)
+    print_summary(results)
+
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats sauvegardés dans '{RESULTS_FILE}'")
+
+    status = 0
+    if results['forbidden_imports']:
+        print(f"ÉCHEC: paquets lourds importés: {', '.join(results['forbidden_imports'])}")
+        status = 1
+    if args.budget_ms is not None and results['wall_ms']['median'] > args.budget_ms:
+        print(f"ÉCHEC: médiane {results['wall_ms']['median']:.1f} ms > budget {args.budget_ms:.1f} ms")
+        status = 1
+    sys.exit(status)
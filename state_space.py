@@ -0,0 +1,124 @@
+"""
+Représentation des états par bits et générateur de successeurs
+
+Un état est un entier Python dont le bit i vaut 1 quand le fait i de la tâche
+instanciée est vrai. Hacher ou copier un tel état coûte bien moins cher qu'un
+ensemble de faits, et appliquer une action se réduit à des opérations sur
+les bits :
+
+    applicable :  state & pre == pre
+    successeur :  (state & ~delete) | add
+
+Les masques pre / add / delete de chaque action sont calculés une fois. Le
+générateur de successeurs indexe chaque action par une de ses préconditions
+(la plus rare) : pour un état donné, seules les actions dont ce fait est vrai
+sont examinées, au lieu de parcourir toutes les actions.
+"""
+
+
+def mask_of(facts):
+    mask = 0
+    for f in facts:
+        mask |= 1 << f
+    return mask
+
+
+def popcount(x):
+    return bin(x).count("1")
+
+
+def set_bits(x):
+    """Indices des bits à 1, du plus faible au plus fort"""
+    while x:
+        low = x & -x
+        yield low.bit_length() - 1
+        x ^= low
+
+
+class StateSpace:
+    """Masques d'actions et générateur de successeurs d'une GroundTask"""
+
+    def __init__(self, task):
+        self.task = task
+        self.action_index = {action.name: a for a, action in enumerate(task.actions)}
+        self.init = mask_of(task.init)
+        self.goal = mask_of(task.goal)
+
+        self.pre = [mask_of(action.pre) for action in task.actions]
+        self.add = [mask_of(action.add) for action in task.actions]
+        # Complément des suppressions : successeur = (state & keep) | add
+        self.keep = [~mask_of(action.delete) for action in task.actions]
+
+        # Index des actions par précondition déclenchante : le fait de la
+        # précondition qui apparaît dans le moins de préconditions, pour que
+        # les listes parcourues soient courtes
+        frequency = [0] * len(task.facts)
+        for action in task.actions:
+            for f in action.pre:
+                frequency[f] += 1
+
+        self.by_fact = [[] for _ in task.facts]
+        self.always = []  # actions sans précondition
+        for a, action in enumerate(task.actions):
+            if action.pre:
+                trigger = min(action.pre, key=lambda f: (frequency[f], f))
+                self.by_fact[trigger].append(a)
+            else:
+                self.always.append(a)
+
+    def is_goal(self, state):
+        return state & self.goal == self.goal
+
+    def missing_goals(self, state):
+        return popcount(self.goal & ~state)
+
+    def applicable(self, state):
+        """Indices des actions applicables dans state (ordre croissant)"""
+        pre = self.pre
+        actions = list(self.always)
+        by_fact = self.by_fact
+        for f in set_bits(state):
+            for a in by_fact[f]:
+                if state & pre[a] == pre[a]:
+                    actions.append(a)
+        actions.sort()
+        return actions
+
+    def successors(self, state):
+        """Paires (action, état successeur) des actions applicables"""
+        keep, add = self.keep, self.add
+        for a in self.applicable(state):
+            yield a, (state & keep[a]) | add[a]
+
+    def apply(self, state, a):
+        return (state & self.keep[a]) | self.add[a]
+
+    def facts(self, state):
+        """Faits (tuples) vrais dans state"""
+        return [self.task.facts[f] for f in set_bits(state)]
+
+    def validate(self, plan):
+        """Vérifie qu'un plan est exécutable et atteint le but
+
+        plan est une séquence d'indices d'actions, de noms d'actions ou de
+        paires (t, nom) comme celles de decode_actions. Retourne (valide,
+        indice de la première action inapplicable ou None).
+        """
+        state = self.init
+        for step, a in enumerate(plan):
+            if isinstance(a, tuple) and len(a) == 2 and isinstance(a[0], int):
+                a = a[1]
+            if not isinstance(a, int):
+                a = self.action_index[a]
+            if state & self.pre[a] != self.pre[a]:
+                return False, step
+            state = (state & self.keep[a]) | self.add[a]
+        return self.is_goal(state), None
+
+
+def state_space_of(task):
+    """StateSpace de la tâche, calculé une seule fois et gardé sur la tâche"""
+    space = getattr(task, "state_space", None)
+    if space is None:
+        space = task.state_space = StateSpace(task)
+    return space
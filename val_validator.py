@@ -1,7 +1,16 @@
 # Validation des plans avec l'outil VAL
+#
+# Le plan est lu sous forme structurée (plan_ir.py, plan_output.jsonl écrit
+# par run_solver.py) : chaque étape donne son action PDDL, sans relire le
+# texte de plan_output.txt. Sans VAL, le plan est rejoué sur la tâche
+# instanciée (validate_plan_internal).
 import subprocess
 import os
 import sys
+import argparse
+
+import metrics
+from plan_ir import load_plan
 
 def check_val_installation():
     """Vérifie si VAL est installé et accessible"""
@@ -72,38 +81,54 @@ def count_actions_in_plan(plan_file):
     
     return action_count
 
+def validate_plan_internal(domain_file, problem_file, plan):
+    """Rejoue le plan (plan_ir.Plan) sur la tâche instanciée, sans VAL
+
+    Retourne un dictionnaire de même forme que validate_plan_with_val.
+    """
+    from grounding import load_task
+    from state_space import state_space_of
+
+    task = load_task(domain_file, problem_file)
+    try:
+        valid, failed_step = state_space_of(task).validate(plan.grounded())
+    except KeyError as e:
+        valid, failed_step = False, None
+        output = f"Action inconnue de la tâche: {e}\n"
+    else:
+        if valid:
+            output = "Plan valid (rejoué sur la tâche instanciée)\n"
+        elif failed_step is not None:
+            output = f"Action {failed_step + 1} inapplicable: {plan[failed_step].pddl()}\n"
+        else:
+            output = "But non atteint à la fin du plan\n"
+    return {
+        'valid': valid,
+        'makespan': len(plan),
+        'actions_count': len(plan),
+        'output': output,
+        'error': '',
+        'validator': 'rejeu interne'
+    }
+
 def convert_sat_plan_to_pddl(sat_plan_file, pddl_plan_file):
-    """Convertit un plan SAT en format PDDL standard"""
+    """Convertit un plan SAT (plan_output.jsonl, ou plan_output.txt) en plan PDDL
+
+    Retourne le plan (plan_ir.Plan), ou None en cas d'échec.
+    """
     if not os.path.exists(sat_plan_file):
         print(f"Fichier plan SAT introuvable: {sat_plan_file}")
-        return False
+        return None
     
     try:
-        with open(sat_plan_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        pddl_actions = []
-        
-        for line in lines:
-            line = line.strip()
-            if 'pickup_roomA' in line:
-                pddl_actions.append("(pickup ball roomA)")
-            elif 'move_A_to_B' in line:
-                pddl_actions.append("(move roomA roomB)")
-            elif 'drop_roomB' in line:
-                pddl_actions.append("(drop ball roomB)")
-        
-        # Écrire le plan au format PDDL
-        with open(pddl_plan_file, 'w') as f:
-            for i, action in enumerate(pddl_actions):
-                f.write(f"{action}\n")
-        
-        print(f"Plan PDDL généré: {pddl_plan_file}")
-        return True
+        plan = load_plan(sat_plan_file)
+        plan.write_pddl(pddl_plan_file)
+        print(f"Plan PDDL généré: {pddl_plan_file} ({len(plan)} actions)")
+        return plan
         
     except Exception as e:
         print(f"Erreur lors de la conversion: {e}")
-        return False
+        return None
 
 def validate_sat_planner_results():
     """Valide les résultats du planificateur SAT"""
@@ -113,7 +138,8 @@ def validate_sat_planner_results():
     # Fichiers nécessaires
     domain_file = "domain.pddl"
     problem_file = "problem.pddl"
-    sat_plan_file = "plan_output.txt"
+    # Plan structuré de run_solver.py, sinon le texte des versions précédentes
+    sat_plan_file = "plan_output.jsonl" if os.path.exists("plan_output.jsonl") else "plan_output.txt"
     pddl_plan_file = "plan_pddl.txt"
     
     # Vérifier que les fichiers existent
@@ -130,12 +156,19 @@ def validate_sat_planner_results():
     
     # Convertir le plan SAT en format PDDL
     print("Conversion du plan SAT vers PDDL...")
-    if not convert_sat_plan_to_pddl(sat_plan_file, pddl_plan_file):
+    with metrics.phase("write"):
+        plan = convert_sat_plan_to_pddl(sat_plan_file, pddl_plan_file)
+    if plan is None:
         return None
     
-    # Valider avec VAL
-    print("Validation avec VAL...")
-    result = validate_plan_with_val(domain_file, problem_file, pddl_plan_file)
+    # Valider avec VAL, ou en rejouant le plan si VAL est absent
+    with metrics.phase("validate"):
+        if check_val_installation():
+            print("Validation avec VAL...")
+            result = validate_plan_with_val(domain_file, problem_file, pddl_plan_file)
+        else:
+            print("VAL absent : plan rejoué sur la tâche instanciée...")
+            result = validate_plan_internal(domain_file, problem_file, plan)
     
     if result:
         print("\nRésultats de la validation:")
@@ -145,9 +178,9 @@ def validate_sat_planner_results():
             print(f"  Makespan: {result['makespan']}")
         
         if result['valid']:
-            print("✅ Plan validé avec succès par VAL")
+            print(f"✅ Plan validé avec succès par {result.get('validator', 'VAL')}")
         else:
-            print("❌ Plan invalide selon VAL")
+            print(f"❌ Plan invalide selon {result.get('validator', 'VAL')}")
             if result['error']:
                 print(f"Erreur: {result['error']}")
     
@@ -183,6 +216,11 @@ def create_validation_report(validation_result):
     print("Rapport de validation sauvegardé: validation_report.txt")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validation du plan SAT (VAL, ou rejeu sur la tâche)")
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "val_validator")
+
     # Vérifier l'installation de VAL
     if not check_val_installation():
         print("ATTENTION: VAL n'est pas installé")
@@ -197,6 +235,8 @@ if __name__ == "__main__":
     
     if result:
         create_validation_report(result)
+        metrics.set_info('valid', result['valid'])
         print("\nValidation terminée!")
     else:
-        print("Échec de la validation")
\ No newline at end of file
+        print("Échec de la validation")
+    metrics.finish(args)
\ No newline at end of file
@@ -1,4 +1,7 @@
+import argparse
+import os
 import pickle
+import metrics
 from encodeur_sat import encode_gripper  # Correction de l'import
 from pysat.formula import CNF
 
@@ -7,6 +10,7 @@ from pysat.formula import CNF
 #solveurs SAT, permettant l'interopérabilité entre différents outils.
 
 
+@metrics.timed("write")
 def save_cnf_file(cnf, filename):
     with open(filename, "w") as f:
         f.write(f"p cnf {cnf.nv} {len(cnf.clauses)}\n")
@@ -14,22 +18,82 @@ def save_cnf_file(cnf, filename):
             f.write(" ".join(map(str, clause)) + " 0\n")
 
 if __name__ == "__main__":
-    horizon = 4  
+    parser = argparse.ArgumentParser(description="Génération de problem.cnf et var_map.pkl")
+    parser.add_argument("--horizon", type=int, default=4)
+    parser.add_argument("--domain", help="Fichier domaine PDDL (par ex. domains/gripper_ipc.pddl)")
+    parser.add_argument("--problem", help="Fichier problème PDDL ; sans lui, le problème Gripper de base")
+    parser.add_argument("--sidecar", action="store_true",
+                        help="Écrit aussi problem.cnf.bin, lu sans conversion par run_solver.py")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Écrit problem.cnf par tranches d'instants sur N processus (avec --problem)")
+    metrics.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start(args, "write_cnf")
+
+    horizon = args.horizon
     print(f"Encodage du problème avec horizon = {horizon}")
     
-    cnf, var_map = encode_gripper(horizon=horizon)
-    
-    print(f"Nombre de variables: {cnf.nv}")
-    print(f"Nombre de clauses: {len(cnf.clauses)}")
+    if args.problem and not args.domain:
+        parser.error("--problem demande --domain")
+    if args.workers and not args.problem:
+        parser.error("--workers demande --domain et --problem")
+
+    if args.workers:
+        # Horizons très longs : la formule n'est jamais matérialisée, chaque
+        # processus formate le texte DIMACS de sa tranche d'instants
+        from domain_compiler import step_block
+        from grounding import load_task
+        from parallel_encoding import write_dimacs_parallel
+        task = load_task(args.domain, args.problem)
+        n_vars, n_clauses = write_dimacs_parallel(task, horizon, "problem.cnf", args.workers)
+        var_map = step_block(task).var_map(horizon)
+        print(f"Nombre de variables: {n_vars}")
+        print(f"Nombre de clauses: {n_clauses} ({args.workers} processus)")
+    else:
+        if args.problem:
+            # Plusieurs balles ou pinces : tâche instanciée, encodée dans un
+            # tampon int32 écrit sans liste Python par clause
+            from encodeur_sat import encode_task_buffer
+            from grounding import load_task
+            buffer, var_map = encode_task_buffer(load_task(args.domain, args.problem), horizon)
+            print(f"Nombre de variables: {buffer.nv}")
+            print(f"Nombre de clauses: {len(buffer)}")
+            with metrics.phase("write"):
+                buffer.write_dimacs("problem.cnf")
+        else:
+            cnf, var_map = encode_gripper(horizon=horizon)
+            print(f"Nombre de variables: {cnf.nv}")
+            print(f"Nombre de clauses: {len(cnf.clauses)}")
 
-    # Sauvegarde du fichier CNF
-    save_cnf_file(cnf, "problem.cnf")
+            # Sauvegarde du fichier CNF
+            save_cnf_file(cnf, "problem.cnf")
+
+    if args.sidecar:
+        # Fichier binaire associé (cnf_stream.py) : tableaux du ClauseBuffer
+        from cnf_stream import dimacs_header, iter_dimacs, sidecar_path, write_sidecar
+        with metrics.phase("write"):
+            if args.workers:
+                write_sidecar(iter_dimacs("problem.cnf"), sidecar_path("problem.cnf"),
+                              nv=dimacs_header("problem.cnf")[0])
+            elif args.problem:
+                write_sidecar(buffer, sidecar_path("problem.cnf"))
+            else:
+                from clause_buffer import ClauseBuffer
+                write_sidecar(ClauseBuffer.from_clauses(cnf.clauses, cnf.nv), sidecar_path("problem.cnf"))
+    elif os.path.exists("problem.cnf.bin"):
+        # Ancien fichier binaire : il ne correspond plus à problem.cnf
+        os.remove("problem.cnf.bin")
 
     # Sauvegarde du dictionnaire var_map
-    with open("var_map.pkl", "wb") as f:
+    with metrics.phase("write"), open("var_map.pkl", "wb") as f:
         pickle.dump(var_map, f)
 
     print("CNF et dictionnaire sauvegardés.")
     print("Fichiers générés:")
     print("  - problem.cnf")
-    print("  - var_map.pkl")
\ No newline at end of file
+    print("  - var_map.pkl")
+    if args.sidecar:
+        print("  - problem.cnf.bin")
+
+    metrics.set_info('horizon', horizon)
+    metrics.finish(args)